@@ -0,0 +1,178 @@
+"""
+Offline benchmarks for the agent loop
+
+The Messages API is replaced by client.fake, so these measure the agent's
+own work per turn (context building, message building, tool dispatch,
+pydantic validation) without network noise. Run and keep results with:
+
+    uv run pytest benchmarks --benchmark-autosave
+
+and compare a change against the last saved run with:
+
+    uv run pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:10%
+
+Results are stored under .benchmarks/. Concurrency and memory numbers are
+in each benchmark's extra_info (--benchmark-json writes them out).
+"""
+import asyncio
+import gc
+import os
+import time
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.agents.async_calculator_agent import AsyncCalculatorAgent
+from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+from src.calculator_agent.client.fake import (
+    FakeAnthropic,
+    FakeAsyncAnthropic,
+    Message,
+    ToolUseBlock,
+    Usage,
+    calculator_responder
+)
+
+# A short conversation exercising math tools, "that", save and recall
+CONVERSATION = (
+    "Combine 15 and 27",
+    "Multiply that by 3",
+    "Save that as total",
+    "What was total?",
+)
+
+# Simulated API latency for the concurrency benchmarks, in seconds
+API_LATENCY = 0.005
+
+
+def model_agent(responder=calculator_responder) -> CalculatorAgent:
+    """An agent that sends every turn to the fake client"""
+    agent = CalculatorAgent()
+    agent.use_fast_path = False
+    agent.client = FakeAnthropic(responder)
+    return agent
+
+
+def parallel_responder(params):
+    """Asks for two tools at once, then answers"""
+    if isinstance(params["messages"][-1]["content"], list):
+        return calculator_responder(params)
+    return Message(
+        [
+            ToolUseBlock("toolu_1", "add_numbers", {"a": 15, "b": 27}),
+            ToolUseBlock("toolu_2", "multiply_numbers", {"a": 6, "b": 7}),
+        ],
+        "tool_use",
+        Usage(400, 60),
+    )
+
+
+def run_conversation(agent, turns: int) -> None:
+    for i in range(turns):
+        agent.run(CONVERSATION[i % len(CONVERSATION)])
+
+
+class TestTurnOverhead:
+    """Time the agent adds to a turn, with a zero-latency API"""
+
+    def test_tool_turn(self, benchmark):
+        agent = model_agent()
+
+        benchmark(agent.run, "Combine 15 and 27")
+
+        assert agent.last_turn_stats.api_calls == 2
+
+    def test_parallel_tool_turn(self, benchmark):
+        agent = model_agent(parallel_responder)
+
+        answer = benchmark(agent.run, "Add 15 and 27 and multiply 6 by 7")
+
+        assert "42" in answer and agent.last_turn_stats.api_calls == 2
+
+    def test_streaming_turn(self, benchmark):
+        agent = model_agent()
+
+        benchmark(lambda: "".join(agent.run_stream("Combine 15 and 27")))
+
+    def test_fast_path_turn(self, benchmark):
+        agent = CalculatorAgent()
+        agent.use_fast_path = True
+
+        benchmark(agent.run, "15 + 27")
+
+        assert agent.last_turn_stats.fast_path
+
+    def test_context_with_many_saved_results(self, benchmark):
+        agent = model_agent()
+        for i in range(5000):
+            agent.memory.save_result(f"value_{i}", float(i))
+
+        context = benchmark(agent.context_builder.build, "What is value_42 plus 1?")
+
+        assert context.tokens_saved > 0
+
+
+class TestConcurrentSessions:
+    """Turn throughput of many sessions sharing one event loop"""
+
+    @pytest.mark.parametrize("sessions", [1, 10, 50])
+    def test_throughput(self, benchmark, sessions):
+        turns_per_session = len(CONVERSATION)
+        elapsed = []
+
+        async def run_sessions():
+            client = FakeAsyncAnthropic(latency=API_LATENCY)
+            agents = []
+            for _ in range(sessions):
+                agent = AsyncCalculatorAgent()
+                agent.use_fast_path = False
+                agent.client = client
+                agents.append(agent)
+
+            async def session(agent):
+                for message in CONVERSATION:
+                    await agent.arun(message)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(session(agent) for agent in agents))
+            elapsed.append(time.perf_counter() - started)
+
+        benchmark.pedantic(lambda: asyncio.run(run_sessions()), rounds=5)
+
+        turns = sessions * turns_per_session
+        best = min(elapsed)
+        benchmark.extra_info["turns"] = turns
+        benchmark.extra_info["turns_per_second"] = turns / best
+        # Two API calls per turn; far more than that means sessions are serialized
+        assert best < turns_per_session * 2 * API_LATENCY * 10
+
+
+class TestLongSessions:
+    """Memory held by a session as it grows"""
+
+    def test_memory_growth(self, benchmark):
+        agent = model_agent()
+        # Fill the bounded history first, so steady-state growth is measured
+        run_conversation(agent, agent.settings.history_size + 100)
+        turns = 2000
+
+        def measure():
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            run_conversation(agent, turns)
+            gc.collect()
+            growth = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+            return growth
+
+        growth = benchmark.pedantic(measure, rounds=1, iterations=1)
+
+        benchmark.extra_info["turns"] = turns
+        benchmark.extra_info["bytes_per_turn"] = growth / turns
+        # Only saved results should grow, and this conversation reuses one name
+        assert growth / turns < 512
@@ -1,6 +1,8 @@
 """Main entry point for the calculator agent"""
 import sys
 from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+from src.calculator_agent.client.factory import warm_up
+from src.calculator_agent.tools.result_cache import tool_result_cache
 
 
 def main():
@@ -8,11 +10,14 @@ def main():
     
     # Check if logging flag is passed
     enable_logging = "--debug" in sys.argv or "--verbose" in sys.argv
+    profile = "--profile" in sys.argv
     
     print("=" * 60)
     print("CALCULATOR AGENT")
     if enable_logging:
         print("🔍 DEBUG MODE ENABLED")
+    if profile:
+        print("⏱  PROFILING EVERY TURN")
     print("=" * 60)
     print("I can help you with calculations!")
     print("Try: 'What's 15 plus 27?'")
@@ -20,14 +25,20 @@ def main():
     print("     'Save that as my_total'")
     print("     'What was my_total?'")
     print()
-    print("Type 'quit' to exit, 'history' to see conversation")
+    print("Type 'quit' to exit, 'history' to see conversation, 'stats' for usage")
     if not enable_logging:
         print("Type 'debug on' to enable debug logging")
     print("=" * 60)
     print()
     
     # Initialize agent with logging option
-    agent = CalculatorAgent(enable_logging=enable_logging)
+    agent = CalculatorAgent(enable_logging=enable_logging, profile=profile)
+    if agent.profiler is not None:
+        print(f"Writing turn profiles to {agent.profiler.directory}/\n")
+    
+    # Load the SDK and connect to the API while the user types
+    if agent.settings.http_warmup and agent.settings.cassette_mode != "replay":
+        warm_up(agent.settings)
     
     # Interactive loop
     while True:
@@ -53,7 +64,7 @@ def main():
             
             if user_input.lower() == "history":
                 print("\nConversation History:")
-                for entry in agent.get_conversation_history():
+                for entry in agent.iter_conversation_history():
                     print(f"  - {entry}")
                 print()
                 continue
@@ -69,10 +80,40 @@ def main():
                 print()
                 continue
             
-            # Run the agent
+            if user_input.lower() == "stats":
+                stats = agent.stats
+                print("\nAgent Stats:")
+                print(f"  Turns: {stats.turns} ({stats.api_calls} API calls)")
+                if stats.retries or stats.hedges:
+                    print(f"  Retried: {stats.retries}, hedged: {stats.hedges}")
+                print(
+                    f"  Answered locally: {stats.fast_path_hits} "
+                    f"({stats.fast_path_hit_rate:.0%})"
+                )
+                if stats.terminal_tool_turns:
+                    print(f"  Answered from tool results: {stats.terminal_tool_turns}")
+                if agent.turn_cache is not None:
+                    print(f"  Turn cache hits: {stats.turn_cache_hits}")
+                print(f"  API calls saved: ~{stats.api_calls_saved:.0f}")
+                print(f"  Time saved: ~{stats.time_saved:.2f}s")
+                print(f"  Context tokens saved: ~{stats.context_tokens_saved}")
+                print(
+                    f"  Tool cache: {tool_result_cache.hits} hits, "
+                    f"{tool_result_cache.misses} misses"
+                )
+                print()
+                continue
+            
+            # Run the agent, printing tokens as they arrive
             print()  # Blank line before response
-            response = agent.run(user_input)
-            print(f"\nAgent: {response}\n")
+            print("Agent: ", end="", flush=True)
+            for chunk in agent.run_stream(user_input):
+                print(chunk, end="", flush=True)
+            print("\n")
+            
+            if agent.profiler is not None and agent.profiler.last is not None:
+                print(agent.profiler.last.summary())
+                print()
             
         except KeyboardInterrupt:
             print("\n\nGoodbye!")
@@ -0,0 +1,100 @@
+"""Micro-benchmark of per-call tool dispatch overhead"""
+import sys
+import timeit
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.calculator_agent.state.memory import Memory
+from src.calculator_agent.tools.calculator import (
+    AddNumbersTool,
+    MultiplyNumbersTool,
+    SubtractNumbersTool,
+    DivideNumbersTool,
+    PowerNumbersTool,
+    EvaluateExpressionTool
+)
+from src.calculator_agent.tools.memory_tools import SaveResultTool, RecallResultTool
+from src.calculator_agent.tools.registry import ToolRegistry
+
+CALLS = 100_000
+
+
+def build_tools():
+    """Same tool list as CalculatorAgent"""
+    memory = Memory()
+    return [
+        AddNumbersTool(memory),
+        MultiplyNumbersTool(memory),
+        SubtractNumbersTool(memory),
+        DivideNumbersTool(memory),
+        PowerNumbersTool(memory),
+        EvaluateExpressionTool(memory),
+        SaveResultTool(memory),
+        RecallResultTool(memory),
+    ]
+
+
+def linear_dispatch(tools, name, raw_input):
+    """The previous path: linear scan, import in the loop, if-chain mapping"""
+    tool = None
+    for candidate in tools:
+        if candidate.name == name:
+            tool = candidate
+            break
+
+    from src.calculator_agent.models.schemas import (
+        ExpressionInput,
+        MathOperationInput,
+        SaveResultInput,
+        RecallResultInput
+    )
+
+    if tool.name in ["add_numbers", "multiply_numbers", "subtract_numbers",
+                     "divide_numbers", "power_numbers"]:
+        return tool, MathOperationInput(**raw_input)
+    elif tool.name == "evaluate_expression":
+        return tool, ExpressionInput(**raw_input)
+    elif tool.name == "save_result":
+        return tool, SaveResultInput(**raw_input)
+    elif tool.name == "recall_result":
+        return tool, RecallResultInput(**raw_input)
+
+
+def registry_dispatch(registry, name, raw_input):
+    """The registry path: dict lookup plus precompiled validator"""
+    tool = registry.get(name)
+    return tool, tool.validate_input(raw_input)
+
+
+def main():
+    tools = build_tools()
+    registry = ToolRegistry(tools)
+
+    print(f"Dispatch overhead per call ({CALLS:,} calls each)")
+    print("-" * 60)
+    for name, raw_input in [
+        ("add_numbers", {"a": 15, "b": 27}),
+        ("save_result", {"name": "total", "value": 42}),
+        ("recall_result", {"name": "total"}),
+    ]:
+        linear = timeit.timeit(
+            lambda: linear_dispatch(tools, name, raw_input), number=CALLS
+        )
+        indexed = timeit.timeit(
+            lambda: registry_dispatch(registry, name, raw_input), number=CALLS
+        )
+        print(
+            f"{name:<16} before: {linear / CALLS * 1e6:6.2f} µs"
+            f"   after: {indexed / CALLS * 1e6:6.2f} µs"
+            f"   ({linear / indexed:.1f}x)"
+        )
+
+    definitions = timeit.timeit(registry.definitions, number=CALLS)
+    print(f"{'definitions()':<16} {definitions / CALLS * 1e6:6.2f} µs (cached)")
+
+
+if __name__ == "__main__":
+    main()
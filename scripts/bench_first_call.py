@@ -0,0 +1,81 @@
+"""Measure first API call latency with and without the background warm-up"""
+import subprocess
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+RUNS = 5
+
+# A cheap authenticated request; a 401 without a real key is still a full
+# round trip, so this runs with any ANTHROPIC_API_KEY
+_CALL = (
+    "import anthropic\n"
+    "try:\n"
+    "    agent.client.with_options(max_retries=0).models.list(limit=1)\n"
+    "except anthropic.APIStatusError:\n"
+    "    pass\n"
+)
+
+_SETUP = (
+    "from src.calculator_agent.agents.calculator_agent import CalculatorAgent\n"
+    "from src.calculator_agent.client.factory import warm_up\n"
+    "agent = CalculatorAgent()\n"
+)
+
+# Each scenario times only its last step, after the setup has run
+SCENARIOS = {
+    # What the REPL did before: SDK import, client and handshakes on demand
+    "cold first call": ("", _CALL),
+    # warm_up() ran while the user typed; join() stands in for typing time
+    "warmed first call": ("warm_up(agent.settings).join()\n", _CALL),
+    # Steady state, for reference: a second call on a pooled connection
+    "second call": (_CALL, _CALL),
+}
+
+_TIMED = (
+    "import time\n"
+    "{setup}"
+    "{before}"
+    "_start = time.perf_counter()\n"
+    "{call}"
+    "print(f'elapsed={{(time.perf_counter() - _start) * 1000:.1f}}')\n"
+)
+
+
+def run_scenario(before: str, call: str) -> float:
+    """Run a scenario in a new interpreter and return the timed step in ms"""
+    result = subprocess.run(
+        [sys.executable, "-c", _TIMED.format(setup=_SETUP, before=before, call=call)],
+        cwd=project_root,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.rsplit("elapsed=", 1)[1])
+
+
+def main():
+    print(f"First API call latency, median of {RUNS} fresh interpreters")
+    print("-" * 60)
+    results = {}
+    for name, (before, call) in SCENARIOS.items():
+        try:
+            times = sorted(run_scenario(before, call) for _ in range(RUNS))
+        except RuntimeError as e:
+            print(f"{name:<20} failed: {e}")
+            continue
+        results[name] = times[len(times) // 2]
+        print(f"{name:<20} {results[name]:8.1f} ms")
+
+    if "cold first call" in results and "warmed first call" in results:
+        saved = results["cold first call"] - results["warmed first call"]
+        print()
+        print(f"Warm-up saves {saved:.1f} ms on the first call")
+
+
+if __name__ == "__main__":
+    main()
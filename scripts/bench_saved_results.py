@@ -0,0 +1,103 @@
+"""Benchmark saved-result storage: memory use and per-turn cost"""
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.calculator_agent.models.schemas import SavedResult
+from src.calculator_agent.state.memory import Memory
+
+SIZES = [10_000, 100_000]
+TURNS = 20
+
+
+class LegacyStore:
+    """The previous layout: a dict of pydantic models, copied on every read"""
+
+    def __init__(self):
+        self._saved_results: dict[str, SavedResult] = {}
+
+    def save_result(self, name: str, value: float) -> None:
+        self._saved_results[name] = SavedResult(
+            name=name, value=value, timestamp=datetime.now().isoformat()
+        )
+
+    def get_saved_value(self, name: str):
+        saved = self._saved_results.get(name)
+        return saved.value if saved is not None else None
+
+    def context(self) -> str:
+        saved = self._saved_results.copy()
+        return ", ".join([f"{name}={result.value}" for name, result in saved.items()])
+
+
+class CompactStore:
+    """The current layout, through the Memory API the agent uses"""
+
+    def __init__(self):
+        self.memory = Memory()
+
+    def save_result(self, name: str, value: float) -> None:
+        self.memory.save_result(name, value)
+
+    def get_saved_value(self, name: str):
+        return self.memory.get_saved_value(name)
+
+    def context(self) -> str:
+        saved = self.memory.saved_values()
+        return ", ".join([f"{name}={value}" for name, value in saved.items()])
+
+
+def measure(store_class, size: int) -> dict[str, float]:
+    """Fill a store with size results and time the common operations"""
+    names = [f"result_{i}" for i in range(size)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = store_class()
+    for i, name in enumerate(names):
+        store.save_result(name, i * 1.5)
+    save_time = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for name in names:
+        store.get_saved_value(name)
+    lookup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(TURNS):
+        store.context()
+    context_time = (time.perf_counter() - start) / TURNS
+
+    return {
+        "memory_mb": retained / 1e6,
+        "save_us": save_time / size * 1e6,
+        "lookup_us": lookup_time / size * 1e6,
+        "context_ms": context_time * 1e3,
+    }
+
+
+def main():
+    for size in SIZES:
+        print(f"{size:,} saved results")
+        print("-" * 60)
+        print(f"{'':<10}{'memory':>12}{'save':>12}{'lookup':>12}{'context':>14}")
+        for label, store_class in [("before", LegacyStore), ("after", CompactStore)]:
+            r = measure(store_class, size)
+            print(
+                f"{label:<10}{r['memory_mb']:>9.1f} MB"
+                f"{r['save_us']:>9.2f} µs{r['lookup_us']:>9.2f} µs"
+                f"{r['context_ms']:>11.1f} ms"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
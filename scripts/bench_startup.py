@@ -0,0 +1,88 @@
+"""Measure cold-start cost: import time, agent construction and first local turn"""
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+RUNS = 5
+
+# Each scenario runs in a fresh interpreter and prints its own elapsed time
+SCENARIOS = {
+    "import agent module": (
+        "from src.calculator_agent.agents.calculator_agent import CalculatorAgent"
+    ),
+    "construct agent": (
+        "from src.calculator_agent.agents.calculator_agent import CalculatorAgent\n"
+        "CalculatorAgent()"
+    ),
+    "first local turn": (
+        "from src.calculator_agent.agents.calculator_agent import CalculatorAgent\n"
+        "CalculatorAgent().run('15 + 27')"
+    ),
+    "tools only": (
+        "from src.calculator_agent.state.memory import Memory\n"
+        "from src.calculator_agent.tools.calculator import AddNumbersTool\n"
+        "from src.calculator_agent.models.schemas import MathOperationInput\n"
+        "AddNumbersTool(Memory()).execute(MathOperationInput(a=15, b=27))"
+    ),
+}
+
+_TIMED = (
+    "import time\n"
+    "_start = time.perf_counter()\n"
+    "{code}\n"
+    "print(f'elapsed={{(time.perf_counter() - _start) * 1000:.1f}}')\n"
+)
+_IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def run_scenario(code: str) -> float:
+    """Run a snippet in a new interpreter and return its wall time in ms"""
+    output = subprocess.run(
+        [sys.executable, "-c", _TIMED.format(code=code)],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return float(output.rsplit("elapsed=", 1)[1])
+
+
+def top_imports(code: str, limit: int = 10) -> list[tuple[int, str]]:
+    """Top-level packages by cumulative import time (µs), via -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stderr
+
+    totals: dict[str, int] = {}
+    for match in _IMPORT_TIME.finditer(stderr):
+        cumulative, indent, module = int(match.group(2)), match.group(3), match.group(4)
+        if not indent:
+            totals[module] = max(totals.get(module, 0), cumulative)
+    return sorted(((us, name) for name, us in totals.items()), reverse=True)[:limit]
+
+
+def main():
+    print(f"Cold start, best of {RUNS} fresh interpreters")
+    print("-" * 60)
+    for name, code in SCENARIOS.items():
+        best = min(run_scenario(code) for _ in range(RUNS))
+        print(f"{name:<22} {best:8.1f} ms")
+
+    print()
+    print("Slowest top-level imports for 'first local turn'")
+    print("-" * 60)
+    for us, module in top_imports(SCENARIOS["first local turn"]):
+        print(f"{module:<40} {us / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
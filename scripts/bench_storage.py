@@ -0,0 +1,77 @@
+"""Benchmark memory backends: write throughput and session load time"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.calculator_agent.state.db_storage import SQLiteMemory
+from src.calculator_agent.state.memory import Memory
+
+TURNS = 5_000
+
+
+def run_turns(memory: Memory, turns: int) -> float:
+    """Simulate tool turns and return the elapsed seconds"""
+    start = time.perf_counter()
+    for i in range(turns):
+        memory.begin_turn()
+        memory.set_last_result(i * 1.5)
+        memory.record_operation("add", i, 0.5, i * 1.5)
+        if i % 10 == 0:
+            memory.save_result(f"result_{i}", i * 1.5)
+            memory.record_operation("save", result=i * 1.5, name=f"result_{i}")
+        memory.end_turn()
+    return time.perf_counter() - start
+
+
+class BatchedAcrossTurns(SQLiteMemory):
+    """SQLiteMemory that only flushes on batch size or timer, not every turn"""
+
+    def end_turn(self) -> None:
+        pass
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        backends = [
+            ("Memory (in-process)", lambda: Memory()),
+            (
+                "SQLite, commit per write",
+                lambda: SQLiteMemory(
+                    os.path.join(directory, "unbatched.db"), batch_size=1, flush_interval=0
+                )
+            ),
+            (
+                "SQLite, flush per turn",
+                lambda: SQLiteMemory(os.path.join(directory, "per_turn.db"))
+            ),
+            (
+                "SQLite, batched (50)",
+                lambda: BatchedAcrossTurns(os.path.join(directory, "batched.db"))
+            ),
+        ]
+
+        print(f"Write throughput ({TURNS:,} simulated tool turns)")
+        print("-" * 60)
+        for label, factory in backends:
+            memory = factory()
+            elapsed = run_turns(memory, TURNS)
+            if isinstance(memory, SQLiteMemory):
+                memory.close()
+            print(f"{label:<26} {TURNS / elapsed:>10,.0f} turns/s")
+
+        path = os.path.join(directory, "per_turn.db")
+        start = time.perf_counter()
+        SQLiteMemory(path).close()
+        print()
+        print(f"Reopening a session with {TURNS // 10:,} saved results: "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
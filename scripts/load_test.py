@@ -0,0 +1,221 @@
+"""
+Load test: concurrent simulated users against a fake Messages API
+
+Each user holds a scripted conversation (chained "that" references, saves
+and recalls) with their own agent and memory, while every API call waits
+a configurable latency. Reports turn latency percentiles, throughput, API
+calls per turn and peak RSS, for capacity planning:
+
+    uv run python scripts/load_test.py --users 200 --latency 0.8 --jitter 0.4
+    uv run python scripts/load_test.py --users 16 --mode thread
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "load-test")  # Never used offline
+
+from src.calculator_agent.agents.async_calculator_agent import AsyncCalculatorAgent
+from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+from src.calculator_agent.client.fake import FakeAnthropic, FakeAsyncAnthropic
+
+# Users cycle through these; each message depends on the memory left by the
+# last. About half are phrased so the local fast path can't answer them.
+CONVERSATIONS = [
+    [
+        "Combine 15 and 27",
+        "Multiply that by 3",
+        "Save that as total",
+        "Take that times 2",
+        "Remind me what was total",
+    ],
+    [
+        "Multiply 12 by 12",
+        "Save that as gross",
+        "I need that divided by 4",
+        "What was gross?",
+        "Combine that and 1",
+    ],
+    [
+        "Raise 2 to the power of 10",
+        "Save that as kb",
+        "Take that times 1024",
+        "Save that as mb",
+        "Remind me what was kb",
+    ],
+]
+
+
+class Results:
+    """What every turn took, collected from all users"""
+
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.model_latencies: list[float] = []  # Turns that called the API
+        self.api_calls = 0
+        self.terminal_tool_turns = 0  # Model turns that skipped the final call
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def add(self, agent: CalculatorAgent, seconds: float) -> None:
+        stats = agent.last_turn_stats
+        with self._lock:
+            self.latencies.append(seconds)
+            if stats.api_calls:
+                self.model_latencies.append(seconds)
+            self.api_calls += stats.api_calls
+            self.terminal_tool_turns += stats.terminal_tool
+            self.errors += stats.error
+
+
+def user_messages(user: int, turns: int) -> list[str]:
+    """The messages one user sends, repeating their conversation as needed"""
+    conversation = CONVERSATIONS[user % len(CONVERSATIONS)]
+    return [conversation[i % len(conversation)] for i in range(turns)]
+
+
+async def run_async(
+    users: int,
+    turns: int,
+    client: FakeAsyncAnthropic,
+    fast_path: bool,
+    terminal_tools: bool
+) -> Results:
+    """Every user as a task on one event loop, like the server"""
+    results = Results()
+
+    async def user(index: int) -> None:
+        agent = AsyncCalculatorAgent(session_id=f"user-{index}")
+        agent.use_fast_path = fast_path
+        agent.use_terminal_tools = terminal_tools
+        agent.client = client
+        for message in user_messages(index, turns):
+            start = time.perf_counter()
+            await agent.arun(message)
+            results.add(agent, time.perf_counter() - start)
+
+    await asyncio.gather(*(user(index) for index in range(users)))
+    return results
+
+
+def run_threads(
+    users: int,
+    turns: int,
+    client: FakeAnthropic,
+    fast_path: bool,
+    terminal_tools: bool
+) -> Results:
+    """Every user on its own thread with a blocking CalculatorAgent"""
+    results = Results()
+
+    def user(index: int) -> None:
+        agent = CalculatorAgent(session_id=f"user-{index}")
+        agent.use_fast_path = fast_path
+        agent.use_terminal_tools = terminal_tools
+        agent.client = client
+        for message in user_messages(index, turns):
+            start = time.perf_counter()
+            agent.run(message)
+            results.add(agent, time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(user, range(users)))
+    return results
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+def print_latencies(latencies: list[float]) -> None:
+    """Print p50/p95/p99 and max turn latency"""
+    if not latencies:
+        return
+    ordered = sorted(latencies)
+    for label, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        print(f"  {label}:          {percentile(ordered, q) * 1000:10.1f} ms")
+    print(f"  max:          {ordered[-1] * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50, help="Concurrent users")
+    parser.add_argument("--turns", type=int, default=20, help="Messages per user")
+    parser.add_argument(
+        "--mode", choices=["async", "thread"], default="async",
+        help="AsyncCalculatorAgent tasks or CalculatorAgent threads"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="Seconds per fake API call"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Up to this many more seconds, random"
+    )
+    parser.add_argument(
+        "--no-fast-path", action="store_true", help="Send every turn to the model"
+    )
+    parser.add_argument(
+        "--terminal-tools", action="store_true",
+        help="Answer single-tool turns from the tool result, without a second call"
+    )
+    args = parser.parse_args()
+    fast_path = not args.no_fast_path
+    options = (fast_path, args.terminal_tools)
+
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    if args.mode == "async":
+        client = FakeAsyncAnthropic(latency=args.latency, jitter=args.jitter)
+        results = asyncio.run(run_async(args.users, args.turns, client, *options))
+    else:
+        client = FakeAnthropic(latency=args.latency, jitter=args.jitter)
+        results = run_threads(args.users, args.turns, client, *options)
+    elapsed = time.perf_counter() - start
+
+    turns = len(results.latencies)
+    model_turns = len(results.model_latencies)
+    print(
+        f"Load test: {args.users} users x {args.turns} turns ({args.mode}), "
+        f"API latency {args.latency * 1000:.0f} ms + up to {args.jitter * 1000:.0f} ms"
+    )
+    print("-" * 60)
+    print(f"  turns:        {turns:10,} ({results.errors} errors)")
+    print(f"  wall time:    {elapsed:10.2f} s")
+    print(f"  throughput:   {turns / elapsed:10.1f} turns/s")
+    print(f"  API calls:    {results.api_calls:10,} ({client.messages.calls:,} served)")
+    print(f"  calls/turn:   {results.api_calls / turns:10.2f}")
+    if model_turns:
+        print(f"  calls/model turn: {results.api_calls / model_turns:6.2f}")
+    if results.terminal_tool_turns:
+        print(f"  calls saved by terminal tools: {results.terminal_tool_turns:,}")
+    print(f"  answered locally: {1 - model_turns / turns:6.0%}")
+    print()
+    print("Turn latency, all turns")
+    print_latencies(results.latencies)
+    if model_turns and model_turns < turns:
+        print("Turn latency, turns that called the API")
+        print_latencies(results.model_latencies)
+    print()
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB (baseline {baseline_rss:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Replay a recorded traffic capture as a load test, without the network
+
+Record a capture by running the agent or server with CASSETTE_MODE=record
+(sessions should start with empty memory so their requests replay
+exactly), then:
+
+    uv run python scripts/replay_capture.py .cassette.jsonl.gz --copies 20
+
+Every recorded session is replayed by `copies` concurrent users, each
+with fresh memory, and every API response waits as long as it did in
+production (scaled by --latency-scale).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "replay")  # Never used offline
+
+from src.calculator_agent.agents.async_calculator_agent import AsyncCalculatorAgent
+from src.calculator_agent.client.cassette import Cassette, replay_client
+from load_test import peak_rss_mb, print_latencies
+
+
+async def replay_session(
+    cassette: Cassette,
+    messages: list[str],
+    latency_scale: float,
+    latencies: list[float],
+    misses: list[str]
+) -> None:
+    """Run one recorded session's messages through a fresh agent"""
+    agent = AsyncCalculatorAgent()
+    agent.use_fast_path = False  # Recorded turns all went to the API
+    agent.client = replay_client(cassette, latency_scale, asynchronous=True)
+    for message in messages:
+        start = time.perf_counter()
+        await agent.arun(message)
+        if agent.last_turn_stats.error:  # Most likely a CassetteMiss
+            misses.append(message)
+            return  # Later turns depend on this one's memory changes
+        latencies.append(time.perf_counter() - start)
+
+
+async def replay(cassette: Cassette, copies: int, latency_scale: float) -> None:
+    sessions = cassette.sessions()
+    latencies: list[float] = []
+    misses: list[str] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        replay_session(cassette, messages, latency_scale, latencies, misses)
+        for messages in sessions.values()
+        for _ in range(copies)
+    ))
+    elapsed = time.perf_counter() - start
+
+    print(f"Replayed {len(sessions)} sessions x {copies} copies from {cassette.path}")
+    print("-" * 60)
+    print(f"  turns:        {len(latencies):10,} ({len(misses)} sessions stopped on a miss)")
+    print(f"  wall time:    {elapsed:10.2f} s")
+    print(f"  throughput:   {len(latencies) / elapsed:10.1f} turns/s")
+    print()
+    print("Turn latency")
+    print_latencies(latencies)
+    print()
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+    for message in misses[:5]:
+        print(f"  no recording for: {message!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("cassette", help="Capture recorded with CASSETTE_MODE=record")
+    parser.add_argument("--copies", type=int, default=1, help="Users per recorded session")
+    parser.add_argument(
+        "--latency-scale", type=float, default=1.0,
+        help="Multiply recorded API latency (0 replays instantly)"
+    )
+    args = parser.parse_args()
+
+    if not Path(args.cassette).exists():
+        sys.exit(f"No capture at {args.cassette}")
+    asyncio.run(replay(Cassette(args.cassette), args.copies, args.latency_scale))
+
+
+if __name__ == "__main__":
+    main()
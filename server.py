@@ -0,0 +1,28 @@
+"""HTTP server entry point for the calculator agent
+
+Run with any ASGI server, e.g.:
+    uvicorn server:app --host 0.0.0.0 --port 8000
+or directly (needs uvicorn installed):
+    python server.py
+"""
+import sys
+from src.calculator_agent.server.app import create_app
+
+app = create_app()
+
+
+def main():
+    """Serve the app with uvicorn"""
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn is not installed. Run: pip install -e \".[server]\"")
+        sys.exit(1)
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    print(f"🚀 Calculator agent server on http://0.0.0.0:{port}")
+    uvicorn.run(app, host="0.0.0.0", port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Asyncio calculator agent for serving many concurrent sessions"""
+import asyncio
+import contextlib
+import contextvars
+import time
+from typing import Any, AsyncIterator, Iterator, Optional
+from ..state.memory import DeferredMemory
+from ..utils.logger import agent_logger
+from .calculator_agent import CalculatorAgent, _get_tool_executor
+
+
+async def _with_deadline(chunks: AsyncIterator[str], timeout: float) -> AsyncIterator[str]:
+    """Re-yield chunks, raising asyncio.TimeoutError once timeout seconds have passed"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    async with contextlib.aclosing(chunks):
+        while True:
+            try:
+                chunk = await asyncio.wait_for(anext(chunks), deadline - loop.time())
+            except StopAsyncIteration:
+                return
+            yield chunk
+
+
+class AsyncCalculatorAgent(CalculatorAgent):
+    """
+    Calculator agent built on AsyncAnthropic
+
+    Shares tools, memory, context building and response handling with
+    CalculatorAgent; only the I/O in the agent loop is asynchronous, so a
+    single event loop can drive thousands of conversations.
+    """
+
+    def _create_client(self) -> Any:
+        """Get the shared async Anthropic client used for Messages API calls"""
+        if self.settings.cassette_mode != "off":
+            from ..client.cassette import cassette_client
+            
+            return cassette_client(self.settings, self.session_id, asynchronous=True)
+        
+        from ..client.factory import get_async_client
+        
+        return get_async_client(self.settings)
+
+    async def _aexecute_tool_uses(self, tool_uses: list[Any]) -> list[dict[str, Any]]:
+        """
+        Execute all tool_use blocks from one response without blocking the loop
+
+        Every call writes to its own DeferredMemory and the writes are only
+        committed once the whole batch has finished, in block order. A batch
+        that is cancelled or times out therefore leaves Memory untouched.
+
+        Args:
+            tool_uses: The tool_use content blocks, in response order
+
+        Returns:
+            One tool_result content block per tool_use, in the same order
+        """
+        loop = asyncio.get_running_loop()
+        staged = [DeferredMemory(self.memory) for _ in tool_uses]
+        results = await asyncio.gather(*(
+            loop.run_in_executor(
+                _get_tool_executor(self.settings.max_tool_workers),
+                contextvars.copy_context().run,  # Keeps the turn's correlation id
+                self._execute_tool_use,
+                tool_use,
+                memory
+            )
+            for tool_use, memory in zip(tool_uses, staged)
+        ))
+        for memory in staged:
+            memory.commit()
+        return list(results)
+
+    async def _arun_model_turn(self, user_message: str) -> str:
+        """Run the Claude agent loop for a turn the agent can't answer locally"""
+        messages = self._start_turn(user_message)
+
+        # Agent loop: may require multiple tool calls
+        for iteration in range(1, self.max_iterations + 1):
+            if self.enable_logging:
+                agent_logger.debug("Agent loop iteration %d", iteration)
+
+            started = time.perf_counter()
+            try:
+                response = await self.retry_policy.acall(
+                    self.client.messages.create,
+                    self._request_params(messages),
+                    self._before_attempts(messages)
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                return self._api_error(e)
+            finally:
+                self._record_api_time(started)
+
+            self._record_usage(response)
+
+            tool_uses = self._get_tool_uses(response)
+            if tool_uses:
+                tool_results = await self._aexecute_tool_uses(tool_uses)
+                terminal = self._terminal_response(
+                    user_message, iteration, tool_uses, tool_results
+                )
+                if terminal is not None:
+                    return terminal
+                messages.append({"role": "assistant", "content": response.content})
+                messages.append({"role": "user", "content": tool_results})
+                continue
+
+            return self._extract_text(response)
+
+        return self._max_iterations_reached()
+
+    async def _astream_model_turn(self, user_message: str) -> AsyncIterator[str]:
+        """Streaming version of _arun_model_turn()"""
+        messages = self._start_turn(user_message)
+        emitted_text = False
+
+        for iteration in range(1, self.max_iterations + 1):
+            if self.enable_logging:
+                agent_logger.debug("Agent loop iteration %d", iteration)
+
+            params = self._request_params(messages)
+            before_attempt = self._before_attempts(messages)
+            started = time.perf_counter()
+            retries = 0
+            while True:
+                chunks: list[str] = []
+                delay = before_attempt("retry" if retries else "first")
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    async with self.client.messages.stream(**params) as stream:
+                        async for text in stream.text_stream:
+                            if not chunks and emitted_text:
+                                yield "\n\n"
+                            self._mark_first_token()
+                            chunks.append(text)
+                            yield text
+                        response = await stream.get_final_message()
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    delay = None if chunks else self.retry_policy.backoff(retries, e)
+                    if delay is None:
+                        self._record_api_time(started)
+                        yield self._api_error(e)
+                        return
+                await asyncio.sleep(delay)
+                retries += 1
+            self._record_api_time(started)
+
+            self._record_usage(response)
+
+            emitted_text = emitted_text or bool(chunks)
+
+            tool_uses = self._get_tool_uses(response)
+            if tool_uses:
+                tool_results = await self._aexecute_tool_uses(tool_uses)
+                terminal = self._terminal_response(
+                    user_message, iteration, tool_uses, tool_results
+                )
+                if terminal is not None:
+                    if emitted_text:
+                        yield "\n\n"
+                    self._mark_first_token()
+                    yield terminal
+                    return
+                messages.append({"role": "assistant", "content": response.content})
+                messages.append({"role": "user", "content": tool_results})
+                continue
+
+            if not emitted_text:
+                self._mark_first_token()
+                yield self._extract_text(response)
+            elif self.enable_logging:
+                agent_logger.agent_response("".join(chunks))
+            return
+
+        yield self._max_iterations_reached()
+
+    async def _arun(self, user_message: str) -> str:
+        """Answer one turn locally if possible, otherwise with Claude"""
+        response = self._answer_locally(user_message)
+        if response is not None:
+            return response
+
+        self._start_recording()
+        try:
+            response = await self._arun_model_turn(user_message)
+        finally:
+            operations = self._stop_recording()
+        self._store_turn(response, operations)
+        return response
+
+    def _turn_timed_out(self, timeout: float) -> str:
+        """Mark the turn as failed and return the apology sent instead"""
+        self.last_turn_stats.error = True
+        if self.enable_logging:
+            agent_logger.error("Turn timed out after %ss", timeout)
+        return "I'm sorry, that took too long. Please try again."
+
+    async def arun(self, user_message: str, timeout: Optional[float] = None) -> str:
+        """
+        Run the agent with a user message
+
+        Cancelling the calling task cancels the in-flight API request; tool
+        side effects from an unfinished batch are discarded.
+
+        Args:
+            user_message: The user's input
+            timeout: Seconds allowed for the whole turn (defaults to
+                settings.turn_timeout, None or 0 disables the limit)
+
+        Returns:
+            The agent's response
+        """
+        if timeout is None:
+            timeout = self.settings.turn_timeout
+
+        self._begin_turn(user_message)
+        response = None
+        try:
+            response = await asyncio.wait_for(self._arun(user_message), timeout or None)
+        except asyncio.TimeoutError:
+            response = self._turn_timed_out(timeout)
+        finally:
+            # Also on cancellation, so memory and stats never stay mid-turn
+            self._finish_turn(response or "", completed=response is not None)
+        return response
+
+    async def arun_stream(
+        self, user_message: str, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Run the agent with a user message, streaming the response
+
+        Async counterpart of run_stream(); time-to-first-token is recorded
+        in last_turn_stats. Past the deadline the stream is cut off and
+        ends with the same apology arun() returns. A turn that is cancelled
+        or closed early by the consumer still ends, counted as an error.
+
+        Args:
+            user_message: The user's input
+            timeout: Seconds allowed for the whole turn (defaults to
+                settings.turn_timeout, None or 0 disables the limit)
+
+        Yields:
+            Chunks of the agent's response
+        """
+        if timeout is None:
+            timeout = self.settings.turn_timeout
+
+        self._begin_turn(user_message)
+        finished = False
+        try:
+            response = self._answer_locally(user_message)
+            if response is not None:
+                self._mark_first_token()
+                finished = True
+                yield self._finish_turn(response)
+                return
+
+            chunks: list[str] = []
+            timed_out = False
+            model_turn = self._astream_model_turn(user_message)
+            if timeout:
+                model_turn = _with_deadline(model_turn, timeout)
+            self._start_recording()
+            try:
+                async with contextlib.aclosing(model_turn):
+                    async for chunk in model_turn:
+                        chunks.append(chunk)
+                        yield chunk
+            except asyncio.TimeoutError:
+                timed_out = True
+            finally:
+                operations = self._stop_recording()
+
+            if timed_out:
+                apology = self._turn_timed_out(timeout)
+                finished = True
+                yield ("\n\n" if chunks else "") + self._finish_turn(apology)
+                return
+            self._store_turn("".join(chunks), operations)
+            finished = True
+            self._finish_turn("")
+        finally:
+            if not finished:  # Cancelled, or closed by the consumer
+                self._finish_turn("", completed=False)
+
+    def run(self, user_message: str) -> str:
+        """Run a turn from synchronous code (not from inside an event loop)"""
+        return asyncio.run(self.arun(user_message))
+
+    def run_stream(self, user_message: str) -> Iterator[str]:
+        """
+        Stream a turn from synchronous code (not from inside an event loop)
+
+        Drives arun_stream() on a private event loop, one chunk at a time;
+        the inherited run_stream() would call the async client synchronously.
+        Every step runs in the same context, so the turn's correlation id is
+        kept from chunk to chunk.
+        """
+        loop = asyncio.new_event_loop()
+        context = contextvars.copy_context()
+        chunks = self.arun_stream(user_message)
+
+        async def next_chunk() -> str:
+            return await anext(chunks)
+
+        async def close() -> None:
+            await chunks.aclose()
+
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(
+                        loop.create_task(next_chunk(), context=context)
+                    )
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(
+                loop.create_task(close(), context=context)
+            )
+            loop.run_until_complete(loop.shutdown_asyncgens())  # As asyncio.run() does
+            loop.close()
@@ -1,27 +1,110 @@
 """Calculator agent that uses tools to perform calculations"""
-from typing import Any
-from anthropic import Anthropic
-from ..config.settings import settings
-from ..state.memory import Memory
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Iterator, Mapping
+from ..client.rate_limit import get_rate_limiter
+from ..client.retry import BeforeAttempt, RetryPolicy
+from ..models.schemas import AgentStats, TurnStats
+from ..state.memory import DeferredMemory, Memory
 from ..tools.calculator import (
     AddNumbersTool, 
     MultiplyNumbersTool, 
     SubtractNumbersTool,
     DivideNumbersTool,
-    PowerNumbersTool
+    PowerNumbersTool,
+    EvaluateExpressionTool
 )
 from ..tools.memory_tools import SaveResultTool, RecallResultTool
 from ..tools.base import BaseTool
-from ..utils.logger import agent_logger
+from ..tools.registry import ToolRegistry
+from ..tools.result_cache import tool_result_cache
+from ..utils.logger import agent_logger, new_correlation_id
+from ..utils.metrics import metrics
+from .context import ContextBuilder, ContextMessage, estimate_tokens
+from .fast_path import is_multi_step, parse_intent, uses_every_number
+from .turn_cache import CachedTurn, TurnCache, get_shared_turn_cache
+
+if TYPE_CHECKING:
+    from ..config.settings import Settings
+    from ..utils.profiler import TurnProfiler
+
+
+# Shared by all agents so concurrent sessions don't each spawn their own pool
+_tool_executor: ThreadPoolExecutor | None = None
+
+
+def _get_tool_executor(max_workers: int = 4) -> ThreadPoolExecutor:
+    """Get the process-wide thread pool used for parallel tool calls"""
+    global _tool_executor
+    if _tool_executor is None:
+        _tool_executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="calculator-tool"
+        )
+    return _tool_executor
 
 
 class CalculatorAgent:
     """Agent that orchestrates calculator tools"""
     
-    def __init__(self, enable_logging: bool = False):
-        self.client = Anthropic(api_key=settings.anthropic_api_key)
-        self.memory = Memory()
+    max_iterations = 10  # Prevent infinite loops
+    
+    def __init__(
+        self,
+        enable_logging: bool = False,
+        turn_cache: TurnCache | None = None,
+        memory: Memory | None = None,
+        session_id: str | None = None,
+        profile: bool = False
+    ):
+        # Imported here so importing this module stays cheap (pydantic_settings)
+        from ..config.settings import get_settings
+        
+        self.settings: "Settings" = get_settings()
+        self._client: Any = None  # Created on first use, see the client property
+        self.session_id = session_id or self.settings.session_id
+        self.memory = memory if memory is not None else self._create_memory(self.session_id)
+        self.context_builder = ContextBuilder(
+            self.memory, token_budget=self.settings.context_token_budget
+        )
         self.enable_logging = enable_logging
+        agent_logger.apply_settings(self.settings)
+        self.last_turn_stats: TurnStats | None = None
+        self.stats = AgentStats()
+        if self.settings.metrics:
+            metrics.enable()
+        self.retry_policy = RetryPolicy.from_settings(self.settings)
+        self.rate_limiter = get_rate_limiter(self.settings)  # Shared by every agent
+        self._prompt_tokens = 0  # Prompt size of the last response, for estimates
+        self._reserved_tokens = 0  # Reserved with the rate limiter, not yet settled
+        self.use_fast_path = self.settings.fast_path
+        self.use_terminal_tools = self.settings.terminal_tools
+        self._tool_replies: dict[str, str] = {}  # Terminal tool replies by tool_use id
+        tool_result_cache.configure(
+            maxsize=self.settings.tool_cache_size, enabled=self.settings.tool_cache
+        )
+        
+        # Whole-turn cache, shared by every agent in the process by default
+        if turn_cache is None and self.settings.turn_cache:
+            turn_cache = get_shared_turn_cache(
+                backend=self.settings.turn_cache_backend,
+                path=self.settings.turn_cache_path,
+                maxsize=self.settings.turn_cache_size,
+                ttl=self.settings.turn_cache_ttl,
+                namespace=self.settings.model_name
+            )
+        self.turn_cache = turn_cache
+        self._turn_cache_key: str | None = None
+        self._turn_context: ContextMessage | None = None  # Built once per turn
+        self._turn_started = 0.0
+        
+        # Per-turn cProfile profiles, see TurnProfiler
+        self.profiler: "TurnProfiler | None" = None
+        if profile or self.settings.profile:
+            from ..utils.profiler import TurnProfiler
+            
+            self.profiler = TurnProfiler(self.settings.profile_dir, self.settings.profile_top)
         
         # Initialize tools
         self.tools: list[BaseTool] = [
@@ -30,11 +113,13 @@ class CalculatorAgent:
             SubtractNumbersTool(self.memory),
             DivideNumbersTool(self.memory),
             PowerNumbersTool(self.memory),
+            EvaluateExpressionTool(self.memory),
             SaveResultTool(self.memory),
             RecallResultTool(self.memory),
         ]
         
-        # Build tool definitions for Claude
+        # Index tools by name and build their definitions for Claude
+        self.registry = ToolRegistry(self.tools)
         self.tool_definitions = self._build_tool_definitions()
         
         # System prompt
@@ -48,259 +133,718 @@ Guidelines:
 - Use subtract_numbers for subtraction
 - Use divide_numbers for division
 - Use power_numbers for exponents/powers
+- Use evaluate_expression for calculations with more than one step, so the whole chain runs in one call (e.g. "(15 + 27) * 3 / 2 squared" -> "((15 + 27) * 3 / 2) ** 2"); saved names and "last" can be used in it
 - Use save_result to save values with names
 - Use recall_result to retrieve saved values
 - When user says "multiply that" or "add to that", use the last calculation result
+- When a request contains several independent calculations, call all the tools at once
 
 Be concise and friendly in your responses."""
+        
+        # The tool list and system prompt are identical on every call, so
+        # build the request versions once, with prompt cache breakpoints
+        self._request_tools, self._request_system = self._build_cached_prefix()
+    
+    def _create_memory(self, session_id: str) -> Memory:
+        """Create the memory backend selected in settings for a session"""
+        if self.settings.memory_backend == "sqlite":
+            from ..state.db_storage import SQLiteMemory
+            
+            return SQLiteMemory(
+                self.settings.memory_path,
+                session_id=session_id,
+                history_size=self.settings.history_size
+            )
+        if self.settings.memory_backend == "redis":
+            from ..state.redis_storage import RedisMemory
+            
+            return RedisMemory(
+                self.settings.redis_url,
+                session_id=session_id,
+                history_size=self.settings.history_size
+            )
+        if self.settings.memory_backend != "memory":
+            raise ValueError(f"Unknown memory backend: {self.settings.memory_backend}")
+        return Memory(
+            history_size=self.settings.history_size,
+            history_spill_path=self.settings.history_spill_path
+        )
+    
+    @property
+    def client(self) -> Any:
+        """The Anthropic client, created on first use"""
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+    
+    @client.setter
+    def client(self, client: Any) -> None:
+        self._client = client
+    
+    def _create_client(self) -> Any:
+        """Get the process-wide Anthropic client used for Messages API calls"""
+        if self.settings.cassette_mode != "off":
+            from ..client.cassette import cassette_client
+            
+            return cassette_client(self.settings, self.session_id)
+        
+        # anthropic takes over a second to import, so only load it when needed
+        from ..client.factory import get_client
+        
+        return get_client(self.settings)
     
     def _build_tool_definitions(self) -> list[dict[str, Any]]:
         """Convert our tools to Anthropic's tool format"""
-        definitions = []
-        
-        for tool in self.tools:
-            if tool.name in ["add_numbers", "multiply_numbers", "subtract_numbers", 
-                           "divide_numbers", "power_numbers"]:
-                schema = {
-                    "type": "object",
-                    "properties": {
-                        "a": {
-                            "type": "number",
-                            "description": "First number"
-                        },
-                        "b": {
-                            "type": "number",
-                            "description": "Second number"
-                        }
-                    },
-                    "required": ["a", "b"]
-                }
-            elif tool.name == "save_result":
-                schema = {
-                    "type": "object",
-                    "properties": {
-                        "name": {
-                            "type": "string",
-                            "description": "Name to save the result under"
-                        },
-                        "value": {
-                            "type": "number",
-                            "description": "Value to save"
-                        }
-                    },
-                    "required": ["name", "value"]
-                }
-            elif tool.name == "recall_result":
-                schema = {
-                    "type": "object",
-                    "properties": {
-                        "name": {
-                            "type": "string",
-                            "description": "Name of the saved result to recall"
-                        }
-                    },
-                    "required": ["name"]
-                }
-            
-            definitions.append({
-                "name": tool.name,
-                "description": tool.description,
-                "input_schema": schema
-            })
+        return self.registry.definitions()
+    
+    def _build_cached_prefix(self) -> tuple[list[dict[str, Any]], Any]:
+        """
+        Build the tools and system request params
+        
+        With prompt caching on, a cache_control breakpoint is placed on the
+        last tool definition and on the system prompt, so the whole static
+        prefix is read from the cache on every call after the first.
+        
+        Returns:
+            The tools and system values to send with each request
+        """
+        if not self.settings.prompt_caching or not self.tool_definitions:
+            return self.tool_definitions, self.system_prompt
         
-        return definitions
+        cache_control = {"type": "ephemeral"}
+        tools = [
+            *self.tool_definitions[:-1],
+            {**self.tool_definitions[-1], "cache_control": cache_control},
+        ]
+        system = [
+            {"type": "text", "text": self.system_prompt, "cache_control": cache_control}
+        ]
+        return tools, system
     
     def _get_tool_by_name(self, name: str) -> BaseTool | None:
         """Get a tool by its name"""
-        for tool in self.tools:
-            if tool.name == name:
-                return tool
-        return None
-    
-    def _build_context_message(self) -> str:
-        """Build context about current state"""
-        context_parts = []
-        
-        # Add last result if exists
-        last_result = self.memory.get_last_result()
-        if last_result is not None:
-            context_parts.append(f"Most recent calculation result: {last_result}")
-        
-        # Add saved results if any
-        saved = self.memory.list_saved_results()
-        if saved:
-            saved_str = ", ".join([f"{name}={result.value}" for name, result in saved.items()])
-            context_parts.append(f"Saved results: {saved_str}")
-        
-        if context_parts:
-            return "Context: " + " | ".join(context_parts)
-        return ""
+        return self.registry.get(name)
     
-    def run(self, user_message: str) -> str:
+    def _execute_tool_use(self, tool_use: Any, memory: Any = None) -> dict[str, Any]:
         """
-        Run the agent with a user message
+        Execute a single tool_use block and build its tool_result
+        
+        Args:
+            tool_use: The tool_use content block from Claude's response
+            memory: Memory the tool should write to (defaults to the agent's)
+            
+        Returns:
+            A tool_result content block
+        """
+        if self.enable_logging:
+            agent_logger.tool_call(tool_use.name, tool_use.input)
+        
+        # Get the tool
+        tool = self._get_tool_by_name(tool_use.name)
+        if not tool:
+            error_msg = f"Unknown tool {tool_use.name}"
+            if self.enable_logging:
+                agent_logger.error(error_msg)
+            
+            # IMPORTANT: Send error back as tool_result
+            return {
+                "type": "tool_result",
+                "tool_use_id": tool_use.id,
+                "content": error_msg,
+                "is_error": True
+            }
+        
+        if memory is not None:
+            # Tools only hold a memory reference, so a fresh instance bound
+            # to the staging memory behaves exactly like the shared one
+            tool = type(tool)(memory)
+        
+        try:
+            # Validate input against the tool's own input model
+            tool_input = tool.validate_input(tool_use.input)
+            
+            # Execute
+            result = tool.run(tool_input)
+            
+            if self.enable_logging:
+                agent_logger.tool_result(
+                    tool.name, 
+                    result.success, 
+                    result.message
+                )
+            
+            if self.use_terminal_tools and tool.terminal and result.success:
+                self._tool_replies[tool_use.id] = tool.reply(tool_input, result)
+            
+            return {
+                "type": "tool_result",
+                "tool_use_id": tool_use.id,
+                "content": result.message,
+                "is_error": not result.success  # Mark if tool failed
+            }
+            
+        except Exception as e:
+            # Handle tool execution errors
+            error_msg = f"Tool execution failed: {e}"
+            if self.enable_logging:
+                agent_logger.error(error_msg, exception=e)
+            
+            # Send error back as tool_result
+            return {
+                "type": "tool_result",
+                "tool_use_id": tool_use.id,
+                "content": error_msg,
+                "is_error": True
+            }
+    
+    def _execute_tool_uses(self, tool_uses: list[Any]) -> list[dict[str, Any]]:
+        """
+        Execute all tool_use blocks from one response
+        
+        Independent calls run concurrently on a thread pool. Each call writes
+        to its own DeferredMemory, and the buffered writes are committed in
+        block order, so Memory side effects match sequential execution.
+        
+        Args:
+            tool_uses: The tool_use content blocks, in response order
+            
+        Returns:
+            One tool_result content block per tool_use, in the same order
+        """
+        max_workers = self.settings.max_tool_workers
+        if len(tool_uses) == 1 or max_workers <= 1:
+            return [self._execute_tool_use(tool_use) for tool_use in tool_uses]
+        
+        staged = [DeferredMemory(self.memory) for _ in tool_uses]
+        executor = _get_tool_executor(max_workers)
+        # Each call runs in a copy of this context, so its log lines keep the turn's id
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run, self._execute_tool_use, tool_use, memory
+            )
+            for tool_use, memory in zip(tool_uses, staged)
+        ]
+        results = [future.result() for future in futures]
+        for memory in staged:
+            memory.commit()
+        return results
+    
+    def _context(self, user_message: str) -> ContextMessage:
+        """The turn's memory context, built on first use"""
+        if self._turn_context is None:
+            self._turn_context = self.context_builder.build(user_message)
+        return self._turn_context
+    
+    def _build_context_message(self, user_message: str = "") -> str:
+        """Build context about current state, within the context token budget"""
+        context = self._context(user_message)
+        self.last_turn_stats.context_tokens = context.tokens
+        self.last_turn_stats.context_tokens_saved = context.tokens_saved
+        return context.text
+    
+    def _begin_turn(self, user_message: str) -> None:
+        """Reset the per-turn stats for a new user message"""
+        if self.profiler is not None:
+            self.profiler.start()
+        self.last_turn_stats = TurnStats(correlation_id=new_correlation_id())
+        self._turn_context = None
+        self._tool_replies = {}
+        self._turn_started = time.perf_counter()
+        self.memory.begin_turn()
+        
+        if self.enable_logging:
+            agent_logger.agent_thinking("Processing: '%s'", user_message)
+    
+    def _try_fast_path(self, user_message: str) -> str | None:
+        """
+        Answer the message locally if it is a single recognizable operation
         
         Args:
             user_message: The user's input
             
         Returns:
-            The agent's response
+            The tool's message as the response, or None to fall back to Claude
+        """
+        if not self.use_fast_path:
+            return None
+        
+        intent = parse_intent(user_message, self.memory)
+        if intent is None:
+            return None
+        
+        tool = self._get_tool_by_name(intent.tool_name)
+        if self.enable_logging:
+            agent_logger.debug("Answering locally (fast path)")
+            agent_logger.tool_call(tool.name, intent.tool_input.model_dump())
+        
+        result = tool.run(intent.tool_input)
+        self.last_turn_stats.fast_path = True
+        
+        if self.enable_logging:
+            agent_logger.tool_result(tool.name, result.success, result.message)
+        return result.message
+    
+    def _try_turn_cache(self, user_message: str) -> str | None:
         """
+        Answer the message from the turn cache, replaying its memory writes
+        
+        On a miss the cache key is kept so the turn can be stored once the
+        model has answered.
+        
+        Args:
+            user_message: The user's input
+            
+        Returns:
+            The recorded response, or None on a miss
+        """
+        self._turn_cache_key = None
+        if self.turn_cache is None:
+            return None
+        
+        # Keyed on exactly what the model would see, memory context included
+        key = self.turn_cache.make_key(user_message, self._context(user_message).text)
+        cached = self.turn_cache.get(key)
+        if cached is None:
+            self._turn_cache_key = key
+            return None
+        
         if self.enable_logging:
-            agent_logger.agent_thinking(f"Processing: '{user_message}'")
+            agent_logger.debug("Answering from the turn cache")
         
-        # Build user message with context
-        context = self._build_context_message()
+        # Replay side effects so follow-up "that" references still work
+        self.memory.apply(cached.operations)
+        self.last_turn_stats.turn_cache_hit = True
+        return cached.response
+    
+    def _answer_locally(self, user_message: str) -> str | None:
+        """Answer without calling Claude via the fast path or the turn cache"""
+        response = self._try_fast_path(user_message)
+        if response is None:
+            response = self._try_turn_cache(user_message)
+        return response
+    
+    def _start_recording(self) -> None:
+        """Record memory writes made by a turn that may be cached"""
+        if self._turn_cache_key is not None:
+            self.memory.start_journal()
+    
+    def _stop_recording(self) -> list[tuple[str, Any]]:
+        """Stop recording memory writes and return them"""
+        if self._turn_cache_key is None:
+            return []
+        return self.memory.stop_journal()
+    
+    def _store_turn(self, response: str, operations: list[tuple[str, Any]]) -> None:
+        """Store a successfully answered turn in the turn cache"""
+        if self._turn_cache_key is None or self.last_turn_stats.error:
+            return
+        self.turn_cache.put(self._turn_cache_key, CachedTurn(response, operations))
+    
+    def _start_turn(self, user_message: str) -> list[dict[str, Any]]:
+        """Build the initial message list for a turn sent to Claude"""
+        context = self._build_context_message(user_message)
         full_message = f"{context}\n\nUser: {user_message}" if context else user_message
         
         if self.enable_logging and context:
-            agent_logger.debug(f"Context: {context}")
+            agent_logger.debug("Context: %s", context)
         
-        messages = [{"role": "user", "content": full_message}]
+        return [{"role": "user", "content": full_message}]
+    
+    def _request_params(self, messages: list[dict[str, Any]]) -> dict[str, Any]:
+        """Build the keyword arguments for a Messages API call"""
+        return {
+            "model": self.settings.model_name,
+            "max_tokens": self.settings.max_tokens,
+            "temperature": self.settings.temperature,
+            "system": self._request_system,
+            "tools": self._request_tools,
+            "messages": messages,
+        }
+    
+    def _before_attempts(self, messages: list[dict[str, Any]]) -> BeforeAttempt:
+        """
+        Build the hook run before each attempt at one API call
         
-        # Agent loop: may require multiple tool calls
-        iteration = 0
-        max_iterations = 10  # Prevent infinite loops
+        It counts the request in the turn stats and reserves it with the
+        shared rate limiter, returning how long to wait before sending.
+        """
+        tokens = 0
+        if self.rate_limiter.enabled:
+            # The last prompt, plus what was appended since, plus max_tokens
+            tokens = (
+                self._prompt_tokens
+                + estimate_tokens(len(str(messages[-1]["content"])))
+                + self.settings.max_tokens
+            )
+        
+        def before_attempt(kind: str) -> float:
+            turn = self.last_turn_stats
+            turn.api_calls += 1
+            turn.retries += kind == "retry"
+            turn.hedges += kind == "hedge"
+            if not tokens:
+                return 0.0
+            self._reserved_tokens += tokens
+            delay = self.rate_limiter.reserve(tokens)
+            if kind != "hedge":
+                turn.rate_limit_wait += delay
+            return delay
+        
+        return before_attempt
+    
+    def _record_api_time(self, started: float) -> None:
+        """Add the time since started to the turn's time waiting on the API"""
+        elapsed = time.perf_counter() - started
+        self.last_turn_stats.api_time += elapsed
+        if metrics.enabled:
+            metrics.record_api_call(elapsed)
+    
+    def _mark_first_token(self) -> None:
+        """Record time-to-first-token the first time text reaches the user"""
+        stats = self.last_turn_stats
+        if stats.time_to_first_token is None:
+            stats.time_to_first_token = time.perf_counter() - self._turn_started
+            if self.enable_logging:
+                agent_logger.debug(
+                    "Time to first token: %.0fms", stats.time_to_first_token * 1000
+                )
+    
+    def _record_usage(self, response: Any) -> None:
+        """Add a response's token usage, including prompt cache hits, to the turn"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        
+        stats = self.last_turn_stats
+        cache_creation = getattr(usage, "cache_creation_input_tokens", None) or 0
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        stats.input_tokens += usage.input_tokens or 0
+        stats.output_tokens += usage.output_tokens or 0
+        stats.cache_creation_input_tokens += cache_creation
+        stats.cache_read_input_tokens += cache_read
+        
+        self._prompt_tokens = (usage.input_tokens or 0) + cache_creation + cache_read
+        if self._reserved_tokens:
+            # Failed attempts used nothing; the reservation becomes the real usage
+            self.rate_limiter.settle(
+                self._reserved_tokens, self._prompt_tokens + (usage.output_tokens or 0)
+            )
+            self._reserved_tokens = 0
+        
+        if self.enable_logging:
+            agent_logger.debug(
+                "Tokens: %s in, %s out, cache read %s, cache write %s",
+                usage.input_tokens,
+                usage.output_tokens,
+                stats.cache_read_input_tokens,
+                stats.cache_creation_input_tokens
+            )
+    
+    def _finish_turn(self, response_text: str, completed: bool = True) -> str:
+        """
+        Close the turn: end it in memory, record its stats, stop profiling
+        
+        Args:
+            response_text: The response, passed through
+            completed: False for a turn that was interrupted or abandoned
+                before it produced an answer; it is counted as an error
+            
+        Returns:
+            response_text
+        """
+        self.memory.end_turn()
+        turn = self.last_turn_stats
+        turn.duration = time.perf_counter() - self._turn_started
+        turn.error = turn.error or not completed
+        
+        self.stats.turns += 1
+        self.stats.api_calls += turn.api_calls
+        self.stats.retries += turn.retries
+        self.stats.hedges += turn.hedges
+        if turn.fast_path or turn.turn_cache_hit:
+            self.stats.fast_path_hits += turn.fast_path
+            self.stats.turn_cache_hits += turn.turn_cache_hit
+            self.stats.local_turn_time += turn.duration
+        else:
+            self.stats.model_turns += 1
+            self.stats.model_turn_time += turn.duration
+            self.stats.model_turn_api_calls += turn.api_calls
+            self.stats.terminal_tool_turns += turn.terminal_tool
+            # The context is resent with every API call in the turn
+            self.stats.context_tokens_saved += turn.context_tokens_saved * turn.api_calls
+        if metrics.enabled:
+            metrics.record_turn(turn)
+        if self.profiler is not None:
+            self.profiler.stop(turn)
+        return response_text
+    
+    def _api_error(self, error: Exception) -> str:
+        """Build the response for a failed API call"""
+        self.last_turn_stats.error = True
+        if self.enable_logging:
+            agent_logger.error("API error", exception=error)
+        return f"I encountered an error: {str(error)}"
+    
+    @staticmethod
+    def _get_tool_uses(response: Any) -> list[Any]:
+        """Get the tool_use blocks Claude asked us to run, if any"""
+        if response.stop_reason != "tool_use":
+            return []
+        return [block for block in response.content if block.type == "tool_use"]
+    
+    def _terminal_response(
+        self,
+        user_message: str,
+        iteration: int,
+        tool_uses: list[Any],
+        tool_results: list[dict[str, Any]]
+    ) -> str | None:
+        """
+        Answer the turn from its tool result, skipping the model's summary
+        
+        Only a single successful call to a terminal tool, requested in the
+        first response to a single-step message and using every number the
+        message contains, answers the turn, with the reply the tool
+        rendered; anything else goes back to Claude as usual.
         
-        while iteration < max_iterations:
-            iteration += 1
+        Args:
+            user_message: The user's input
+            iteration: The agent loop iteration that requested the tools
+            tool_uses: The tool_use blocks from that response
+            tool_results: Their tool_result blocks
             
+        Returns:
+            The tool's reply as the response, or None to continue the loop
+        """
+        if not self.use_terminal_tools or iteration != 1 or len(tool_uses) != 1:
+            return None
+        
+        # Only recorded for successful calls to terminal tools
+        reply = self._tool_replies.get(tool_uses[0].id)
+        if reply is None or tool_results[0]["is_error"] or is_multi_step(user_message):
+            return None
+        if not uses_every_number(user_message, tool_uses[0].input):
+            return None
+        
+        self.last_turn_stats.terminal_tool = True
+        if self.enable_logging:
+            agent_logger.debug("Answering from the tool result (terminal tool)")
+            agent_logger.agent_response(reply)
+        return reply
+    
+    def _extract_text(self, response: Any) -> str:
+        """Extract the final text response from Claude's output"""
+        for block in response.content:
+            if hasattr(block, "text"):
+                if self.enable_logging:
+                    agent_logger.agent_response(block.text)
+                return block.text
+        
+        # If we get here, something unexpected happened
+        self.last_turn_stats.error = True
+        if self.enable_logging:
+            agent_logger.error("No text response found in Claude's output")
+        return "I couldn't generate a response."
+    
+    def _max_iterations_reached(self) -> str:
+        """Build the response for a turn that never finished"""
+        self.last_turn_stats.error = True
+        if self.enable_logging:
+            agent_logger.error("Hit max iterations (%d)", self.max_iterations)
+        return "I apologize, but I'm having trouble completing this request."
+    
+    def _run_model_turn(self, user_message: str) -> str:
+        """Run the Claude agent loop for a turn the agent can't answer locally"""
+        messages = self._start_turn(user_message)
+        
+        # Agent loop: may require multiple tool calls
+        for iteration in range(1, self.max_iterations + 1):
             if self.enable_logging:
-                agent_logger.debug(f"Agent loop iteration {iteration}")
+                agent_logger.debug("Agent loop iteration %d", iteration)
             
+            started = time.perf_counter()
             try:
-                response = self.client.messages.create(
-                    model=settings.model_name,
-                    max_tokens=settings.max_tokens,
-                    temperature=settings.temperature,
-                    system=self.system_prompt,
-                    tools=self.tool_definitions,
-                    messages=messages
+                response = self.retry_policy.call(
+                    self.client.messages.create,
+                    self._request_params(messages),
+                    self._before_attempts(messages)
                 )
             except Exception as e:
-                error_msg = f"API error: {e}"
-                if self.enable_logging:
-                    agent_logger.error(error_msg, e)
-                return f"I encountered an error: {str(e)}"
+                return self._api_error(e)
+            finally:
+                self._record_api_time(started)
+            
+            self._record_usage(response)
             
-            # Check if Claude wants to use a tool
-            if response.stop_reason == "tool_use":
-                # Find the tool use block
-                tool_use = None
-                for block in response.content:
-                    if block.type == "tool_use":
-                        tool_use = block
-                        break
+            # Run every tool_use block from this response in one step
+            tool_uses = self._get_tool_uses(response)
+            if tool_uses:
+                tool_results = self._execute_tool_uses(tool_uses)
+                terminal = self._terminal_response(
+                    user_message, iteration, tool_uses, tool_results
+                )
+                if terminal is not None:
+                    return terminal
                 
-                if tool_use:
-                    if self.enable_logging:
-                        agent_logger.tool_call(tool_use.name, tool_use.input)
-                    
-                    # Get the tool
-                    tool = self._get_tool_by_name(tool_use.name)
-                    if not tool:
-                        error_msg = f"Unknown tool {tool_use.name}"
-                        if self.enable_logging:
-                            agent_logger.error(error_msg)
-                        
-                        # IMPORTANT: Send error back as tool_result
-                        messages.append({"role": "assistant", "content": response.content})
-                        messages.append({
-                            "role": "user",
-                            "content": [{
-                                "type": "tool_result",
-                                "tool_use_id": tool_use.id,
-                                "content": error_msg,
-                                "is_error": True
-                            }]
-                        })
-                        continue
-                    
-                    # Execute the tool
-                    from ..models.schemas import (
-                        MathOperationInput,
-                        SaveResultInput,
-                        RecallResultInput
-                    )
-                    
-                    try:
-                        # Map input based on tool type
-                        if tool.name in ["add_numbers", "multiply_numbers", "subtract_numbers", 
-                                       "divide_numbers", "power_numbers"]:
-                            tool_input = MathOperationInput(**tool_use.input)
-                        elif tool.name == "save_result":
-                            tool_input = SaveResultInput(**tool_use.input)
-                        elif tool.name == "recall_result":
-                            tool_input = RecallResultInput(**tool_use.input)
-                        
-                        # Execute
-                        result = tool.execute(tool_input)
-                        
-                        if self.enable_logging:
-                            agent_logger.tool_result(
-                                tool.name, 
-                                result.success, 
-                                result.message
-                            )
-                        
-                        # Add tool result to messages
-                        messages.append({"role": "assistant", "content": response.content})
-                        messages.append({
-                            "role": "user",
-                            "content": [{
-                                "type": "tool_result",
-                                "tool_use_id": tool_use.id,
-                                "content": result.message,
-                                "is_error": not result.success  # Mark if tool failed
-                            }]
-                        })
-                        
-                    except Exception as e:
-                        # Handle tool execution errors
-                        error_msg = f"Tool execution failed: {e}"
-                        if self.enable_logging:
-                            agent_logger.error(error_msg, e)
-                        
-                        # Send error back as tool_result
-                        messages.append({"role": "assistant", "content": response.content})
-                        messages.append({
-                            "role": "user",
-                            "content": [{
-                                "type": "tool_result",
-                                "tool_use_id": tool_use.id,
-                                "content": error_msg,
-                                "is_error": True
-                            }]
-                        })
-                    
-                    # Continue the loop - Claude will process the result
-                    continue
+                # Add all tool results to messages in a single user turn
+                messages.append({"role": "assistant", "content": response.content})
+                messages.append({"role": "user", "content": tool_results})
+                
+                # Continue the loop - Claude will process the results
+                continue
             
             # No more tool calls - extract final response
-            for block in response.content:
-                if hasattr(block, "text"):
-                    if self.enable_logging:
-                        agent_logger.agent_response(block.text)
-                    return block.text
-            
-            # If we get here, something unexpected happened
+            return self._extract_text(response)
+        
+        return self._max_iterations_reached()
+    
+    def _stream_model_turn(self, user_message: str) -> Iterator[str]:
+        """Streaming version of _run_model_turn()"""
+        messages = self._start_turn(user_message)
+        emitted_text = False
+        
+        for iteration in range(1, self.max_iterations + 1):
             if self.enable_logging:
-                agent_logger.error("No text response found in Claude's output")
-            return "I couldn't generate a response."
+                agent_logger.debug("Agent loop iteration %d", iteration)
+            
+            params = self._request_params(messages)
+            before_attempt = self._before_attempts(messages)
+            started = time.perf_counter()
+            retries = 0
+            while True:
+                chunks: list[str] = []
+                delay = before_attempt("retry" if retries else "first")
+                if delay > 0:
+                    time.sleep(delay)
+                try:
+                    with self.client.messages.stream(**params) as stream:
+                        for text in stream.text_stream:
+                            if not chunks and emitted_text:
+                                # Separate text from earlier loop iterations
+                                yield "\n\n"
+                            self._mark_first_token()
+                            chunks.append(text)
+                            yield text
+                        response = stream.get_final_message()
+                    break
+                except Exception as e:
+                    # Text already shown can't be taken back, so only retry before it
+                    delay = None if chunks else self.retry_policy.backoff(retries, e)
+                    if delay is None:
+                        self._record_api_time(started)
+                        yield self._api_error(e)
+                        return
+                time.sleep(delay)
+                retries += 1
+            self._record_api_time(started)
+            
+            self._record_usage(response)
+            
+            emitted_text = emitted_text or bool(chunks)
+            
+            tool_uses = self._get_tool_uses(response)
+            if tool_uses:
+                tool_results = self._execute_tool_uses(tool_uses)
+                terminal = self._terminal_response(
+                    user_message, iteration, tool_uses, tool_results
+                )
+                if terminal is not None:
+                    if emitted_text:
+                        yield "\n\n"
+                    self._mark_first_token()
+                    yield terminal
+                    return
+                messages.append({"role": "assistant", "content": response.content})
+                messages.append({"role": "user", "content": tool_results})
+                continue
+            
+            if not emitted_text:
+                self._mark_first_token()
+                yield self._extract_text(response)
+            elif self.enable_logging:
+                agent_logger.agent_response("".join(chunks))
+            return
         
-        # Hit max iterations
-        if self.enable_logging:
-            agent_logger.error(f"Hit max iterations ({max_iterations})")
-        return "I apologize, but I'm having trouble completing this request."
+        yield self._max_iterations_reached()
+    
+    def run(self, user_message: str) -> str:
+        """
+        Run the agent with a user message
+        
+        Args:
+            user_message: The user's input
+            
+        Returns:
+            The agent's response
+        """
+        self._begin_turn(user_message)
+        response = None
+        try:
+            response = self._answer_locally(user_message)
+            if response is None:
+                self._start_recording()
+                try:
+                    response = self._run_model_turn(user_message)
+                finally:
+                    operations = self._stop_recording()
+                self._store_turn(response, operations)
+        finally:
+            # Also on KeyboardInterrupt, so memory and stats never stay mid-turn
+            self._finish_turn(response or "", completed=response is not None)
+        return response
+    
+    def run_stream(self, user_message: str) -> Iterator[str]:
+        """
+        Run the agent with a user message, streaming the response
+        
+        Text deltas are yielded as soon as they arrive. Tool calls requested
+        mid-stream are executed and the loop continues with a new stream.
+        Time-to-first-token is recorded in last_turn_stats. A consumer that
+        stops iterating early still ends the turn, when the generator is
+        closed; the turn is then counted as an error and not cached.
+        
+        Args:
+            user_message: The user's input
+            
+        Yields:
+            Chunks of the agent's response
+        """
+        self._begin_turn(user_message)
+        finished = False
+        try:
+            response = self._answer_locally(user_message)
+            if response is not None:
+                self._mark_first_token()
+                finished = True
+                yield self._finish_turn(response)
+                return
+            
+            chunks: list[str] = []
+            self._start_recording()
+            try:
+                for chunk in self._stream_model_turn(user_message):
+                    chunks.append(chunk)
+                    yield chunk
+            finally:
+                operations = self._stop_recording()
+            self._store_turn("".join(chunks), operations)
+            finished = True
+            self._finish_turn("")
+        finally:
+            if not finished:  # Interrupted, or closed by the consumer
+                self._finish_turn("", completed=False)
     
     def get_conversation_history(self) -> list[str]:
         """Get the conversation history"""
         return self.memory.get_history()
     
-    def get_saved_results(self) -> dict:
-        """Get all saved results"""
-        results = self.memory.list_saved_results()
-        return {name: result.value for name, result in results.items()}
+    def iter_conversation_history(self) -> Iterator[str]:
+        """Iterate over the conversation history without copying it"""
+        return self.memory.iter_history()
+    
+    def get_saved_results(self) -> Mapping[str, float]:
+        """Get all saved results as a read-only name -> value view"""
+        return self.memory.saved_values()
     
     def clear_memory(self) -> None:
         """Clear all memory"""
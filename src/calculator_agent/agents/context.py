@@ -0,0 +1,126 @@
+"""Size-capped context message describing the memory state sent to Claude"""
+import re
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from ..state.memory import Memory
+
+_WORD = re.compile(r"[A-Za-z_]\w*")
+
+# Rough size of a token for numbers and identifiers; close enough for a budget
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text_length: int) -> int:
+    """Estimate the number of tokens in a string of the given length"""
+    return -(-text_length // CHARS_PER_TOKEN)
+
+
+class ContextMessage(NamedTuple):
+    """The context line for a turn and what the budget saved"""
+    text: str
+    tokens: int
+    tokens_saved: int
+
+
+class ContextBuilder:
+    """
+    Builds the "Context: ..." line prepended to messages sent to Claude
+
+    While every saved result fits in the token budget, the full listing is
+    cached. New saves are appended to it; it is only rebuilt when a result
+    is overwritten or memory is cleared. Over budget, it lists the names
+    the message mentions, then alternates between the most recently saved
+    and the most used names until the budget is spent; Claude can still
+    fetch any other name with recall_result.
+    """
+
+    def __init__(self, memory: "Memory", token_budget: int = 500):
+        self.memory = memory
+        self.token_budget = token_budget
+        self._full_listing: Optional[str] = None
+        self._full_listing_version = -1
+        self._full_listing_rewrite_version = -1
+        self._full_listing_count = 0  # Saved results in the cached listing
+
+    def build(self, user_message: str) -> ContextMessage:
+        """Build the context for a message, or an empty one if memory is empty"""
+        context_parts = []
+
+        last_result = self.memory.get_last_result()
+        if last_result is not None:
+            context_parts.append(f"Most recent calculation result: {last_result}")
+
+        store = self.memory.saved_results
+        full_length = store.context_length()
+        tokens_saved = 0
+        if len(store):
+            budget_chars = self.token_budget * CHARS_PER_TOKEN
+            if full_length <= budget_chars:
+                context_parts.append(f"Saved results: {self._listing()}")
+            else:
+                listing, shown = self._select(user_message, budget_chars)
+                context_parts.append(
+                    f"Saved results ({shown} of {len(store)} shown, "
+                    f"use recall_result for others): {listing}"
+                )
+                tokens_saved = estimate_tokens(full_length) - estimate_tokens(len(listing))
+
+        if not context_parts:
+            return ContextMessage("", 0, 0)
+        text = "Context: " + " | ".join(context_parts)
+        return ContextMessage(text, estimate_tokens(len(text)), max(tokens_saved, 0))
+
+    def _listing(self) -> str:
+        """Every saved result, extended with new saves or rebuilt on overwrites"""
+        store = self.memory.saved_results
+        if self._full_listing_version == store.version:
+            return self._full_listing
+
+        start = 0
+        if self._full_listing_rewrite_version == store.rewrite_version:
+            start = self._full_listing_count  # Only names were added since
+        added = ", ".join(
+            [f"{name}={value}" for name, value in store.iter_items(start)]
+        )
+        if start and added:
+            self._full_listing = f"{self._full_listing}, {added}"
+        elif not start:
+            self._full_listing = added
+        self._full_listing_version = store.version
+        self._full_listing_rewrite_version = store.rewrite_version
+        self._full_listing_count = len(store)
+        return self._full_listing
+
+    def _select(self, user_message: str, budget_chars: int) -> tuple[str, int]:
+        """Pick referenced, then recent and frequently used names within budget"""
+        store = self.memory.saved_results
+        # Every fragment plus its separator is at least 5 characters
+        limit = budget_chars // 5 + 1
+
+        referenced = [word for word in _WORD.findall(user_message) if word in store]
+        recent = store.most_recent(limit)
+        frequent = store.most_used(limit)
+        alternating = [name for pair in zip(recent, frequent) for name in pair]
+        alternating += recent[len(frequent):] + frequent[len(recent):]
+
+        selected: dict[str, str] = {}
+        used = 0
+        for name in referenced:
+            if name not in selected:
+                fragment = f"{name}={store.peek(name)}"
+                selected[name] = fragment
+                used += len(fragment) + 2
+
+        for name in alternating:
+            if name in selected:
+                continue
+            fragment = f"{name}={store.peek(name)}"
+            if used + len(fragment) + 2 > budget_chars:
+                break
+            selected[name] = fragment
+            used += len(fragment) + 2
+
+        # Keep save order so the listing reads the same from turn to turn
+        names = sorted(selected, key=store.slot)
+        return ", ".join([selected[name] for name in names]), len(names)
@@ -0,0 +1,204 @@
+"""Local intent parser that answers simple requests without calling Claude"""
+import re
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
+from ..models.schemas import (
+    MathOperationInput,
+    RecallResultInput,
+    SaveResultInput,
+    ToolInput
+)
+
+if TYPE_CHECKING:
+    from ..state.memory import Memory
+
+
+class FastPathIntent(NamedTuple):
+    """A tool call recognized directly from the user's message"""
+    tool_name: str
+    tool_input: ToolInput
+
+
+# A number, a reference to the last result, or a saved result name
+_OPERAND = (
+    r"-?(?:\d+(?:,\d{3})*(?:\.\d+)?|\.\d+)"
+    r"|the\s+(?:last\s+|previous\s+)?(?:result|answer)"
+    r"|that|it|this"
+    r"|[A-Za-z_]\w*"
+)
+_A = rf"(?P<a>{_OPERAND})"
+_B = rf"(?P<b>{_OPERAND})"
+_NAME = r"[\"']?(?P<name>[A-Za-z_]\w*)[\"']?"
+
+_LAST_RESULT_REFERENCES = re.compile(
+    r"that|it|this|the\s+(?:last\s+|previous\s+)?(?:result|answer)", re.IGNORECASE
+)
+
+# Leading filler that never changes the meaning of the request
+_PREFIX = re.compile(
+    r"^(?:(?:what(?:'s|\s+is|\s+was)|whats|calculate|compute|how\s+much\s+is"
+    r"|please|can\s+you|could\s+you|tell\s+me|now)\s+)+",
+    re.IGNORECASE
+)
+
+
+def _pattern(regex: str) -> re.Pattern:
+    """Compile a case-insensitive fast path pattern"""
+    return re.compile(regex, re.IGNORECASE)
+
+
+# (pattern, tool name, fixed exponent) - every pattern must match the whole message
+_MATH_PATTERNS: list[tuple[re.Pattern, str, Optional[float]]] = [
+    (_pattern(rf"{_A}\s*(?:\+|plus)\s*{_B}"), "add_numbers", None),
+    (_pattern(rf"add\s+{_A}\s+(?:and|to|plus)\s+{_B}"), "add_numbers", None),
+    (_pattern(rf"(?:the\s+)?sum\s+of\s+{_A}\s+and\s+{_B}"), "add_numbers", None),
+    (_pattern(rf"{_A}\s*(?:-|minus)\s*{_B}"), "subtract_numbers", None),
+    (_pattern(rf"subtract\s+{_B}\s+from\s+{_A}"), "subtract_numbers", None),
+    (_pattern(rf"{_A}\s*(?:\*|×|times|multiplied\s+by)\s*{_B}"), "multiply_numbers", None),
+    (_pattern(rf"multiply\s+{_A}\s+(?:by|and|with|times)\s+{_B}"), "multiply_numbers", None),
+    (_pattern(rf"(?:the\s+)?product\s+of\s+{_A}\s+and\s+{_B}"), "multiply_numbers", None),
+    (_pattern(rf"{_A}\s*(?:/|÷|divided\s+by)\s*{_B}"), "divide_numbers", None),
+    (_pattern(rf"divide\s+{_A}\s+by\s+{_B}"), "divide_numbers", None),
+    (
+        _pattern(
+            rf"{_A}\s*(?:\^|\*\*|to\s+the\s+power\s+of"
+            rf"|raised\s+to(?:\s+the\s+power\s+of)?)\s*{_B}"
+        ),
+        "power_numbers",
+        None
+    ),
+    (_pattern(rf"raise\s+{_A}\s+to\s+(?:the\s+power\s+of\s+)?{_B}"), "power_numbers", None),
+    (_pattern(rf"{_A}\s+squared"), "power_numbers", 2.0),
+    (_pattern(rf"square\s+{_A}"), "power_numbers", 2.0),
+    (_pattern(rf"{_A}\s+cubed"), "power_numbers", 3.0),
+    (_pattern(rf"cube\s+{_A}"), "power_numbers", 3.0),
+]
+
+_SAVE_PATTERN = _pattern(rf"(?:save|store|remember)\s+{_A}\s+(?:as|under|to)\s+{_NAME}")
+_RECALL_PATTERN = _pattern(rf"(?:(?:recall|get|show(?:\s+me)?)\s+)?{_NAME}")
+
+
+def _resolve_operand(token: str, memory: "Memory") -> Optional[float]:
+    """Turn an operand into a number, or None if it can't be resolved"""
+    if _LAST_RESULT_REFERENCES.fullmatch(token):
+        return memory.get_last_result()
+
+    if token[0].isalpha() or token[0] == "_":
+        return memory.peek_saved_value(token)
+
+    return float(token.replace(",", ""))
+
+
+def parse_intent(user_message: str, memory: "Memory") -> Optional[FastPathIntent]:
+    """
+    Recognize a single calculation, save or recall in the user's message
+
+    Only messages that match a known pattern in full, and whose operands
+    all resolve, are accepted; anything else returns None so the agent
+    falls back to Claude.
+
+    Args:
+        user_message: The user's input
+        memory: Memory used to resolve "that", "it" and saved names
+
+    Returns:
+        The tool call to run, or None if the parser isn't confident
+    """
+    message = _PREFIX.sub("", user_message.strip().rstrip("?.! ")).strip()
+    if not message:
+        return None
+
+    for pattern, tool_name, exponent in _MATH_PATTERNS:
+        match = pattern.fullmatch(message)
+        if match is None:
+            continue
+
+        a = _resolve_operand(match.group("a"), memory)
+        b = exponent if exponent is not None else _resolve_operand(match.group("b"), memory)
+        if a is None or b is None:
+            return None
+        return FastPathIntent(tool_name, MathOperationInput(a=a, b=b))
+
+    match = _SAVE_PATTERN.fullmatch(message)
+    if match is not None:
+        value = _resolve_operand(match.group("a"), memory)
+        if value is None:
+            return None
+        return FastPathIntent(
+            "save_result", SaveResultInput(name=match.group("name"), value=value)
+        )
+
+    match = _RECALL_PATTERN.fullmatch(message)
+    if match is not None:
+        name = match.group("name")
+        if _LAST_RESULT_REFERENCES.fullmatch(name) or memory.peek_saved_value(name) is None:
+            return None
+        return FastPathIntent("recall_result", RecallResultInput(name=name))
+
+    return None
+
+
+# Words that chain steps, and operations; a message with either of the first
+# or more than one of the second may need the model after the first tool call
+_SEQUENCE = _pattern(r"\b(?:then|after(?:wards)?|next|also|finally)\b|;")
+# Requests no single two-operand tool call answers, whatever the operands
+_DERIVED = _pattern(
+    r"\b(?:average|mean|median|convert\w*|percent\w*|celsius|fahrenheit"
+    r"|kelvin|degrees?)\b|%"
+)
+_OPERATION = _pattern(
+    r"\b(?:add|plus|sum|combine|minus|subtract|less|times|multipl\w*|product"
+    r"|divid\w*|over|power|square[ds]?|cube[ds]?|root"
+    r"|save|store|remember|recall)\b"
+    r"|\*\*|[+*/^×÷]|\s-\s"
+)
+
+
+# A number written in the message, not part of a name like x2
+_NUMBER = re.compile(r"(?<![\w.])(?:\d+(?:,\d{3})*(?:\.\d+)?|\.\d+)")
+
+
+def _numbers(text: str) -> list[float]:
+    """Every unsigned number written in text"""
+    return [float(number.replace(",", "")) for number in _NUMBER.findall(text)]
+
+
+def is_multi_step(user_message: str) -> bool:
+    """
+    Whether the message may ask for more than one operation
+
+    Errs towards True: a False answer lets the agent answer from the first
+    tool result without asking the model whether anything is left to do.
+
+    Args:
+        user_message: The user's input
+
+    Returns:
+        True if the message chains steps, names several operations or a
+        derived one (average, conversion, percentage), or has more than two
+        numbers
+    """
+    if _SEQUENCE.search(user_message) or _DERIVED.search(user_message):
+        return True
+    if len(_numbers(user_message)) > 2:
+        return True
+    return len(_OPERATION.findall(user_message)) > 1
+
+
+def uses_every_number(user_message: str, tool_input: dict[str, Any]) -> bool:
+    """
+    Whether every number in the message is an operand of the tool call
+
+    A call that leaves a number unused only answered part of the message.
+
+    Args:
+        user_message: The user's input
+        tool_input: The raw input of the tool call
+
+    Returns:
+        True if no number in the message is missing from the call's inputs
+    """
+    operands = {
+        abs(float(value)) for value in tool_input.values()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+    return all(number in operands for number in _numbers(user_message))
@@ -0,0 +1,196 @@
+"""Whole-turn response cache keyed on the user message and memory state"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+
+
+class CachedTurn(NamedTuple):
+    """A recorded response and the memory writes the turn made"""
+    response: str
+    operations: list[tuple[str, Any]]
+
+
+class TurnCacheBackend(ABC):
+    """Storage for cached turns, with TTL and size-bound eviction"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Get an unexpired entry, or None"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: dict[str, Any], ttl: float) -> None:
+        """Store an entry that expires after ttl seconds"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every entry"""
+        pass
+
+
+class InMemoryTurnCacheBackend(TurnCacheBackend):
+    """Process-local LRU backend"""
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskTurnCacheBackend(TurnCacheBackend):
+    """SQLite file backend, shared by every process that opens the same path"""
+
+    def __init__(self, path: str, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turn_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS turn_cache_last_used ON turn_cache (last_used)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM turn_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM turn_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE turn_cache SET last_used = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict[str, Any], ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO turn_cache VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self._conn.execute(
+                "DELETE FROM turn_cache WHERE key IN ("
+                "SELECT key FROM turn_cache ORDER BY last_used DESC, rowid DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,)
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM turn_cache")
+            self._conn.commit()
+
+
+def normalize_message(user_message: str) -> str:
+    """Normalize case, whitespace and trailing punctuation of a message"""
+    return " ".join(user_message.lower().split()).rstrip("?.! ")
+
+
+class TurnCache:
+    """
+    Cache of complete agent turns
+
+    Entries are keyed on the normalized user message plus the exact
+    context line the model would be sent with it. The model sees the last
+    result and the saved results listed there whether or not the message
+    names them, so a turn is only replayed against identical memory.
+    """
+
+    def __init__(self, backend: TurnCacheBackend, ttl: float = 3600.0, namespace: str = ""):
+        self.backend = backend
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, user_message: str, context: str) -> str:
+        """
+        Build the cache key for a message
+
+        Args:
+            user_message: The user's input
+            context: The memory context line sent to the model with it
+
+        Returns:
+            A hex digest identifying the turn
+        """
+        fingerprint = json.dumps(
+            [self.namespace, normalize_message(user_message), context]
+        )
+        return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedTurn]:
+        """Look up a turn, counting the hit or miss"""
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedTurn(value["response"], value["operations"])
+
+    def put(self, key: str, turn: CachedTurn) -> None:
+        """Record a completed turn"""
+        self.backend.set(
+            key,
+            {"response": turn.response, "operations": turn.operations},
+            self.ttl
+        )
+
+
+_shared_turn_cache: Optional[TurnCache] = None
+
+
+def get_shared_turn_cache(
+    backend: str, path: str, maxsize: int, ttl: float, namespace: str
+) -> TurnCache:
+    """Get the process-wide turn cache, creating it on first use"""
+    global _shared_turn_cache
+    if _shared_turn_cache is None:
+        if backend == "disk":
+            cache_backend: TurnCacheBackend = DiskTurnCacheBackend(path, maxsize)
+        elif backend == "memory":
+            cache_backend = InMemoryTurnCacheBackend(maxsize)
+        else:
+            raise ValueError(f"Unknown turn cache backend: {backend}")
+        _shared_turn_cache = TurnCache(cache_backend, ttl, namespace)
+    return _shared_turn_cache
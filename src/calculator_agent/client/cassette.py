@@ -0,0 +1,412 @@
+"""Record Messages API exchanges to a file and replay them without a network"""
+import atexit
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import IO, Any, Callable, Optional
+
+from .fake import (
+    FakeAnthropic,
+    FakeAsyncAnthropic,
+    Message,
+    TextBlock,
+    ToolUseBlock,
+    Usage
+)
+
+# Request params that don't change the answer
+_IGNORED_PARAMS = frozenset(
+    {"stream", "metadata", "timeout", "extra_headers", "extra_body"}
+)
+
+# Content block fields the API reads; SDK objects carry more (citations, ...)
+_BLOCK_FIELDS = (
+    "type", "text", "id", "name", "input", "tool_use_id", "content", "is_error"
+)
+
+# Timestamps end up in tool results (recall_result reports when a value was saved)
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?")
+
+_USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+
+class CassetteMiss(LookupError):
+    """A replayed request was never recorded"""
+
+
+def normalize_request(params: dict[str, Any]) -> dict[str, Any]:
+    """
+    The parts of a request that decide the response, as plain JSON data
+
+    Content blocks are reduced to the fields the API reads, cache_control
+    markers are dropped, tool_use ids are renumbered in order of
+    appearance (they are random in recordings) and timestamps are masked,
+    so a replayed turn matches the recorded one.
+    """
+    tool_ids: dict[str, str] = {}
+
+    def plain(value: Any, key: str = "") -> Any:
+        if isinstance(value, dict):
+            return {
+                k: plain(v, k) for k, v in value.items()
+                if k != "cache_control" and v is not None
+            }
+        if isinstance(value, (list, tuple)):
+            return [plain(item) for item in value]
+        if isinstance(value, str):
+            if key in ("id", "tool_use_id") and value.startswith("toolu_"):
+                return tool_ids.setdefault(value, f"toolu_{len(tool_ids)}")
+            return _TIMESTAMP.sub("<time>", value)
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        # A content block object from a previous response
+        return plain({
+            field: getattr(value, field) for field in _BLOCK_FIELDS
+            if getattr(value, field, None) is not None
+        })
+
+    return {k: plain(v, k) for k, v in params.items() if k not in _IGNORED_PARAMS}
+
+
+def request_key(params: dict[str, Any]) -> str:
+    """Hash of the normalized request, the key responses are stored under"""
+    data = json.dumps(
+        normalize_request(params),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+def dump_message(message: Any) -> dict[str, Any]:
+    """A response (SDK or fake) as plain JSON data"""
+    content = []
+    for block in message.content:
+        if block.type == "text":
+            content.append({"type": "text", "text": block.text})
+        elif block.type == "tool_use":
+            content.append({
+                "type": "tool_use",
+                "id": block.id,
+                "name": block.name,
+                "input": block.input,
+            })
+    usage = getattr(message, "usage", None)
+    return {
+        "content": content,
+        "stop_reason": message.stop_reason,
+        "usage": {field: getattr(usage, field, None) or 0 for field in _USAGE_FIELDS},
+    }
+
+
+def load_message(data: dict[str, Any]) -> Message:
+    """Build a response from dump_message() data"""
+    content = [
+        TextBlock(block["text"]) if block["type"] == "text"
+        else ToolUseBlock(block["id"], block["name"], block["input"])
+        for block in data["content"]
+    ]
+    usage = Usage(data["usage"]["input_tokens"], data["usage"]["output_tokens"])
+    usage.cache_creation_input_tokens = data["usage"]["cache_creation_input_tokens"]
+    usage.cache_read_input_tokens = data["usage"]["cache_read_input_tokens"]
+    return Message(content, data["stop_reason"], usage)
+
+
+def _user_message(params: dict[str, Any]) -> Optional[str]:
+    """The user's message if this request starts a turn, without the context line"""
+    messages = params.get("messages") or []
+    if len(messages) != 1 or not isinstance(messages[0].get("content"), str):
+        return None
+    content = messages[0]["content"]
+    if content.startswith("Context: "):
+        return content.rpartition("\n\nUser: ")[2]
+    return content
+
+
+class Cassette:
+    """
+    Recorded request/response pairs, stored as JSON lines
+
+    Each line holds a request key, the response and how long it took; the
+    first request of a turn also records the session and the user's
+    message, so whole sessions can be replayed (see sessions()). Paths
+    ending in .gz are gzip-compressed. Recording appends to the file.
+
+    A key recorded several times is replayed in recorded order, starting
+    over once every recording has been served, so one capture can be
+    replayed by many concurrent users.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._responses: dict[str, list[tuple[dict[str, Any], float]]] = defaultdict(list)
+        self._served: dict[str, int] = defaultdict(int)
+        self._turns: list[tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._file: Optional[IO[str]] = None
+        if self.path.exists():
+            self._load()
+
+    def _load(self) -> None:
+        with self._open("rt") as f:
+            try:
+                for line in f:
+                    if line.strip():
+                        self._add(json.loads(line))
+            except EOFError:
+                pass  # A gzip capture still being written; keep what was flushed
+
+    def _open(self, mode: str) -> IO[str]:
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode, encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _add(self, entry: dict[str, Any]) -> None:
+        self._responses[entry["key"]].append((entry["response"], entry["latency"]))
+        if "message" in entry:
+            self._turns.append((entry.get("session", "default"), entry["message"]))
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self._responses.values())
+
+    def record(
+        self,
+        params: dict[str, Any],
+        response: Any,
+        latency: float,
+        session_id: Optional[str] = None
+    ) -> None:
+        """Store a response and append it to the file"""
+        entry: dict[str, Any] = {
+            "key": request_key(params),
+            "latency": round(latency, 4),
+            "response": dump_message(response),
+        }
+        message = _user_message(params)
+        if message is not None:
+            entry["session"] = session_id or "default"
+            entry["message"] = message
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            self._add(entry)
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self._open("at")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def play(self, params: dict[str, Any], latency_scale: float = 1.0) -> Message:
+        """
+        The recorded response to a request
+
+        Its latency attribute is the recorded latency times latency_scale,
+        which the fake client waits before returning it.
+
+        Raises:
+            CassetteMiss: If the request was never recorded
+        """
+        key = request_key(params)
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise CassetteMiss(
+                    f"No recorded response for request {key} in {self.path}"
+                )
+            data, latency = responses[self._served[key] % len(responses)]
+            self._served[key] += 1
+        message = load_message(data)
+        message.latency = latency * latency_scale
+        return message
+
+    def sessions(self) -> dict[str, list[str]]:
+        """The user messages of every recorded session, in order"""
+        sessions: dict[str, list[str]] = {}
+        for session_id, message in self._turns:
+            sessions.setdefault(session_id, []).append(message)
+        return sessions
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _RecordingStream:
+    """Wraps a MessageStream manager, recording the final message"""
+
+    def __init__(self, manager: Any, record: Callable[[Any, float], None]):
+        self._manager = manager
+        self._record = record
+        self._stream: Any = None
+        self._started = 0.0
+
+    def __enter__(self) -> "_RecordingStream":
+        self._started = time.perf_counter()
+        self._stream = self._manager.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> Any:
+        return self._manager.__exit__(*exc_info)
+
+    @property
+    def text_stream(self) -> Any:
+        return self._stream.text_stream
+
+    def get_final_message(self) -> Any:
+        message = self._stream.get_final_message()
+        self._record(message, time.perf_counter() - self._started)
+        return message
+
+
+class _AsyncRecordingStream(_RecordingStream):
+    """Async variant of _RecordingStream"""
+
+    async def __aenter__(self) -> "_AsyncRecordingStream":
+        self._started = time.perf_counter()
+        self._stream = await self._manager.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> Any:
+        return await self._manager.__aexit__(*exc_info)
+
+    async def get_final_message(self) -> Any:
+        message = await self._stream.get_final_message()
+        self._record(message, time.perf_counter() - self._started)
+        return message
+
+
+class RecordingMessages:
+    """messages.create() and messages.stream() of a real client, recorded"""
+
+    def __init__(
+        self,
+        messages: Any,
+        cassette: Cassette,
+        session_id: Optional[str] = None
+    ):
+        self._messages = messages
+        self.cassette = cassette
+        self.session_id = session_id
+
+    def create(self, **params: Any) -> Any:
+        started = time.perf_counter()
+        response = self._messages.create(**params)
+        latency = time.perf_counter() - started
+        self.cassette.record(params, response, latency, self.session_id)
+        return response
+
+    def stream(self, **params: Any) -> _RecordingStream:
+        return _RecordingStream(self._messages.stream(**params), self._recorder(params))
+
+    def _recorder(self, params: dict[str, Any]) -> Callable[[Any, float], None]:
+        return lambda response, latency: self.cassette.record(
+            params, response, latency, self.session_id
+        )
+
+
+class AsyncRecordingMessages(RecordingMessages):
+    """Async variant of RecordingMessages"""
+
+    async def create(self, **params: Any) -> Any:
+        started = time.perf_counter()
+        response = await self._messages.create(**params)
+        latency = time.perf_counter() - started
+        self.cassette.record(params, response, latency, self.session_id)
+        return response
+
+    def stream(self, **params: Any) -> _AsyncRecordingStream:
+        return _AsyncRecordingStream(
+            self._messages.stream(**params), self._recorder(params)
+        )
+
+
+class RecordingClient:
+    """A client whose Messages API calls are recorded; anything else passes through"""
+
+    def __init__(self, client: Any, messages: RecordingMessages):
+        self._client = client
+        self.messages = messages
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def recording_client(
+    client: Any,
+    cassette: Cassette,
+    session_id: Optional[str] = None,
+    asynchronous: bool = False
+) -> RecordingClient:
+    """Wrap a client so its Messages API calls are recorded under session_id"""
+    messages = AsyncRecordingMessages if asynchronous else RecordingMessages
+    return RecordingClient(client, messages(client.messages, cassette, session_id))
+
+
+def replay_client(
+    cassette: Cassette,
+    latency_scale: float = 1.0,
+    asynchronous: bool = False
+) -> FakeAnthropic | FakeAsyncAnthropic:
+    """A network-free client serving a cassette's responses"""
+    fake = FakeAsyncAnthropic if asynchronous else FakeAnthropic
+    return fake(lambda params: cassette.play(params, latency_scale))
+
+
+_cassettes: dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str | Path) -> Cassette:
+    """Get the process-wide cassette for a file, loading it on first use"""
+    key = str(Path(path).resolve())
+    with _cassettes_lock:
+        cassette = _cassettes.get(key)
+        if cassette is None:
+            cassette = _cassettes[key] = Cassette(path)
+        return cassette
+
+
+def reset_cassettes() -> None:
+    """Close and forget the process-wide cassettes"""
+    with _cassettes_lock:
+        cassettes = list(_cassettes.values())
+        _cassettes.clear()
+    for cassette in cassettes:
+        cassette.close()
+
+
+# Finish gzip files, so a capture can be read back after the process exits
+atexit.register(reset_cassettes)
+
+
+def cassette_client(
+    settings: Any,
+    session_id: Optional[str] = None,
+    asynchronous: bool = False
+) -> Any:
+    """
+    The client for CASSETTE_MODE: "record" wraps the shared Anthropic client,
+    "replay" serves CASSETTE_PATH without touching the network
+    """
+    cassette = get_cassette(settings.cassette_path)
+    if settings.cassette_mode == "replay":
+        return replay_client(cassette, settings.cassette_latency_scale, asynchronous)
+    if settings.cassette_mode != "record":
+        raise ValueError(f"Unknown cassette mode: {settings.cassette_mode}")
+
+    from .factory import get_async_client, get_client
+
+    client = get_async_client(settings) if asynchronous else get_client(settings)
+    return recording_client(client, cassette, session_id, asynchronous)
@@ -0,0 +1,164 @@
+"""Process-wide Anthropic clients sharing one tuned HTTP connection pool"""
+import asyncio
+import importlib.util
+import logging
+import threading
+import weakref
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_client: Any = None
+_async_clients: "weakref.WeakKeyDictionary[Any, Any]" = weakref.WeakKeyDictionary()
+_async_client_outside_loop: Any = None
+_clients_lock = threading.Lock()
+
+
+def _get_settings(settings: Any) -> Any:
+    if settings is None:
+        from ..config.settings import get_settings
+
+        settings = get_settings()
+    return settings
+
+
+def http_options(settings: Any = None) -> dict[str, Any]:
+    """
+    Keyword arguments for the SDK's HTTP client, built from settings
+
+    HTTP/2 needs the h2 package; without it the pool falls back to
+    HTTP/1.1 rather than failing on the first request.
+    """
+    # anthropic takes over a second to import, so only load it when needed
+    import anthropic
+
+    settings = _get_settings(settings)
+    # The Limits class of whichever httpx build the SDK was installed with
+    limits_class = type(anthropic.DEFAULT_CONNECTION_LIMITS)
+    http2 = settings.http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+        http2 = False
+    return {
+        "limits": limits_class(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        "timeout": anthropic.Timeout(
+            settings.http_timeout, connect=settings.http_connect_timeout
+        ),
+        "http2": http2,
+    }
+
+
+def create_client(settings: Any = None) -> Any:
+    """Create a new Anthropic client with its own tuned connection pool"""
+    import anthropic
+
+    settings = _get_settings(settings)
+    options = http_options(settings)
+    return anthropic.Anthropic(
+        api_key=settings.anthropic_api_key,
+        timeout=options["timeout"],
+        max_retries=0,  # The agent loop retries, see client/retry.py
+        http_client=anthropic.DefaultHttpxClient(**options),
+    )
+
+
+def create_async_client(settings: Any = None) -> Any:
+    """Create a new AsyncAnthropic client with its own tuned connection pool"""
+    import anthropic
+
+    settings = _get_settings(settings)
+    options = http_options(settings)
+    return anthropic.AsyncAnthropic(
+        api_key=settings.anthropic_api_key,
+        timeout=options["timeout"],
+        max_retries=0,
+        http_client=anthropic.DefaultAsyncHttpxClient(**options),
+    )
+
+
+def get_client(settings: Any = None) -> Any:
+    """Get the process-wide Anthropic client, creating it on first use"""
+    global _client
+    with _clients_lock:
+        if _client is None:
+            _client = create_client(settings)
+        return _client
+
+
+def get_async_client(settings: Any = None) -> Any:
+    """
+    Get the shared AsyncAnthropic client for the running event loop
+
+    Async connections belong to the loop that opened them, so there is one
+    client per loop: everything on a server's loop shares a pool, while
+    separate asyncio.run() calls do not hand each other dead connections.
+    """
+    global _async_client_outside_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _clients_lock:
+        if loop is None:
+            if _async_client_outside_loop is None:
+                _async_client_outside_loop = create_async_client(settings)
+            return _async_client_outside_loop
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = create_async_client(settings)
+        return client
+
+
+def warm_up(settings: Any = None, connections: Optional[int] = None) -> threading.Thread:
+    """
+    Open connections to the API in the background
+
+    Imports the SDK, builds the shared client and sends HEAD requests to the
+    API host, so the DNS lookup and TCP and TLS handshakes are done (and the
+    connections parked in the keep-alive pool) before the first real call.
+    Failures are ignored; the real call will report them. Returns the
+    started daemon thread.
+    """
+    settings = _get_settings(settings)
+    count = connections if connections is not None else settings.http_warmup_connections
+
+    def open_connection(client: Any) -> None:
+        try:
+            client._client.head(str(client.base_url))
+        except Exception as e:
+            logger.debug("Connection warm-up failed: %s", e)
+
+    def run() -> None:
+        try:
+            client = get_client(settings)
+        except Exception as e:
+            logger.debug("Client warm-up failed: %s", e)
+            return
+        # Concurrent requests, or the pool would reuse a single connection
+        threads = [
+            threading.Thread(target=open_connection, args=(client,), daemon=True)
+            for _ in range(max(count, 1))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    thread = threading.Thread(target=run, name="client-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def reset_clients() -> None:
+    """Close and forget the shared clients, e.g. after settings change"""
+    global _client, _async_client_outside_loop
+    with _clients_lock:
+        client, _client = _client, None
+        _async_clients.clear()
+        _async_client_outside_loop = None
+    if client is not None:
+        client.close()
@@ -0,0 +1,257 @@
+"""Offline stand-in for the Anthropic client, for benchmarks and load tests"""
+import asyncio
+import random
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_LAST_RESULT = re.compile(r"Most recent calculation result: (-?[\d.e+-]+)")
+_SAVE = re.compile(r"\bsave\b.*\bas\s+(\w+)")
+_RECALL = re.compile(r"\b(?:recall|what was)\s+(\w+)")
+
+# Operation words a user message may contain, mapped to the tool Claude picks
+_TOOL_WORDS = (
+    ("multipl", "multiply_numbers"),
+    ("times", "multiply_numbers"),
+    ("subtract", "subtract_numbers"),
+    ("minus", "subtract_numbers"),
+    ("divide", "divide_numbers"),
+    ("power", "power_numbers"),
+)
+
+
+class TextBlock:
+    """A text content block"""
+
+    type = "text"
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class ToolUseBlock:
+    """A tool_use content block"""
+
+    type = "tool_use"
+
+    def __init__(self, block_id: str, name: str, tool_input: dict[str, Any]):
+        self.id = block_id
+        self.name = name
+        self.input = tool_input
+
+
+class Usage:
+    """Token usage of a response"""
+
+    def __init__(self, input_tokens: int, output_tokens: int):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+
+
+class Message:
+    """
+    A Messages API response, with the attributes the agent reads
+
+    latency is extra seconds the fake client waits before returning it,
+    e.g. the time a recorded response took.
+    """
+
+    def __init__(
+        self,
+        content: list[Any],
+        stop_reason: str,
+        usage: Usage,
+        latency: float = 0.0
+    ):
+        self.content = content
+        self.stop_reason = stop_reason
+        self.usage = usage
+        self.latency = latency
+
+
+Responder = Callable[[dict[str, Any]], Message]
+
+
+def calculator_responder(params: dict[str, Any]) -> Message:
+    """
+    Answer like Claude would for simple calculator requests
+
+    A new user message gets one tool_use: save_result for "save that as
+    x", recall_result for "what was x", otherwise a math tool picked from
+    words like "times" or "minus" (add by default) applied to the first two
+    numbers, where "that" is the most recent result from the context.
+    Tool results get a one-line text answer quoting them.
+    """
+    messages = params["messages"]
+    content = messages[-1]["content"]
+    # A rough prompt size; the fake has no tokenizer
+    input_tokens = 400 + 30 * len(messages)
+
+    if isinstance(content, list):  # tool_result blocks
+        text = "; ".join(str(block["content"]) for block in content)
+        return Message(
+            [TextBlock(f"The answer is: {text}")], "end_turn", Usage(input_tokens, 20)
+        )
+
+    context, _, question = content.rpartition("User: ")
+    question = question.lower()
+    match = _LAST_RESULT.search(context)
+    last_result = float(match.group(1)) if match else 0.0
+
+    if match := _SAVE.search(question):
+        tool, tool_input = "save_result", {"name": match.group(1), "value": last_result}
+    elif match := _RECALL.search(question):
+        tool, tool_input = "recall_result", {"name": match.group(1)}
+    else:
+        tool = next((name for word, name in _TOOL_WORDS if word in question), "add_numbers")
+        numbers = [float(n) for n in _NUMBER.findall(question)]
+        if "that" in question:
+            numbers.insert(0, last_result)
+        a, b = (numbers + [1.0, 1.0])[:2]
+        tool_input = {"a": a, "b": b}
+    return Message(
+        [ToolUseBlock(f"toolu_{len(messages)}", tool, tool_input)],
+        "tool_use",
+        Usage(input_tokens, 40),
+    )
+
+
+def _text_chunks(response: Message, size: int = 8) -> list[str]:
+    """A response's text split into stream deltas"""
+    return [
+        block.text[i:i + size]
+        for block in response.content if block.type == "text"
+        for i in range(0, len(block.text), size)
+    ]
+
+
+class FakeStream:
+    """Context manager that replays a response's text as stream deltas"""
+
+    def __init__(self, response: Message):
+        self.response = response
+        self.text_stream = _text_chunks(response)
+
+    def __enter__(self) -> "FakeStream":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> bool:
+        return False
+
+    def get_final_message(self) -> Message:
+        return self.response
+
+
+class AsyncFakeStream:
+    """Async variant of FakeStream"""
+
+    def __init__(self, response: Message):
+        self.response = response
+        self.text_stream = self._deltas(_text_chunks(response))
+
+    @staticmethod
+    async def _deltas(chunks: list[str]) -> AsyncIterator[str]:
+        for chunk in chunks:
+            yield chunk
+
+    async def get_final_message(self) -> Message:
+        return self.response
+
+
+class FakeMessages:
+    """
+    messages.create() and messages.stream() served by a responder
+
+    Each call waits latency seconds plus up to jitter more (uniformly, from
+    a seeded generator) to stand in for the network and the model.
+    """
+
+    def __init__(
+        self,
+        responder: Responder = calculator_responder,
+        latency: float = 0.0,
+        jitter: float = 0.0
+    ):
+        self.responder = responder
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+
+    def _delay(self) -> float:
+        """Count a call and pick how long it takes"""
+        with self._lock:
+            self.calls += 1
+            if not self.jitter:
+                return self.latency
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def _respond(self, params: dict[str, Any]) -> tuple[Message, float]:
+        """The response to a call and how long to wait before returning it"""
+        response = self.responder(params)
+        return response, self._delay() + getattr(response, "latency", 0.0)
+
+    def create(self, **params: Any) -> Message:
+        response, delay = self._respond(params)
+        if delay:
+            time.sleep(delay)
+        return response
+
+    def stream(self, **params: Any) -> FakeStream:
+        response, delay = self._respond(params)
+        if delay:
+            time.sleep(delay)
+        return FakeStream(response)
+
+
+class FakeAsyncMessages(FakeMessages):
+    """Async variant; waiting doesn't block the event loop"""
+
+    async def create(self, **params: Any) -> Message:
+        response, delay = self._respond(params)
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+
+    @asynccontextmanager
+    async def stream(self, **params: Any) -> AsyncIterator[AsyncFakeStream]:
+        response, delay = self._respond(params)
+        if delay:
+            await asyncio.sleep(delay)
+        yield AsyncFakeStream(response)
+
+
+class FakeAnthropic:
+    """Drop-in for Anthropic() in an agent: agent.client = FakeAnthropic()"""
+
+    def __init__(
+        self,
+        responder: Responder = calculator_responder,
+        latency: float = 0.0,
+        jitter: float = 0.0
+    ):
+        self.messages = FakeMessages(responder, latency, jitter)
+
+
+class FakeAsyncAnthropic:
+    """Drop-in for AsyncAnthropic() in an AsyncCalculatorAgent"""
+
+    def __init__(
+        self,
+        responder: Responder = calculator_responder,
+        latency: float = 0.0,
+        jitter: float = 0.0
+    ):
+        self.messages = FakeAsyncMessages(responder, latency, jitter)
+
+
+def scripted(responses: Iterable[Message]) -> Responder:
+    """A responder that returns the given responses in order"""
+    remaining: Iterator[Message] = iter(responses)
+    return lambda params: next(remaining)
@@ -0,0 +1,103 @@
+"""Client-side rate limiting shared by every agent in the process"""
+import threading
+import time
+from typing import Any, Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at per_minute / 60 per second
+
+    reserve() never blocks: it takes the tokens straight away, letting the
+    balance go negative, and returns how long the caller must wait before
+    using them. Callers sleep with time.sleep() or asyncio.sleep() as suits
+    them, and waiting callers are served in the order they reserved.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take amount tokens; returns the seconds to wait before using them"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def adjust(self, amount: float) -> None:
+        """Take extra tokens (positive) or give unused ones back (negative)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for the Messages API
+
+    A request reserves one request and its estimated tokens (input plus
+    max_tokens, which is how the API counts output against its limits up
+    front). Once the response arrives, settle() corrects the token bucket
+    with the real usage. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.waited = 0.0  # Total seconds callers were asked to wait
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one request of about tokens; returns the seconds to wait"""
+        delay = 0.0
+        if self.requests is not None:
+            delay = self.requests.reserve(1)
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(tokens))
+        self.waited += delay
+        return delay
+
+    def settle(self, reserved: int, used: int) -> None:
+        """Replace a request's estimated tokens with what it really used"""
+        if self.tokens is not None and used != reserved:
+            self.tokens.adjust(used - reserved)
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter(settings: Any = None) -> RateLimiter:
+    """Get the process-wide rate limiter, configured from settings on first use"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            if settings is None:
+                from ..config.settings import get_settings
+
+                settings = get_settings()
+            _limiter = RateLimiter(
+                settings.rate_limit_requests_per_minute,
+                settings.rate_limit_tokens_per_minute,
+            )
+        return _limiter
+
+
+def reset_rate_limiter() -> None:
+    """Forget the process-wide limiter, e.g. after settings change"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
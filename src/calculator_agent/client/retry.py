@@ -0,0 +1,235 @@
+"""Retries with jittered exponential backoff, and hedged requests"""
+import asyncio
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+
+# Request timeout, lock timeout, rate limited, and the API's overloaded 529
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+# Called before every attempt with "first", "retry" or "hedge"; returns the
+# seconds to wait before sending it (e.g. for a rate limiter)
+BeforeAttempt = Callable[[str], float]
+
+_hedge_executor: ThreadPoolExecutor | None = None
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    """Get the process-wide thread pool that runs hedged sync requests"""
+    global _hedge_executor
+    if _hedge_executor is None:
+        _hedge_executor = ThreadPoolExecutor(thread_name_prefix="calculator-hedge")
+    return _hedge_executor
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an API error is transient: overload, rate limit, 5xx or network"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    anthropic = sys.modules.get("anthropic")  # Only loaded once Claude is called
+    return anthropic is not None and isinstance(error, anthropic.APIConnectionError)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait, from retry-after(-ms) headers"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    How the agent loop survives 429s, 529s and slow requests
+
+    Transient errors are retried up to max_retries times with "full jitter"
+    backoff: a random delay up to base_delay * 2**attempt, capped at
+    max_delay, so sessions rejected together don't retry together. A
+    retry-after header from the server takes precedence, but is capped at
+    max_delay too.
+
+    With hedge_after set, a request that hasn't answered within that many
+    seconds is sent a second time and whichever response arrives first is
+    used. This trims tail latency at the cost of some duplicate requests.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        hedge_after: Optional[float] = None
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after or None
+
+    @classmethod
+    def from_settings(cls, settings: Any) -> "RetryPolicy":
+        """Build the policy from the API_* settings"""
+        return cls(
+            max_retries=settings.api_max_retries,
+            base_delay=settings.api_retry_base_delay,
+            max_delay=settings.api_retry_max_delay,
+            hedge_after=settings.api_hedge_after,
+        )
+
+    def backoff(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        Seconds to wait before retrying after a failed attempt
+
+        Args:
+            attempt: How many retries have already been made
+            error: The exception the attempt raised
+
+        Returns:
+            The delay, or None if the error should not be retried
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(
+        self,
+        create: Callable[..., Any],
+        params: dict[str, Any],
+        before_attempt: Optional[BeforeAttempt] = None
+    ) -> Any:
+        """
+        Call create(**params), retrying transient errors
+
+        The same params (and so the same messages list) are sent on every
+        attempt; nothing is rebuilt between retries.
+        """
+        attempt = 0
+        kind = "first"
+        while True:
+            if before_attempt is not None:
+                delay = before_attempt(kind)
+                if delay > 0:
+                    time.sleep(delay)
+            try:
+                if self.hedge_after is None:
+                    return create(**params)
+                return self._hedged_call(create, params, before_attempt)
+            except Exception as e:
+                delay = self.backoff(attempt, e)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+            kind = "retry"
+
+    def _hedged_call(
+        self,
+        create: Callable[..., Any],
+        params: dict[str, Any],
+        before_attempt: Optional[BeforeAttempt]
+    ) -> Any:
+        """Send the request, and again if it is slow; first success wins"""
+        executor = _get_hedge_executor()
+        primary = executor.submit(create, **params)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        if before_attempt is not None:
+            before_attempt("hedge")  # Counted, but a hedge doesn't wait its turn
+        pending = {primary, executor.submit(create, **params)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()  # Too late if already running; result ignored
+                    return future.result()
+                error = error or future.exception()
+        raise error
+
+    async def acall(
+        self,
+        create: Callable[..., Awaitable[Any]],
+        params: dict[str, Any],
+        before_attempt: Optional[BeforeAttempt] = None
+    ) -> Any:
+        """Async version of call(); hedges are tasks cancelled when they lose"""
+        attempt = 0
+        kind = "first"
+        while True:
+            if before_attempt is not None:
+                delay = before_attempt(kind)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                if self.hedge_after is None:
+                    return await create(**params)
+                return await self._ahedged_call(create, params, before_attempt)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = self.backoff(attempt, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            kind = "retry"
+
+    async def _ahedged_call(
+        self,
+        create: Callable[..., Awaitable[Any]],
+        params: dict[str, Any],
+        before_attempt: Optional[BeforeAttempt]
+    ) -> Any:
+        """Async version of _hedged_call(); the losing request is cancelled"""
+        primary = asyncio.ensure_future(create(**params))
+        pending: set[asyncio.Future] = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if done:
+                return primary.result()
+
+            if before_attempt is not None:
+                before_attempt("hedge")
+            pending.add(asyncio.ensure_future(create(**params)))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -1,14 +1,60 @@
 """Configuration settings for the calculator agent"""
+from functools import lru_cache
+from typing import Any, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment"""
     
-    anthropic_api_key: str
+    anthropic_api_key: Optional[str] = None  # Only needed once Claude is called
     model_name: str = "claude-sonnet-4-20250514"
     max_tokens: int = 1024
     temperature: float = 0.0  # Deterministic for math
+    max_tool_workers: int = 4  # Threads for parallel tool_use blocks
+    turn_timeout: float = 60.0  # Seconds before an async turn is abandoned
+    prompt_caching: bool = True  # cache_control breakpoints on tools + system
+    fast_path: bool = True  # Answer simple arithmetic locally, without Claude
+    terminal_tools: bool = False  # Answer single-tool turns from the tool result
+    tool_cache: bool = True  # Memoize math tool results
+    tool_cache_size: int = 1024  # Max (tool, a, b) entries kept
+    turn_cache: bool = False  # Replay whole turns for repeated questions
+    turn_cache_backend: str = "memory"  # "memory" or "disk"
+    turn_cache_path: str = ".turn_cache.sqlite3"  # Used by the disk backend
+    turn_cache_size: int = 10_000  # Max cached turns
+    turn_cache_ttl: float = 3600.0  # Seconds a cached turn stays valid
+    context_token_budget: int = 500  # Max estimated tokens of saved results in context
+    memory_backend: str = "memory"  # "memory", "sqlite" or "redis"
+    memory_path: str = ".memory.sqlite3"  # Used by the sqlite backend
+    redis_url: str = "redis://localhost:6379/0"  # Used by the redis backend
+    session_id: str = "default"  # Rows in a shared memory database to use
+    max_sessions: int = 10_000  # Sessions the server keeps before evicting
+    session_idle_timeout: float = 3600.0  # Seconds before an idle session is evicted
+    history_size: int = 1000  # History entries kept in memory per session
+    history_spill_path: Optional[str] = None  # Append evicted entries here
+    http_max_connections: int = 100  # Open connections in the shared client pool
+    http_max_keepalive_connections: int = 20  # Idle connections kept for reuse
+    http_keepalive_expiry: float = 30.0  # Seconds an idle connection is kept
+    http_timeout: float = 600.0  # Seconds for a whole API request
+    http_connect_timeout: float = 5.0  # Seconds to open a connection
+    http2: bool = False  # Needs the h2 package; falls back to HTTP/1.1
+    http_warmup: bool = True  # Open connections while the REPL waits for input
+    http_warmup_connections: int = 1  # Connections opened by the warm-up
+    api_max_retries: int = 4  # Retries of 429, 529, 5xx and network errors
+    api_retry_base_delay: float = 0.5  # Seconds; doubles with each retry, jittered
+    api_retry_max_delay: float = 30.0  # Cap on one backoff, retry-after included
+    api_hedge_after: Optional[float] = None  # Resend a request this slow; None disables
+    rate_limit_requests_per_minute: int = 0  # Across every agent; 0 disables
+    rate_limit_tokens_per_minute: int = 0  # Input plus max_tokens; 0 disables
+    metrics: bool = False  # Collect turn, API and tool metrics in process
+    log_level: str = "INFO"  # Agent log level, once logging is enabled
+    log_format: str = "text"  # "text" (colored) or "json" (one object per line)
+    cassette_mode: str = "off"  # "record" or "replay" Messages API exchanges
+    cassette_path: str = ".cassette.jsonl.gz"  # Recorded exchanges; .gz compresses
+    cassette_latency_scale: float = 1.0  # Replay delay as a multiple of the recorded one
+    profile: bool = False  # cProfile every turn (main.py --profile)
+    profile_dir: str = ".profiles"  # Per-turn .prof and .collapsed files
+    profile_top: int = 10  # Hotspots listed in each turn's summary
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -17,5 +63,14 @@ class Settings(BaseSettings):
     )
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings from the environment on first use"""
+    return Settings()
+
+
+def __getattr__(name: str) -> Any:
+    """Keep `from config.settings import settings` working, lazily"""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -22,6 +22,16 @@ class MathOperationInput(ToolInput):
     b: float = Field(description="Second number")
 
 
+class ExpressionInput(ToolInput):
+    """Input for evaluating an arithmetic expression"""
+    expression: str = Field(
+        description=(
+            "Arithmetic expression using numbers, + - * / // % ** and "
+            "parentheses. Saved result names and 'last' can be used as variables."
+        )
+    )
+
+
 class SaveResultInput(ToolInput):
     """Input for saving a result"""
     name: str = Field(description="Name to save the result under")
@@ -38,3 +48,87 @@ class SavedResult(BaseModel):
     name: str
     value: float
     timestamp: str
+
+
+class TurnStats(BaseModel):
+    """Performance numbers recorded for a single agent turn"""
+    correlation_id: Optional[str] = None  # Tags this turn's log lines
+    api_calls: int = 0  # Every request sent, retries and hedges included
+    retries: int = 0  # Requests resent after a transient error
+    hedges: int = 0  # Duplicate requests sent because the first was slow
+    rate_limit_wait: float = 0.0  # Seconds spent waiting for the rate limiter
+    api_time: float = 0.0  # Seconds spent in Messages API calls, retries included
+    fast_path: bool = False  # Answered locally without calling Claude
+    turn_cache_hit: bool = False  # Answered from the turn cache
+    terminal_tool: bool = False  # Answered from a tool result, without a final API call
+    error: bool = False  # Ended with an API error or without an answer
+    time_to_first_token: Optional[float] = None  # Seconds, streaming turns only
+    duration: Optional[float] = None  # Seconds from user message to full response
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    context_tokens: int = 0  # Estimated size of the memory context sent
+    context_tokens_saved: int = 0  # Estimated tokens left out by the budget
+    
+    @property
+    def cache_hit_rate(self) -> float:
+        """Fraction of prompt tokens served from the prompt cache"""
+        prompt_tokens = (
+            self.input_tokens
+            + self.cache_creation_input_tokens
+            + self.cache_read_input_tokens
+        )
+        if not prompt_tokens:
+            return 0.0
+        return self.cache_read_input_tokens / prompt_tokens
+
+
+class AgentStats(BaseModel):
+    """Running totals across every turn an agent has handled"""
+    turns: int = 0
+    api_calls: int = 0
+    retries: int = 0
+    hedges: int = 0
+    fast_path_hits: int = 0
+    turn_cache_hits: int = 0
+    local_turn_time: float = 0.0  # Spent on turns answered without Claude
+    model_turns: int = 0
+    model_turn_time: float = 0.0
+    model_turn_api_calls: int = 0
+    terminal_tool_turns: int = 0  # Model turns answered from a tool result
+    context_tokens_saved: int = 0  # Estimated input tokens, across API calls
+    
+    @property
+    def fast_path_hit_rate(self) -> float:
+        """Fraction of turns answered without calling Claude"""
+        return self.fast_path_hits / self.turns if self.turns else 0.0
+    
+    @property
+    def turn_cache_hit_rate(self) -> float:
+        """Fraction of turns answered from the turn cache"""
+        return self.turn_cache_hits / self.turns if self.turns else 0.0
+    
+    @property
+    def api_calls_saved(self) -> float:
+        """
+        Estimated API calls avoided
+        
+        Each terminal tool turn skipped exactly one call. Local turns are
+        counted at the average calls per model turn, as if every model turn
+        had made that final call.
+        """
+        local_turns = self.fast_path_hits + self.turn_cache_hits
+        if not self.model_turns:
+            return 2.0 * local_turns  # A tool turn needs at least two
+        model_turn_calls = self.model_turn_api_calls + self.terminal_tool_turns
+        return local_turns * model_turn_calls / self.model_turns + self.terminal_tool_turns
+    
+    @property
+    def time_saved(self) -> float:
+        """Estimated seconds saved versus sending local turns to Claude"""
+        if not self.model_turns:
+            return 0.0
+        average_model_turn = self.model_turn_time / self.model_turns
+        local_turns = self.fast_path_hits + self.turn_cache_hits
+        return local_turns * average_model_turn - self.local_turn_time
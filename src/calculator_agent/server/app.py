@@ -0,0 +1,284 @@
+"""ASGI application serving many calculator sessions from one process"""
+import json
+import re
+import time
+from typing import Any, Awaitable, Callable, Optional
+from ..utils.metrics import SnapshotSink, metrics
+from .sessions import SessionManager
+
+Receive = Callable[[], Awaitable[dict[str, Any]]]
+Send = Callable[[dict[str, Any]], Awaitable[None]]
+
+MAX_BODY_SIZE = 64 * 1024
+PROMETHEUS_CONTENT_TYPE = b"text/plain; version=0.0.4; charset=utf-8"
+
+_SESSION_PATH = re.compile(
+    r"^/sessions/(?P<id>[A-Za-z0-9_.:-]{1,128})(?P<rest>/messages|/history)?$"
+)
+
+
+class HTTPError(Exception):
+    """An error response with a status code and a message for the client"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class CalculatorApp:
+    """
+    Minimal ASGI app, so any ASGI server (uvicorn, hypercorn) can host it
+
+    Routes:
+        POST   /sessions/{id}/messages  {"message": "...", "stream": false}
+        GET    /sessions/{id}/history
+        DELETE /sessions/{id}
+        GET    /healthz
+        GET    /metrics
+
+    With "stream": true the reply is a text/event-stream of
+    {"text": chunk} events, ended by an "event: done" carrying turn stats.
+    /metrics answers in the Prometheus text format when the client accepts
+    text/plain (as Prometheus scrapers do), and with JSON otherwise.
+    """
+
+    def __init__(self, sessions: Optional[SessionManager] = None):
+        self.sessions = sessions if sessions is not None else SessionManager()
+        self.started = time.time()
+        self.requests = 0
+        self.in_flight = 0
+        self.errors = 0
+
+    async def __call__(self, scope: dict[str, Any], receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        started = False
+
+        async def tracked_send(message: dict[str, Any]) -> None:
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            await self._route(scope, receive, tracked_send)
+        except Exception as e:
+            if not isinstance(e, HTTPError):
+                self.errors += 1
+                e = HTTPError(500, f"Internal error: {e}")
+            if started:
+                # Too late for a status code; end the stream with the error
+                await send({
+                    "type": "http.response.body",
+                    "body": _event({"error": e.message}, "error"),
+                })
+            else:
+                await _send_json(send, e.status, {"error": e.message})
+        finally:
+            self.in_flight -= 1
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        """Handle server startup and shutdown"""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.sessions.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _route(self, scope: dict[str, Any], receive: Receive, send: Send) -> None:
+        """Dispatch a request to its handler"""
+        method, path = scope["method"], scope["path"]
+
+        if path == "/healthz" and method == "GET":
+            await _send_json(send, 200, {"status": "ok"})
+            return
+        if path == "/metrics" and method == "GET":
+            if _accepts_text(scope):
+                body = self.prometheus_metrics().encode()
+                await _send_body(send, 200, body, PROMETHEUS_CONTENT_TYPE)
+            else:
+                await _send_json(send, 200, self.metrics())
+            return
+
+        match = _SESSION_PATH.match(path)
+        if match is None:
+            raise HTTPError(404, "Not found")
+        session_id, rest = match.group("id"), match.group("rest")
+
+        if rest == "/messages" and method == "POST":
+            body = await _read_json(receive)
+            await self._post_message(session_id, body, send)
+        elif rest == "/history" and method == "GET":
+            session = self.sessions.lookup(session_id)
+            if session is None:
+                raise HTTPError(404, "Unknown session")
+            async with session.use():
+                history = list(session.agent.iter_conversation_history())
+            await _send_json(send, 200, {"session_id": session_id, "history": history})
+        elif rest is None and method == "DELETE":
+            session = self.sessions.lookup(session_id)
+            if session is None:
+                raise HTTPError(404, "Unknown session")
+            async with session.use():
+                session.agent.clear_memory()
+            self.sessions.remove(session_id)
+            await _send_json(send, 200, {"session_id": session_id, "deleted": True})
+        else:
+            raise HTTPError(405, "Method not allowed")
+
+    async def _post_message(self, session_id: str, body: Any, send: Send) -> None:
+        """Run one turn for a session, as JSON or as a server-sent event stream"""
+        if not isinstance(body, dict) or not isinstance(body.get("message"), str):
+            raise HTTPError(400, 'Expected a JSON body like {"message": "2 + 2"}')
+        message = body["message"].strip()
+        if not message:
+            raise HTTPError(400, "Message is empty")
+
+        session = self.sessions.get(session_id)
+        async with session.use():
+            agent = session.agent
+            if not body.get("stream"):
+                response = await agent.arun(message)
+                self.sessions.record_turn(agent.last_turn_stats)
+                await _send_json(send, 200, {
+                    "session_id": session_id,
+                    "response": response,
+                    "stats": agent.last_turn_stats.model_dump(),
+                })
+                return
+
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                ],
+            })
+            async for chunk in agent.arun_stream(message):
+                await send({
+                    "type": "http.response.body",
+                    "body": _event({"text": chunk}),
+                    "more_body": True,
+                })
+            self.sessions.record_turn(agent.last_turn_stats)
+            await send({
+                "type": "http.response.body",
+                "body": _event(agent.last_turn_stats.model_dump(), "done"),
+            })
+
+    def metrics(self) -> dict[str, Any]:
+        """Process-wide counters for the /metrics endpoint"""
+        stats = self.sessions.stats
+        sink = metrics.sink
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "requests": self.requests,
+            "requests_in_flight": self.in_flight,
+            "errors": self.errors,
+            "sessions_active": len(self.sessions),
+            "sessions_created": self.sessions.created,
+            "sessions_evicted": self.sessions.evicted,
+            "turns": stats.turns,
+            "api_calls": stats.api_calls,
+            "api_retries": stats.retries,
+            "api_hedges": stats.hedges,
+            "fast_path_hits": stats.fast_path_hits,
+            "turn_cache_hits": stats.turn_cache_hits,
+            "context_tokens_saved": stats.context_tokens_saved,
+            "agent": sink.snapshot() if isinstance(sink, SnapshotSink) else {},
+        }
+
+    def prometheus_metrics(self) -> str:
+        """Server gauges and the agent metrics in the Prometheus text format"""
+        server = [
+            ("uptime_seconds", "gauge", round(time.time() - self.started, 3)),
+            ("requests_total", "counter", self.requests),
+            ("requests_in_flight", "gauge", self.in_flight),
+            ("errors_total", "counter", self.errors),
+            ("sessions_active", "gauge", len(self.sessions)),
+            ("sessions_created_total", "counter", self.sessions.created),
+            ("sessions_evicted_total", "counter", self.sessions.evicted),
+        ]
+        lines = []
+        for name, kind, value in server:
+            lines.append(f"# TYPE calculator_server_{name} {kind}")
+            lines.append(f"calculator_server_{name} {value}")
+        text = "\n".join(lines) + "\n"
+        if isinstance(metrics.sink, SnapshotSink):
+            text += metrics.sink.to_prometheus()
+        return text
+
+
+def _event(data: dict[str, Any], event: Optional[str] = None) -> bytes:
+    """Encode one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n".encode()
+
+
+async def _read_json(receive: Receive) -> Any:
+    """Read the request body and parse it as JSON"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > MAX_BODY_SIZE:
+            raise HTTPError(413, f"Body is larger than {MAX_BODY_SIZE} bytes")
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        raise HTTPError(400, "Body is not valid JSON")
+
+
+def _accepts_text(scope: dict[str, Any]) -> bool:
+    """Whether the request's Accept header asks for plain text"""
+    for name, value in scope.get("headers", ()):
+        if name == b"accept":
+            return b"text/plain" in value or b"openmetrics" in value
+    return False
+
+
+async def _send_json(send: Send, status: int, payload: Any) -> None:
+    """Send a complete JSON response"""
+    await _send_body(send, status, json.dumps(payload).encode(), b"application/json")
+
+
+async def _send_body(send: Send, status: int, body: bytes, content_type: bytes) -> None:
+    """Send a complete response"""
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_app(
+    max_sessions: Optional[int] = None,
+    idle_timeout: Optional[float] = None,
+    memory_factory: Optional[Callable[[str], Any]] = None
+) -> CalculatorApp:
+    """Create the ASGI app; limits default to the session settings"""
+    from ..config.settings import get_settings
+
+    settings = get_settings()
+    metrics.enable()  # The server always collects metrics for /metrics
+    return CalculatorApp(SessionManager(
+        max_sessions if max_sessions is not None else settings.max_sessions,
+        idle_timeout if idle_timeout is not None else settings.session_idle_timeout,
+        memory_factory
+    ))
@@ -0,0 +1,164 @@
+"""Session manager mapping session ids to agents with their own memory"""
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Optional
+from ..agents.async_calculator_agent import AsyncCalculatorAgent
+from ..models.schemas import AgentStats, TurnStats
+from ..state.memory import Memory
+
+
+class Session:
+    """One user's agent, plus the lock that serializes their turns"""
+
+    __slots__ = ("session_id", "agent", "lock", "last_used", "in_flight")
+
+    def __init__(self, session_id: str, agent: AsyncCalculatorAgent):
+        self.session_id = session_id
+        self.agent = agent
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.in_flight = 0  # Requests holding or waiting for the lock
+
+    @contextlib.asynccontextmanager
+    async def use(self) -> AsyncIterator["Session"]:
+        """
+        Hold the session's lock for one request
+
+        The request counts as in flight from before it starts waiting until
+        it releases the lock, so the session can't be evicted in the gap
+        between one request releasing the lock and the next acquiring it.
+        """
+        self.in_flight += 1
+        try:
+            async with self.lock:
+                yield self
+        finally:
+            self.in_flight -= 1
+
+
+class SessionManager:
+    """
+    Keeps an agent per session id, evicting the least recently used ones
+
+    Every agent shares one Anthropic client (and so one HTTP connection
+    pool); only Memory and per-turn bookkeeping are per session. When
+    recording cassettes, each agent wraps the shared client in a recorder
+    that tags exchanges with its own session id. Sessions
+    idle for longer than idle_timeout, or beyond max_sessions, are evicted.
+    Memory comes from memory_factory, or else from the MEMORY_BACKEND
+    setting. With a persistent backend (sqlite, redis) evicted sessions are
+    flushed and reloaded on next use; otherwise their state is dropped.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10_000,
+        idle_timeout: float = 3600.0,
+        memory_factory: Optional[Callable[[str], Memory]] = None,
+        client: Any = None
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.memory_factory = memory_factory
+        self.client = client  # Created from the client factory if not given
+        self.stats = AgentStats()  # Totals across every session
+        self.created = 0
+        self.evicted = 0
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def get(self, session_id: str) -> Session:
+        """Get the session for an id, creating it (and evicting others) if needed"""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session(session_id, self._create_agent(session_id))
+            self._sessions[session_id] = session
+            self.created += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        self.evict_idle(keep=session_id)
+        return session
+
+    def _create_agent(self, session_id: str) -> AsyncCalculatorAgent:
+        """Build an agent for a new session on the shared client"""
+        memory = self.memory_factory(session_id) if self.memory_factory else None
+        agent = AsyncCalculatorAgent(memory=memory, session_id=session_id)
+        agent.client = self._session_client(agent)
+        return agent
+
+    def _session_client(self, agent: AsyncCalculatorAgent) -> Any:
+        """The shared client, wrapped to record the agent's session in record mode"""
+        settings = agent.settings
+        if self.client is None:
+            if settings.cassette_mode in ("off", "record"):
+                from ..client.factory import get_async_client
+
+                self.client = get_async_client(settings)
+            else:  # Replay, or an unknown mode for cassette_client to reject
+                from ..client.cassette import cassette_client
+
+                self.client = cassette_client(settings, asynchronous=True)
+        if settings.cassette_mode == "record":
+            from ..client.cassette import get_cassette, recording_client
+
+            return recording_client(
+                self.client,
+                get_cassette(settings.cassette_path),
+                agent.session_id,
+                asynchronous=True
+            )
+        return self.client
+
+    def lookup(self, session_id: str) -> Optional[Session]:
+        """Get a loaded session without creating it or marking it as used"""
+        return self._sessions.get(session_id)
+
+    def record_turn(self, turn: TurnStats) -> None:
+        """Add a finished turn to the totals reported by /metrics"""
+        self.stats.turns += 1
+        self.stats.api_calls += turn.api_calls
+        self.stats.retries += turn.retries
+        self.stats.hedges += turn.hedges
+        self.stats.fast_path_hits += turn.fast_path
+        self.stats.turn_cache_hits += turn.turn_cache_hit
+        self.stats.context_tokens_saved += turn.context_tokens_saved * turn.api_calls
+
+    def evict_idle(self, keep: Optional[str] = None) -> int:
+        """Evict idle sessions and any beyond max_sessions; returns the count"""
+        cutoff = time.monotonic() - self.idle_timeout
+        excess = len(self._sessions) - self.max_sessions
+        doomed = []
+        for session_id, session in self._sessions.items():
+            if len(doomed) >= excess and session.last_used > cutoff:
+                break  # Ordered by last use, so the rest are fresher
+            if session_id == keep or session.in_flight:
+                continue  # In use or queued; try again next time
+            doomed.append(session_id)
+
+        for session_id in doomed:
+            self.remove(session_id)
+        self.evicted += len(doomed)
+        return len(doomed)
+
+    def remove(self, session_id: str) -> bool:
+        """Drop a session, persisting its memory if the backend supports it"""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        close = getattr(session.agent.memory, "close", None)
+        if close is not None:
+            close()
+        return True
+
+    def close(self) -> None:
+        """Drop every session"""
+        for session_id in list(self._sessions):
+            self.remove(session_id)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
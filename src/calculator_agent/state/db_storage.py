@@ -0,0 +1,345 @@
+"""SQLite-backed memory that survives restarts"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Optional
+from .history import HistoryRecord
+from .memory import Memory
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    last_result REAL
+);
+CREATE TABLE IF NOT EXISTS saved_results (
+    session_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    timestamp REAL NOT NULL,
+    PRIMARY KEY (session_id, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    a REAL,
+    b REAL,
+    result REAL,
+    name TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_session ON history (session_id, id);
+"""
+
+# Kept as constants so sqlite3's statement cache reuses the prepared statements
+_UPSERT_LAST_RESULT = (
+    "INSERT INTO sessions (session_id, last_result) VALUES (?, ?) "
+    "ON CONFLICT (session_id) DO UPDATE SET last_result = excluded.last_result"
+)
+_UPSERT_SAVED_RESULT = (
+    "INSERT OR REPLACE INTO saved_results (session_id, name, value, timestamp) "
+    "VALUES (?, ?, ?, ?)"
+)
+_INSERT_HISTORY = (
+    "INSERT INTO history (session_id, op, a, b, result, name, timestamp) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_SELECT_LAST_RESULT = "SELECT last_result FROM sessions WHERE session_id = ?"
+_SELECT_SAVED_RESULTS = (
+    "SELECT name, value, timestamp FROM saved_results "
+    "WHERE session_id = ? ORDER BY timestamp"
+)
+_SELECT_RECENT_HISTORY = (
+    "SELECT op, a, b, result, name, timestamp FROM ("
+    "SELECT * FROM history WHERE session_id = ? ORDER BY id DESC LIMIT ?"
+    ") ORDER BY id"
+)
+# Drops a session's rows older than the newest history_size ones
+_PRUNE_HISTORY = (
+    "DELETE FROM history WHERE session_id = ? AND id <= ("
+    "SELECT id FROM history WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)"
+)
+
+
+def _flush_periodically(
+    database_ref: "weakref.ref[_SQLiteDatabase]", closed: threading.Event, interval: float
+) -> None:
+    """Flush a database's queued writes every interval until it is closed or freed"""
+    while not closed.wait(interval):
+        database = database_ref()
+        if database is None:
+            return
+        database.flush()
+        del database
+
+
+class _PendingWrites:
+    """One session's queued changes, owned by the shared database"""
+
+    __slots__ = ("session_id", "history_size", "history", "saved", "last_result",
+                 "last_result_dirty", "orphaned")
+
+    def __init__(self, session_id: str, history_size: int):
+        self.session_id = session_id
+        self.history_size = history_size
+        self.history: list[tuple] = []
+        self.saved: dict[str, tuple] = {}
+        self.last_result: Optional[float] = None
+        self.last_result_dirty = False
+        self.orphaned = False  # Its SQLiteMemory was freed without close()
+
+    def __bool__(self) -> bool:
+        return bool(self.history or self.saved or self.last_result_dirty)
+
+    def write(self, conn: sqlite3.Connection) -> None:
+        """Write the queued changes inside the caller's transaction"""
+        if self.last_result_dirty:
+            conn.execute(_UPSERT_LAST_RESULT, (self.session_id, self.last_result))
+        if self.saved:
+            conn.executemany(_UPSERT_SAVED_RESULT, self.saved.values())
+        if self.history:
+            conn.executemany(_INSERT_HISTORY, self.history)
+            conn.execute(
+                _PRUNE_HISTORY, (self.session_id, self.session_id, self.history_size)
+            )
+
+    def clear(self) -> None:
+        self.history.clear()
+        self.saved.clear()
+        self.last_result_dirty = False
+
+
+class _SQLiteDatabase:
+    """
+    One connection and group-commit flusher shared by every session on a path
+
+    Each open SQLiteMemory registers its queued writes here; a flush writes
+    those of every session in a single transaction. Writes outlive a session
+    that is freed without close(): the database keeps itself alive in
+    _draining until they have been flushed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False, cached_statements=32)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        # Guards the connection and the queued writes of every session
+        self.lock = threading.RLock()
+        self.sessions: "weakref.WeakSet[SQLiteMemory]" = weakref.WeakSet()
+        self.pending: list[_PendingWrites] = []
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+
+    def schedule_flush(self, interval: float) -> None:
+        """Start the background flush thread on the first queued write"""
+        if self._flusher is None and interval > 0:
+            self._flusher = threading.Thread(
+                target=_flush_periodically,
+                args=(weakref.ref(self), self._closed, interval),
+                daemon=True
+            )
+            self._flusher.start()
+
+    def flush(self) -> None:
+        """Write every session's queued changes in one transaction"""
+        with self.lock:
+            if self._closed.is_set():
+                return
+            dirty = [pending for pending in self.pending if pending]
+            if dirty:
+                with self.conn:
+                    for pending in dirty:
+                        pending.write(self.conn)
+                for pending in dirty:
+                    pending.clear()
+            if any(pending.orphaned for pending in self.pending):
+                self.pending = [pending for pending in self.pending if not pending.orphaned]
+                _draining.discard(self)
+
+    def close(self) -> None:
+        """Stop the flush thread and close the connection"""
+        self._closed.set()
+        self.conn.close()
+
+
+_databases: "weakref.WeakValueDictionary[str, _SQLiteDatabase]" = weakref.WeakValueDictionary()
+_databases_lock = threading.Lock()
+# Databases holding writes of sessions that were freed without close()
+_draining: set[_SQLiteDatabase] = set()
+
+
+def _attach(memory: "SQLiteMemory") -> _SQLiteDatabase:
+    """Register a session with the shared database for its path, opening it if needed"""
+    key = memory.path if memory.path == ":memory:" else os.path.abspath(memory.path)
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            database = _databases[key] = _SQLiteDatabase(memory.path)
+        with database.lock:
+            database.sessions.add(memory)
+            database.pending.append(memory._pending)
+        return database
+
+
+def _orphan(database: _SQLiteDatabase, pending: _PendingWrites) -> None:
+    """Finalizer of a SQLiteMemory freed without close(): keep its writes queued"""
+    # Runs wherever garbage collection happens, so it takes no locks
+    pending.orphaned = True
+    if pending:
+        _draining.add(database)
+
+
+def _detach(memory: "SQLiteMemory") -> None:
+    """Unregister a session, closing the shared database after the last one"""
+    database = memory._database
+    with _databases_lock, database.lock:
+        database.sessions.discard(memory)
+        if memory._pending in database.pending:
+            database.pending.remove(memory._pending)
+        if not database.sessions:
+            database.flush()  # Writes left by sessions freed without close()
+            for key, value in list(_databases.items()):
+                if value is database:
+                    del _databases[key]
+            _draining.discard(database)
+            database.close()
+
+
+@atexit.register
+def _flush_all() -> None:
+    """Write whatever is still queued when the process exits"""
+    with _databases_lock:
+        databases = {*_databases.values(), *_draining}
+    for database in databases:
+        database.flush()
+
+
+class SQLiteMemory(Memory):
+    """
+    Memory persisted to a SQLite file, one row set per session id
+
+    Reads are served from the in-process state inherited from Memory, which
+    is loaded from the database when the session is opened. Writes are
+    queued and group-committed in a single transaction once batch_size
+    history entries are pending, at the end of each agent turn, on close(),
+    and otherwise by a background thread every flush_interval seconds
+    (or at exit, if flush_interval is 0).
+
+    Every session on the same path shares one connection and one flush
+    thread, and a flush commits the queued writes of all of them at once.
+    The queue belongs to the shared database, so writes of a session that
+    is garbage-collected without close() are still flushed. History rows
+    beyond history_size are pruned from the file as they are flushed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        session_id: str = "default",
+        history_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0
+    ):
+        super().__init__(history_size=history_size)
+        self.path = path
+        self.session_id = session_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._pending = _PendingWrites(session_id, self._conversation_history.maxlen)
+        self._database = _attach(self)
+        self._conn = self._database.conn
+        self._lock = self._database.lock
+        self._finalizer = weakref.finalize(self, _orphan, self._database, self._pending)
+        self._finalizer.atexit = False  # _flush_all() writes them at exit
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        """Fill the in-process state from this session's rows"""
+        row = self._conn.execute(_SELECT_LAST_RESULT, (self.session_id,)).fetchone()
+        self._last_result = row[0] if row is not None else None
+
+        for name, value, timestamp in self._conn.execute(
+            _SELECT_SAVED_RESULTS, (self.session_id,)
+        ):
+            self._saved_results.save(name, value, timestamp)
+
+        for row in self._conn.execute(
+            _SELECT_RECENT_HISTORY,
+            (self.session_id, self._conversation_history.maxlen)
+        ):
+            self._conversation_history.append(HistoryRecord(*row))
+
+    def save_result(self, name: str, value: float) -> None:
+        """Save a named result and queue it for the database"""
+        super().save_result(name, value)
+        with self._lock:
+            self._pending.saved[name] = (self.session_id, name, value, time.time())
+            self._pending.last_result = value
+            self._pending.last_result_dirty = True
+            self._schedule_flush()
+
+    def set_last_result(self, value: float) -> None:
+        """Set the most recent result and queue it for the database"""
+        super().set_last_result(value)
+        with self._lock:
+            self._pending.last_result = value
+            self._pending.last_result_dirty = True
+            self._schedule_flush()
+
+    def record_operation(
+        self,
+        op: str,
+        a: Optional[float] = None,
+        b: Optional[float] = None,
+        result: Optional[float] = None,
+        name: Optional[str] = None
+    ) -> None:
+        """Add a history entry and queue it for the database"""
+        super().record_operation(op, a, b, result, name)
+        with self._lock:
+            self._pending.history.append(
+                (self.session_id, op, a, b, result, name, time.time())
+            )
+            if len(self._pending.history) >= self.batch_size:
+                self.flush()
+            else:
+                self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Start the shared background flush thread on the first queued write"""
+        self._database.schedule_flush(self.flush_interval)
+
+    def flush(self) -> None:
+        """Write every queued change, along with other sessions' on this path"""
+        with self._lock:
+            if self._pending:
+                self._database.flush()
+
+    def end_turn(self) -> None:
+        """Persist the turn's writes before the response is returned"""
+        self.flush()
+
+    def clear(self) -> None:
+        """Clear all state for this session, in memory and on disk"""
+        super().clear()
+        with self._lock:
+            self._pending.clear()
+            with self._conn:
+                for table in ("sessions", "saved_results", "history"):
+                    self._conn.execute(
+                        f"DELETE FROM {table} WHERE session_id = ?", (self.session_id,)
+                    )
+
+    def close(self) -> None:
+        """Flush queued writes and release the shared database connection"""
+        self.flush()
+        self._finalizer.detach()
+        _detach(self)
@@ -0,0 +1,124 @@
+"""Bounded, structured conversation history"""
+import json
+import os
+import time
+from collections import deque
+from typing import IO, Iterator, Optional
+
+
+# How each operation is described in the conversation history
+_TEMPLATES = {
+    "add": "Added {a} + {b} = {result}",
+    "multiply": "Multiplied {a} × {b} = {result}",
+    "subtract": "Subtracted {b} from {a} = {result}",
+    "divide": "Divided {a} by {b} = {result}",
+    "power": "Calculated {a} ^ {b} = {result}",
+    "evaluate": "Evaluated {name} = {result}",
+    "save": "Saved {result} as '{name}'",
+    "recall": "Recalled '{name}' = {result}",
+    "note": "{name}",
+}
+
+
+class HistoryRecord:
+    """One history entry, kept as raw values and formatted only when read"""
+
+    __slots__ = ("op", "a", "b", "result", "name", "timestamp")
+
+    def __init__(
+        self,
+        op: str,
+        a: Optional[float] = None,
+        b: Optional[float] = None,
+        result: Optional[float] = None,
+        name: Optional[str] = None,
+        timestamp: Optional[float] = None
+    ):
+        self.op = op
+        self.a = a
+        self.b = b
+        self.result = result
+        self.name = name
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def format(self) -> str:
+        """Describe the entry the way the history has always shown it"""
+        template = _TEMPLATES.get(self.op)
+        if template is None:  # An operation from a tool added later
+            return f"{self.op}({self.a}, {self.b}) = {self.result}"
+        return template.format(a=self.a, b=self.b, result=self.result, name=self.name)
+
+    def to_row(self) -> list:
+        """Serialize to a compact JSON-friendly row"""
+        return [self.op, self.a, self.b, self.result, self.name, self.timestamp]
+
+    def __str__(self) -> str:
+        return self.format()
+
+    def __repr__(self) -> str:
+        return f"HistoryRecord({self.format()!r})"
+
+
+class History:
+    """
+    Ring buffer of the most recent history records
+
+    Once maxlen records are held, each new record evicts the oldest one.
+    With a spill_path, evicted records are appended to that file as JSON
+    lines instead of being dropped, and can be read back with iter_spilled().
+    """
+
+    def __init__(self, maxlen: int = 1000, spill_path: Optional[str] = None):
+        self.maxlen = maxlen
+        self.spill_path = spill_path
+        self._records: deque[HistoryRecord] = deque(maxlen=maxlen)
+        self._spill_file: Optional[IO[str]] = None
+
+    def append(self, record: HistoryRecord) -> None:
+        """Add a record, evicting (or spilling) the oldest one when full"""
+        if len(self._records) == self.maxlen and self.spill_path is not None:
+            self._spill(self._records[0] if self._records else record)
+        self._records.append(record)
+
+    def _spill(self, record: HistoryRecord) -> None:
+        """Append an evicted record to the spill file"""
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, "a", encoding="utf-8")
+        self._spill_file.write(json.dumps(record.to_row()) + "\n")
+        self._spill_file.flush()
+
+    def iter_spilled(self) -> Iterator[HistoryRecord]:
+        """Read back the records that were spilled to disk, oldest first"""
+        if self.spill_path is None:
+            return
+        try:
+            with open(self.spill_path, encoding="utf-8") as spill_file:
+                for line in spill_file:
+                    yield HistoryRecord(*json.loads(line))
+        except FileNotFoundError:
+            return
+
+    def __iter__(self) -> Iterator[HistoryRecord]:
+        return iter(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def entries(self) -> Iterator[str]:
+        """Iterate over the held records as formatted strings, oldest first"""
+        return (record.format() for record in self._records)
+
+    def clear(self) -> None:
+        """Drop every record, including any spilled to disk"""
+        self._records.clear()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            open(self.spill_path, "w").close()
+
+    def close(self) -> None:
+        """Close the spill file, if one is open"""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
@@ -1,52 +1,188 @@
 """State management for the calculator agent"""
-from typing import Dict, Optional
-from datetime import datetime
+from typing import Any, Dict, Iterator, Mapping, Optional
 from ..models.schemas import SavedResult
+from .history import History, HistoryRecord
+from .saved_results import SavedResultStore
 
 
 class Memory:
     """Manages conversation state and saved results"""
     
-    def __init__(self):
-        self._saved_results: Dict[str, SavedResult] = {}
+    def __init__(self, history_size: int = 1000, history_spill_path: Optional[str] = None):
+        self._saved_results = SavedResultStore()
         self._last_result: Optional[float] = None
-        self._conversation_history: list[str] = []
+        self._conversation_history = History(history_size, history_spill_path)
+        self._journal: Optional[list[tuple[str, tuple]]] = None
     
     def save_result(self, name: str, value: float) -> None:
         """Save a named result"""
-        self._saved_results[name] = SavedResult(
-            name=name,
-            value=value,
-            timestamp=datetime.now().isoformat()
-        )
+        if self._journal is not None:
+            self._journal.append(("save_result", (name, value)))
+        self._saved_results.save(name, value)
         self._last_result = value
     
     def recall_result(self, name: str) -> Optional[SavedResult]:
         """Recall a saved result by name"""
         return self._saved_results.get(name)
     
+    def get_saved_value(self, name: str) -> Optional[float]:
+        """Get the value saved under name, without building a SavedResult"""
+        return self._saved_results.get_value(name)
+    
+    def peek_saved_value(self, name: str) -> Optional[float]:
+        """Get the value saved under name without counting it as a use"""
+        return self._saved_results.peek(name)
+    
     def get_last_result(self) -> Optional[float]:
         """Get the most recent calculation result"""
         return self._last_result
     
     def set_last_result(self, value: float) -> None:
         """Set the most recent result"""
+        if self._journal is not None:
+            self._journal.append(("set_last_result", (value,)))
         self._last_result = value
     
     def list_saved_results(self) -> Dict[str, SavedResult]:
-        """Get all saved results"""
-        return self._saved_results.copy()
+        """Get all saved results, without counting them as used"""
+        store = self._saved_results
+        return {name: store.peek_result(name) for name in store}
+    
+    def saved_values(self) -> Mapping[str, float]:
+        """Get a read-only, live name -> value view of the saved results"""
+        return self._saved_results.values_view()
+    
+    @property
+    def saved_results(self) -> SavedResultStore:
+        """The underlying store, for callers that need usage and recency data"""
+        return self._saved_results
+    
+    def record_operation(
+        self,
+        op: str,
+        a: Optional[float] = None,
+        b: Optional[float] = None,
+        result: Optional[float] = None,
+        name: Optional[str] = None
+    ) -> None:
+        """Add a structured entry (e.g. "add", 15, 27, 42) to conversation history"""
+        if self._journal is not None:
+            self._journal.append(("record_operation", (op, a, b, result, name)))
+        self._conversation_history.append(HistoryRecord(op, a, b, result, name))
     
     def add_to_history(self, entry: str) -> None:
-        """Add an entry to conversation history"""
-        self._conversation_history.append(entry)
+        """Add a free-text entry to conversation history"""
+        self.record_operation("note", name=entry)
     
     def get_history(self) -> list[str]:
         """Get conversation history"""
-        return self._conversation_history.copy()
+        return list(self._conversation_history.entries())
+    
+    def iter_history(self) -> Iterator[str]:
+        """Iterate over conversation history without copying it"""
+        return self._conversation_history.entries()
+    
+    def iter_history_records(self) -> Iterator[HistoryRecord]:
+        """Iterate over the structured history records, oldest first"""
+        return iter(self._conversation_history)
     
     def clear(self) -> None:
         """Clear all state"""
         self._saved_results.clear()
         self._last_result = None
         self._conversation_history.clear()
+    
+    def begin_turn(self) -> None:
+        """Called by the agent before a turn; storage backends can hook in here"""
+        pass
+    
+    def end_turn(self) -> None:
+        """Called by the agent after a turn, e.g. to persist buffered writes"""
+        pass
+    
+    def start_journal(self) -> None:
+        """Start recording every write so it can be replayed later"""
+        self._journal = []
+    
+    def stop_journal(self) -> list[tuple[str, tuple]]:
+        """Stop recording and return the writes made since start_journal()"""
+        journal, self._journal = self._journal or [], None
+        return journal
+    
+    def apply(self, operations: list[tuple[str, Any]]) -> None:
+        """Replay recorded writes, e.g. from a journal or a DeferredMemory"""
+        for method, args in operations:
+            getattr(self, method)(*args)
+
+
+class DeferredMemory:
+    """Memory view that buffers writes until commit() is called
+
+    Reads go straight to the wrapped memory, so every tool in a parallel
+    batch sees the state from before the batch. Writes are replayed onto
+    the wrapped memory in call order when the batch is committed.
+    """
+    
+    def __init__(self, memory: Memory):
+        self._memory = memory
+        self._pending: list[tuple[str, tuple]] = []
+    
+    def save_result(self, name: str, value: float) -> None:
+        """Buffer saving a named result"""
+        self._pending.append(("save_result", (name, value)))
+    
+    def recall_result(self, name: str) -> Optional[SavedResult]:
+        """Recall a saved result from the wrapped memory"""
+        return self._memory.recall_result(name)
+    
+    def get_saved_value(self, name: str) -> Optional[float]:
+        """Get a saved value from the wrapped memory"""
+        return self._memory.get_saved_value(name)
+    
+    def peek_saved_value(self, name: str) -> Optional[float]:
+        """Get a saved value from the wrapped memory without counting a use"""
+        return self._memory.peek_saved_value(name)
+    
+    def get_last_result(self) -> Optional[float]:
+        """Get the most recent result from the wrapped memory"""
+        return self._memory.get_last_result()
+    
+    def set_last_result(self, value: float) -> None:
+        """Buffer setting the most recent result"""
+        self._pending.append(("set_last_result", (value,)))
+    
+    def list_saved_results(self) -> Dict[str, SavedResult]:
+        """Get all saved results from the wrapped memory"""
+        return self._memory.list_saved_results()
+    
+    def saved_values(self) -> Mapping[str, float]:
+        """Get the saved values view of the wrapped memory"""
+        return self._memory.saved_values()
+    
+    def record_operation(
+        self,
+        op: str,
+        a: Optional[float] = None,
+        b: Optional[float] = None,
+        result: Optional[float] = None,
+        name: Optional[str] = None
+    ) -> None:
+        """Buffer a structured history entry"""
+        self._pending.append(("record_operation", (op, a, b, result, name)))
+    
+    def add_to_history(self, entry: str) -> None:
+        """Buffer a history entry"""
+        self._pending.append(("add_to_history", (entry,)))
+    
+    def get_history(self) -> list[str]:
+        """Get conversation history from the wrapped memory"""
+        return self._memory.get_history()
+    
+    def iter_history(self) -> Iterator[str]:
+        """Iterate over conversation history in the wrapped memory"""
+        return self._memory.iter_history()
+    
+    def commit(self) -> None:
+        """Apply buffered writes to the wrapped memory in order"""
+        self._memory.apply(self._pending)
+        self._pending.clear()
@@ -0,0 +1,252 @@
+"""Redis-backed memory shared by every agent process in a deployment"""
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, Mapping, Optional
+from ..models.schemas import SavedResult
+from .history import HistoryRecord
+from .memory import Memory
+from .saved_results import SavedResultStore
+
+try:
+    import redis
+except ImportError:  # Optional dependency: pip install calculator-agent[redis]
+    redis = None
+
+
+_pools: dict[str, Any] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(url: str) -> Any:
+    """Get the process-wide connection pool for a Redis URL"""
+    if redis is None:
+        raise ImportError("RedisMemory needs the redis package: pip install redis")
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = redis.ConnectionPool.from_url(url)
+        return pool
+
+
+def _text(value: Any) -> str:
+    """Decode a Redis reply that may be bytes"""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisMemory(Memory):
+    """
+    Memory stored in Redis so any node can serve a session
+
+    Per session, the last result is a string key, saved results are two
+    hashes (value and save time by name) and history is a list capped at
+    history_size with LTRIM.
+
+    The state inherited from Memory acts as a client-side read cache. It is
+    marked stale when a turn begins and reloaded with a single pipelined
+    round trip on the first read, so building the context and running tools
+    in one turn costs one fetch. Writes update the cache immediately; inside
+    a turn they are queued and sent as one MULTI/EXEC pipeline when the turn
+    ends, outside a turn they are sent right away.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        session_id: str = "default",
+        history_size: int = 1000,
+        client: Any = None,
+        key_prefix: str = "calculator"
+    ):
+        super().__init__(history_size=history_size)
+        self.session_id = session_id
+        if client is None:
+            pool = get_connection_pool(url)  # Raises ImportError without redis
+            client = redis.Redis(connection_pool=pool)
+        self.client = client
+        base = f"{key_prefix}:{session_id}"
+        self._last_result_key = f"{base}:last_result"
+        self._saved_key = f"{base}:saved"
+        self._saved_at_key = f"{base}:saved_at"
+        self._history_key = f"{base}:history"
+
+        self._in_turn = False
+        self._state_stale = True
+        self._history_stale = True
+        self._pending: list[tuple[str, tuple]] = []
+        self._pending_history: list[HistoryRecord] = []
+
+    # Cache refresh
+
+    def _refresh_state(self) -> None:
+        """Reload the last result and saved results if the cache is stale"""
+        if not self._state_stale:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        pipe.get(self._last_result_key)
+        pipe.hgetall(self._saved_key)
+        pipe.hgetall(self._saved_at_key)
+        last_result, saved, saved_at = pipe.execute()
+
+        self._last_result = float(last_result) if last_result is not None else None
+        values = {_text(name): float(value) for name, value in saved.items()}
+        timestamps = {_text(name): float(ts) for name, ts in saved_at.items()}
+        store = self._saved_results
+        if any(name not in values for name in store):
+            # Something was removed remotely; usage counts are lost with it
+            store.clear()
+        for name in sorted(values, key=lambda n: timestamps.get(n, 0.0)):
+            if store.peek(name) != values[name]:
+                store.save(name, values[name], timestamps.get(name))
+        self._state_stale = False
+
+    def _refresh_history(self) -> None:
+        """Reload the history list if the cache is stale"""
+        if not self._history_stale:
+            return
+        rows = self.client.lrange(
+            self._history_key, -self._conversation_history.maxlen, -1
+        )
+        history = self._conversation_history
+        history.clear()
+        for row in rows:
+            history.append(HistoryRecord(*json.loads(row)))
+        # Entries recorded this turn but not yet sent
+        for record in self._pending_history:
+            history.append(record)
+        self._history_stale = False
+
+    # Reads
+
+    def recall_result(self, name: str) -> Optional[SavedResult]:
+        """Recall a saved result by name"""
+        self._refresh_state()
+        return super().recall_result(name)
+
+    def get_saved_value(self, name: str) -> Optional[float]:
+        """Get the value saved under name, without building a SavedResult"""
+        self._refresh_state()
+        return super().get_saved_value(name)
+
+    def peek_saved_value(self, name: str) -> Optional[float]:
+        """Get the value saved under name without counting it as a use"""
+        self._refresh_state()
+        return super().peek_saved_value(name)
+
+    def get_last_result(self) -> Optional[float]:
+        """Get the most recent calculation result"""
+        self._refresh_state()
+        return super().get_last_result()
+
+    def list_saved_results(self) -> Dict[str, SavedResult]:
+        """Get all saved results"""
+        self._refresh_state()
+        return super().list_saved_results()
+
+    def saved_values(self) -> Mapping[str, float]:
+        """Get a read-only name -> value view of the saved results"""
+        self._refresh_state()
+        return super().saved_values()
+
+    @property
+    def saved_results(self) -> SavedResultStore:
+        """The cached store, refreshed once per turn"""
+        self._refresh_state()
+        return self._saved_results
+
+    def get_history(self) -> list[str]:
+        """Get conversation history"""
+        self._refresh_history()
+        return super().get_history()
+
+    def iter_history(self) -> Iterator[str]:
+        """Iterate over conversation history without copying it"""
+        self._refresh_history()
+        return super().iter_history()
+
+    def iter_history_records(self) -> Iterator[HistoryRecord]:
+        """Iterate over the structured history records, oldest first"""
+        self._refresh_history()
+        return super().iter_history_records()
+
+    # Writes
+
+    def save_result(self, name: str, value: float) -> None:
+        """Save a named result"""
+        self._refresh_state()
+        super().save_result(name, value)
+        self._write("save_result", (name, value, time.time()))
+
+    def set_last_result(self, value: float) -> None:
+        """Set the most recent result"""
+        self._refresh_state()
+        super().set_last_result(value)
+        self._write("set_last_result", (value,))
+
+    def record_operation(
+        self,
+        op: str,
+        a: Optional[float] = None,
+        b: Optional[float] = None,
+        result: Optional[float] = None,
+        name: Optional[str] = None
+    ) -> None:
+        """Add a structured entry to conversation history"""
+        super().record_operation(op, a, b, result, name)
+        record = HistoryRecord(op, a, b, result, name)
+        if self._in_turn:
+            self._pending_history.append(record)
+        self._write("append_history", (record.to_row(),))
+
+    def _write(self, command: str, args: tuple) -> None:
+        """Queue a write for the end of the turn, or send it now"""
+        self._pending.append((command, args))
+        if not self._in_turn:
+            self.flush()
+
+    def flush(self) -> None:
+        """Send every queued write in one MULTI/EXEC pipeline"""
+        if not self._pending:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        appended = False
+        for command, args in self._pending:
+            if command == "save_result":
+                name, value, timestamp = args
+                pipe.hset(self._saved_key, name, value)
+                pipe.hset(self._saved_at_key, name, timestamp)
+                pipe.set(self._last_result_key, value)
+            elif command == "set_last_result":
+                pipe.set(self._last_result_key, args[0])
+            else:
+                pipe.rpush(self._history_key, json.dumps(args[0]))
+                appended = True
+        if appended:
+            pipe.ltrim(self._history_key, -self._conversation_history.maxlen, -1)
+        pipe.execute()
+        self._pending.clear()
+        self._pending_history.clear()
+
+    # Turn hooks
+
+    def begin_turn(self) -> None:
+        """Invalidate the read cache so the turn sees other nodes' writes"""
+        self._in_turn = True
+        self._state_stale = True
+        self._history_stale = True
+
+    def end_turn(self) -> None:
+        """Send the turn's writes in one round trip"""
+        self._in_turn = False
+        self.flush()
+
+    def clear(self) -> None:
+        """Clear all state for this session, locally and in Redis"""
+        super().clear()
+        self._pending.clear()
+        self._pending_history.clear()
+        self.client.delete(
+            self._last_result_key, self._saved_key, self._saved_at_key, self._history_key
+        )
+        self._state_stale = False
+        self._history_stale = False
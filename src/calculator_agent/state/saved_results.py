@@ -0,0 +1,174 @@
+"""Compact storage for named saved results"""
+import heapq
+import time
+from array import array
+from collections.abc import ItemsView, Mapping
+from datetime import datetime
+from typing import Iterator, Optional
+from ..models.schemas import SavedResult
+
+
+class SavedResultStore:
+    """
+    Saved results held in parallel arrays instead of one object per name
+
+    Each name maps to a slot in parallel arrays (value, save time, use
+    count and the length of its "name=value" context fragment), so saving
+    a result allocates nothing beyond the dict entry for a new name.
+    SavedResult models are only built when a caller asks for one.
+    """
+
+    def __init__(self):
+        self._slots: dict[str, int] = {}
+        self._names: list[str] = []
+        self._values = array("d")
+        self._timestamps = array("d")
+        self._uses = array("L")
+        self._fragment_lengths = array("L")
+        self._fragment_chars = 0
+        self.version = 0  # Bumped on every write, for callers that cache
+        # Bumped when an existing entry changes or all are removed; writes
+        # that only add names leave it alone, so listings can be extended
+        self.rewrite_version = 0
+
+    def save(self, name: str, value: float, timestamp: Optional[float] = None) -> None:
+        """Save or overwrite a named value"""
+        timestamp = time.time() if timestamp is None else timestamp
+        fragment_length = len(name) + 1 + len(str(float(value)))
+        slot = self._slots.get(name)
+        if slot is None:
+            self._slots[name] = len(self._values)
+            self._names.append(name)
+            self._values.append(value)
+            self._timestamps.append(timestamp)
+            self._uses.append(0)
+            self._fragment_lengths.append(fragment_length)
+        else:
+            self._values[slot] = value
+            self._timestamps[slot] = timestamp
+            self._fragment_chars -= self._fragment_lengths[slot]
+            self._fragment_lengths[slot] = fragment_length
+            self.rewrite_version += 1
+        self._fragment_chars += fragment_length
+        self.version += 1
+
+    def get_value(self, name: str) -> Optional[float]:
+        """Get the value saved under name, or None, counting it as a use"""
+        slot = self._slots.get(name)
+        if slot is None:
+            return None
+        self._uses[slot] += 1
+        return self._values[slot]
+
+    def get(self, name: str) -> Optional[SavedResult]:
+        """Build the SavedResult for name, or None, counting it as a use"""
+        slot = self._slots.get(name)
+        if slot is None:
+            return None
+        self._uses[slot] += 1
+        return self._result(slot)
+
+    def peek_result(self, name: str) -> Optional[SavedResult]:
+        """Build the SavedResult for name, or None, without counting a use"""
+        slot = self._slots.get(name)
+        return None if slot is None else self._result(slot)
+
+    def _result(self, slot: int) -> SavedResult:
+        return SavedResult(
+            name=self._names[slot],
+            value=self._values[slot],
+            timestamp=datetime.fromtimestamp(self._timestamps[slot]).isoformat()
+        )
+
+    def iter_items(self, start: int = 0) -> Iterator[tuple[str, float]]:
+        """Iterate over (name, value) pairs in save order, from slot start"""
+        # Names are never removed individually, so slot i is the i-th name
+        if not start:
+            return zip(self._slots, self._values)
+        return ((self._names[i], self._values[i]) for i in range(start, len(self._names)))
+
+    def peek(self, name: str) -> Optional[float]:
+        """Get the value saved under name without counting a use"""
+        slot = self._slots.get(name)
+        return None if slot is None else self._values[slot]
+
+    def context_length(self) -> int:
+        """Length of the "a=1.0, b=2.0" listing of every saved result"""
+        return self._fragment_chars + 2 * max(len(self._slots) - 1, 0)
+
+    def most_recent(self, count: int) -> list[str]:
+        """Names of the count most recently saved results, newest first"""
+        slots = heapq.nlargest(
+            count, range(len(self._names)), key=self._timestamps.__getitem__
+        )
+        return [self._names[slot] for slot in slots]
+
+    def most_used(self, count: int) -> list[str]:
+        """Names of the count most used results that were used at least once"""
+        slots = heapq.nlargest(
+            count, range(len(self._names)), key=self._uses.__getitem__
+        )
+        return [self._names[slot] for slot in slots if self._uses[slot]]
+
+    def slot(self, name: str) -> Optional[int]:
+        """Position of name in save order, or None"""
+        return self._slots.get(name)
+
+    def values_view(self) -> "SavedValuesView":
+        """Read-only name -> value mapping that reflects later saves"""
+        return SavedValuesView(self)
+
+    def clear(self) -> None:
+        """Remove every saved result"""
+        self._slots.clear()
+        self._names.clear()
+        del self._values[:]
+        del self._timestamps[:]
+        del self._uses[:]
+        del self._fragment_lengths[:]
+        self._fragment_chars = 0
+        self.version += 1
+        self.rewrite_version += 1
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._slots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+
+class SavedValuesView(Mapping):
+    """Live, read-only view of saved values keyed by name, in save order"""
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store: SavedResultStore):
+        self._store = store
+
+    def __getitem__(self, name: str) -> float:
+        value = self._store.peek(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store)
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def items(self) -> "SavedItemsView":
+        return SavedItemsView(self)
+
+    def __repr__(self) -> str:
+        return f"SavedValuesView({dict(self.items())!r})"
+
+
+class SavedItemsView(ItemsView):
+    """Items view that reads the arrays directly instead of per-key lookups"""
+
+    def __iter__(self) -> Iterator[tuple[str, float]]:
+        return self._mapping._store.iter_items()
@@ -1,12 +1,57 @@
 """Base tool interface for the calculator agent"""
+import time
 from abc import ABC, abstractmethod
-from typing import Any
+from functools import cache
+from typing import Any, ClassVar
+from pydantic import TypeAdapter
 from ..models.schemas import ToolInput, ToolOutput
+from ..utils.metrics import metrics
+
+
+def _compact_schema(schema: Any) -> Any:
+    """Drop the auto-generated titles pydantic adds, to keep prompts small"""
+    if isinstance(schema, dict):
+        return {
+            key: _compact_schema(value)
+            for key, value in schema.items()
+            if not (key == "title" and isinstance(value, str))
+        }
+    if isinstance(schema, list):
+        return [_compact_schema(item) for item in schema]
+    return schema
+
+
+@cache
+def _input_schema(input_model: type[ToolInput]) -> dict[str, Any]:
+    """JSON schema for a tool input model, computed once per model"""
+    schema = _compact_schema(input_model.model_json_schema())
+    schema.pop("description", None)  # The model docstring isn't for Claude
+    return schema
+
+
+@cache
+def _input_adapter(input_model: type[ToolInput]) -> TypeAdapter:
+    """Precompiled validator for a tool input model"""
+    return TypeAdapter(input_model)
+
+
+def format_number(value: float) -> str:
+    """Format a number for a reply, without a trailing .0 on whole numbers"""
+    if float(value).is_integer() and abs(value) < 1e16:
+        return str(int(value))
+    return str(value)
 
 
 class BaseTool(ABC):
     """Base class for all tools"""
     
+    # The ToolInput subclass execute() expects; drives schema and validation
+    input_model: ClassVar[type[ToolInput]] = ToolInput
+    
+    # Whether a successful result fully answers a single-step request, so
+    # the agent can reply() without the model summarizing it; tools opt in
+    terminal: ClassVar[bool] = False
+    
     @property
     @abstractmethod
     def name(self) -> str:
@@ -32,5 +77,53 @@ class BaseTool(ABC):
         """
         pass
     
+    def reply(self, input_data: ToolInput, output: ToolOutput) -> str:
+        """
+        Render a successful result as the answer shown to the user
+        
+        Only used for terminal tools, which override it; message is written
+        for the model and is returned as is otherwise.
+        
+        Args:
+            input_data: The validated input the tool ran with
+            output: Its successful output
+            
+        Returns:
+            The reply text
+        """
+        return output.message
+    
+    def run(self, input_data: ToolInput) -> ToolOutput:
+        """execute(), timed into the tool metrics when metrics are on"""
+        if not metrics.enabled:
+            return self.execute(input_data)
+        
+        started = time.perf_counter()
+        success = False
+        try:
+            output = self.execute(input_data)
+            success = output.success
+            return output
+        finally:
+            metrics.record_tool(self.name, time.perf_counter() - started, success)
+    
+    @classmethod
+    def input_schema(cls) -> dict[str, Any]:
+        """JSON schema of this tool's input, generated from input_model"""
+        return _input_schema(cls.input_model)
+    
+    @classmethod
+    def validate_input(cls, raw_input: dict[str, Any]) -> ToolInput:
+        """Validate raw tool_use input into this tool's input_model"""
+        return _input_adapter(cls.input_model).validate_python(raw_input)
+    
+    def definition(self) -> dict[str, Any]:
+        """Tool definition in Anthropic's tool format"""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "input_schema": self.input_schema()
+        }
+    
     def __str__(self) -> str:
         return f"{self.name}: {self.description}"
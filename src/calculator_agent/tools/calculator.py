@@ -1,18 +1,69 @@
 """Calculator tools for basic math operations"""
+from abc import abstractmethod
 from typing import TYPE_CHECKING
-from .base import BaseTool
-from ..models.schemas import MathOperationInput, ToolOutput
+from .base import BaseTool, format_number
+from ..models.schemas import ExpressionInput, MathOperationInput, ToolOutput
+from .expression import ExpressionError, compile_expression
+from .result_cache import tool_result_cache
 
 if TYPE_CHECKING:
     from ..state.memory import Memory
 
 
-class AddNumbersTool(BaseTool):
-    """Tool for adding two numbers"""
+class MathOperationTool(BaseTool):
+    """
+    Base class for the pure two-operand math tools
+    
+    Results depend only on (a, b), so they are memoized in the shared
+    tool_result_cache. Memory side effects are applied on every call,
+    whether the result was computed or served from the cache.
+    """
+    
+    input_model = MathOperationInput
+    terminal = True
+    operation: str  # History op code, e.g. "add"
+    symbol: str  # Operator shown in replies, e.g. "+"
     
     def __init__(self, memory: "Memory"):
         self.memory = memory
     
+    @abstractmethod
+    def _calculate(self, a: float, b: float) -> ToolOutput:
+        """Compute the result for a and b without touching memory"""
+        pass
+    
+    def execute(self, input_data: MathOperationInput) -> ToolOutput:
+        """Calculate (or replay) the result and store it"""
+        a, b = input_data.a, input_data.b
+        
+        # -0.0 == 0.0 as a key, but the two format differently in messages
+        cacheable = a != 0 and b != 0
+        output = tool_result_cache.get(self.name, a, b) if cacheable else None
+        if output is None:
+            output = self._calculate(a, b)
+            if cacheable:
+                tool_result_cache.put(self.name, a, b, output)
+        
+        if output.success:
+            # Store as last result for "multiply that by X" scenarios
+            self.memory.set_last_result(output.result)
+            self.memory.record_operation(self.operation, a, b, output.result)
+        return output
+    
+    def reply(self, input_data: MathOperationInput, output: ToolOutput) -> str:
+        """The calculation, like: 15 + 27 = 42"""
+        return (
+            f"{format_number(input_data.a)} {self.symbol} "
+            f"{format_number(input_data.b)} = {format_number(output.result)}"
+        )
+
+
+class AddNumbersTool(MathOperationTool):
+    """Tool for adding two numbers"""
+    
+    operation = "add"
+    symbol = "+"
+    
     @property
     def name(self) -> str:
         return "add_numbers"
@@ -25,21 +76,15 @@ class AddNumbersTool(BaseTool):
             "Returns the sum of a and b."
         )
     
-    def execute(self, input_data: MathOperationInput) -> ToolOutput:
-        """Add two numbers and store result"""
+    def _calculate(self, a: float, b: float) -> ToolOutput:
+        """Add two numbers"""
         try:
-            result = input_data.a + input_data.b
-            
-            # Store as last result for "multiply that by X" scenarios
-            self.memory.set_last_result(result)
-            self.memory.add_to_history(
-                f"Added {input_data.a} + {input_data.b} = {result}"
-            )
+            result = a + b
             
             return ToolOutput(
                 success=True,
                 result=result,
-                message=f"{input_data.a} + {input_data.b} = {result}"
+                message=f"{a} + {b} = {result}"
             )
         except Exception as e:
             return ToolOutput(
@@ -49,11 +94,11 @@ class AddNumbersTool(BaseTool):
             )
 
 
-class MultiplyNumbersTool(BaseTool):
+class MultiplyNumbersTool(MathOperationTool):
     """Tool for multiplying two numbers"""
     
-    def __init__(self, memory: "Memory"):
-        self.memory = memory
+    operation = "multiply"
+    symbol = "×"
     
     @property
     def name(self) -> str:
@@ -67,21 +112,15 @@ class MultiplyNumbersTool(BaseTool):
             "Returns the product of a and b."
         )
     
-    def execute(self, input_data: MathOperationInput) -> ToolOutput:
-        """Multiply two numbers and store result"""
+    def _calculate(self, a: float, b: float) -> ToolOutput:
+        """Multiply two numbers"""
         try:
-            result = input_data.a * input_data.b
-            
-            # Store as last result
-            self.memory.set_last_result(result)
-            self.memory.add_to_history(
-                f"Multiplied {input_data.a} × {input_data.b} = {result}"
-            )
+            result = a * b
             
             return ToolOutput(
                 success=True,
                 result=result,
-                message=f"{input_data.a} × {input_data.b} = {result}"
+                message=f"{a} × {b} = {result}"
             )
         except Exception as e:
             return ToolOutput(
@@ -89,12 +128,13 @@ class MultiplyNumbersTool(BaseTool):
                 error=str(e),
                 message=f"Failed to multiply numbers: {e}"
             )
-        
-class SubtractNumbersTool(BaseTool):
+
+
+class SubtractNumbersTool(MathOperationTool):
     """Tool for subtracting numbers"""
     
-    def __init__(self, memory: "Memory"):
-        self.memory = memory
+    operation = "subtract"
+    symbol = "-"
     
     @property
     def name(self) -> str:
@@ -107,23 +147,15 @@ class SubtractNumbersTool(BaseTool):
             "Use this when the user asks to subtract numbers."
         )
     
-    def execute(self, input_data: MathOperationInput) -> ToolOutput:
-        """Subtract b from a and store result"""
+    def _calculate(self, a: float, b: float) -> ToolOutput:
+        """Subtract b from a"""
         try:
-            result = input_data.a - input_data.b
-            
-            # Store as last result
-            self.memory.set_last_result(result)
-            
-            # Add to history
-            self.memory.add_to_history(
-                f"Subtracted {input_data.b} from {input_data.a} = {result}"
-            )
+            result = a - b
             
             return ToolOutput(
                 success=True,
                 result=result,
-                message=f"{input_data.a} - {input_data.b} = {result}"
+                message=f"{a} - {b} = {result}"
             )
         except Exception as e:
             return ToolOutput(
@@ -131,11 +163,13 @@ class SubtractNumbersTool(BaseTool):
                 error=str(e),
                 message=f"Failed to subtract numbers: {e}"
             )
-class DivideNumbersTool(BaseTool):
+
+
+class DivideNumbersTool(MathOperationTool):
     """Tool for dividing numbers with error handling"""
     
-    def __init__(self, memory: "Memory"):
-        self.memory = memory
+    operation = "divide"
+    symbol = "÷"
     
     @property
     def name(self) -> str:
@@ -149,29 +183,23 @@ class DivideNumbersTool(BaseTool):
             "Handles division by zero gracefully."
         )
     
-    def execute(self, input_data: MathOperationInput) -> ToolOutput:
+    def _calculate(self, a: float, b: float) -> ToolOutput:
         """Divide with error handling"""
         try:
             # Validate: Check for division by zero
-            if input_data.b == 0:
+            if b == 0:
                 return ToolOutput(
                     success=False,
                     error="division_by_zero",
                     message="Cannot divide by zero. Please provide a non-zero divisor."
                 )
             
-            result = input_data.a / input_data.b
-            
-            # Store result
-            self.memory.set_last_result(result)
-            self.memory.add_to_history(
-                f"Divided {input_data.a} by {input_data.b} = {result}"
-            )
+            result = a / b
             
             return ToolOutput(
                 success=True,
                 result=result,
-                message=f"{input_data.a} ÷ {input_data.b} = {result}"
+                message=f"{a} ÷ {b} = {result}"
             )
             
         except Exception as e:
@@ -181,11 +209,13 @@ class DivideNumbersTool(BaseTool):
                 error=str(e),
                 message=f"Error dividing numbers: {e}"
             )
-class PowerNumbersTool(BaseTool):
+
+
+class PowerNumbersTool(MathOperationTool):
     """Tool for raising a number to a power"""
     
-    def __init__(self, memory: "Memory"):
-        self.memory = memory
+    operation = "power"
+    symbol = "^"
     
     @property
     def name(self) -> str:
@@ -199,34 +229,93 @@ class PowerNumbersTool(BaseTool):
             "Example: 'What's 2 to the power of 8?' or '5 squared'"
         )
     
-    def execute(self, input_data: MathOperationInput) -> ToolOutput:
+    def _calculate(self, a: float, b: float) -> ToolOutput:
         """Calculate power with error handling"""
         try:
-            result = input_data.a ** input_data.b
+            result = a ** b
             
             # Check for overflow or invalid results
             if result == float('inf') or result == float('-inf'):
                 return ToolOutput(
                     success=False,
                     error="overflow",
-                    message=f"Result too large: {input_data.a}^{input_data.b} causes overflow"
+                    message=f"Result too large: {a}^{b} causes overflow"
                 )
             
+            return ToolOutput(
+                success=True,
+                result=result,
+                message=f"{a}^{b} = {result}"
+            )
+            
+        except Exception as e:
+            return ToolOutput(
+                success=False,
+                error=str(e),
+                message=f"Error calculating power: {e}"
+            )
+
+
+class EvaluateExpressionTool(BaseTool):
+    """Tool for evaluating a whole arithmetic expression in one call"""
+    
+    input_model = ExpressionInput
+    
+    def __init__(self, memory: "Memory"):
+        self.memory = memory
+    
+    @property
+    def name(self) -> str:
+        return "evaluate_expression"
+    
+    @property
+    def description(self) -> str:
+        return (
+            "Evaluate an arithmetic expression with several steps in one call. "
+            "Supports + - * / // % ** and parentheses; saved result names and "
+            "'last' (the most recent result) can be used as variables. "
+            "Example: '(15 + 27) * 3 / 2 ** 2' or 'last * my_total'"
+        )
+    
+    def _resolve(self, name: str) -> float:
+        """Look up the value of a variable used in an expression"""
+        if name == "last":
+            value = self.memory.get_last_result()
+            if value is None:
+                raise ExpressionError("There is no previous result for 'last'")
+            return value
+        
+        value = self.memory.get_saved_value(name)
+        if value is None:
+            raise ExpressionError(f"No saved result found with name '{name}'")
+        return value
+    
+    def execute(self, input_data: ExpressionInput) -> ToolOutput:
+        """Evaluate the expression and store result"""
+        try:
+            compiled = compile_expression(input_data.expression.strip())
+            variables = {name: self._resolve(name) for name in compiled.names}
+            result = compiled(variables)
+            
             # Store result
             self.memory.set_last_result(result)
-            self.memory.add_to_history(
-                f"Calculated {input_data.a} ^ {input_data.b} = {result}"
-            )
+            self.memory.record_operation("evaluate", result=result, name=compiled.source)
             
             return ToolOutput(
                 success=True,
                 result=result,
-                message=f"{input_data.a}^{input_data.b} = {result}"
+                message=f"{compiled.source} = {result}"
             )
             
+        except ExpressionError as e:
+            return ToolOutput(
+                success=False,
+                error=e.code,
+                message=str(e)
+            )
         except Exception as e:
             return ToolOutput(
                 success=False,
                 error=str(e),
-                message=f"Error calculating power: {e}"
+                message=f"Error evaluating expression: {e}"
             )
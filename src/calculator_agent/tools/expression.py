@@ -0,0 +1,160 @@
+"""Safe arithmetic expression compiler used by the evaluate_expression tool"""
+import ast
+import math
+import operator
+from functools import lru_cache
+from typing import Callable, Mapping
+
+
+# Limits that keep a single expression cheap to evaluate
+MAX_EXPRESSION_LENGTH = 500
+MAX_NODES = 200
+MAX_OPERAND = 1e100
+MAX_EXPONENT = 1000
+
+Evaluator = Callable[[Mapping[str, float]], float]
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression is invalid or can't be evaluated safely"""
+
+    def __init__(self, message: str, code: str = "invalid_expression"):
+        super().__init__(message)
+        self.code = code
+
+
+def _divide(a: float, b: float) -> float:
+    if b == 0:
+        raise ExpressionError("Cannot divide by zero", "division_by_zero")
+    return a / b
+
+
+def _floor_divide(a: float, b: float) -> float:
+    if b == 0:
+        raise ExpressionError("Cannot divide by zero", "division_by_zero")
+    return a // b
+
+
+def _modulo(a: float, b: float) -> float:
+    if b == 0:
+        raise ExpressionError("Cannot take modulo by zero", "division_by_zero")
+    return a % b
+
+
+def _power(a: float, b: float) -> float:
+    if abs(b) > MAX_EXPONENT:
+        raise ExpressionError(
+            f"Exponent {b} is larger than the limit of {MAX_EXPONENT}", "overflow"
+        )
+    try:
+        result = a ** b
+    except OverflowError:
+        raise ExpressionError(f"Result too large: {a}^{b} causes overflow", "overflow")
+    if isinstance(result, complex):
+        raise ExpressionError(f"{a}^{b} is not a real number")
+    return result
+
+
+_BINARY_OPERATORS: dict[type, Callable[[float, float], float]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: _divide,
+    ast.FloorDiv: _floor_divide,
+    ast.Mod: _modulo,
+    ast.Pow: _power,
+}
+
+_UNARY_OPERATORS: dict[type, Callable[[float], float]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+class CompiledExpression:
+    """An expression compiled to a tree of closures, ready to evaluate"""
+
+    __slots__ = ("source", "names", "_evaluate")
+
+    def __init__(self, source: str, names: frozenset[str], evaluate: Evaluator):
+        self.source = source
+        self.names = names
+        self._evaluate = evaluate
+
+    def __call__(self, variables: Mapping[str, float]) -> float:
+        """Evaluate the expression with the given variable values"""
+        result = self._evaluate(variables)
+        if not math.isfinite(result):
+            raise ExpressionError(f"Result of {self.source} is not finite", "overflow")
+        return result
+
+
+def _compile_node(node: ast.AST, names: set[str]) -> Evaluator:
+    """Compile a whitelisted AST node into an evaluator closure"""
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ExpressionError(f"Unsupported value: {value!r}")
+        if abs(value) > MAX_OPERAND:
+            raise ExpressionError(
+                f"Number {value} is larger than the limit of {MAX_OPERAND:g}"
+            )
+        constant = float(value)
+        return lambda variables: constant
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        names.add(name)
+        return lambda variables: variables[name]
+
+    if isinstance(node, ast.BinOp):
+        op = _BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        left = _compile_node(node.left, names)
+        right = _compile_node(node.right, names)
+        return lambda variables: op(left(variables), right(variables))
+
+    if isinstance(node, ast.UnaryOp):
+        op = _UNARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        operand = _compile_node(node.operand, names)
+        return lambda variables: op(operand(variables))
+
+    raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+
+@lru_cache(maxsize=256)
+def compile_expression(source: str) -> CompiledExpression:
+    """
+    Parse and compile an arithmetic expression
+
+    Only numbers, variable names, + - * / // % ** (or ^) and parentheses
+    are allowed. Results are cached, so repeated formulas skip parsing.
+
+    Args:
+        source: The expression, e.g. "(15 + 27) * 3 / 2 ** 2"
+
+    Returns:
+        The compiled expression
+
+    Raises:
+        ExpressionError: If the expression is invalid or exceeds the limits
+    """
+    if len(source) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError(
+            f"Expression is longer than {MAX_EXPRESSION_LENGTH} characters"
+        )
+
+    try:
+        tree = ast.parse(source.replace("^", "**"), mode="eval")
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}")
+
+    if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+        raise ExpressionError(f"Expression has more than {MAX_NODES} parts")
+
+    names: set[str] = set()
+    evaluate = _compile_node(tree.body, names)
+    return CompiledExpression(source, frozenset(names), evaluate)
@@ -1,6 +1,6 @@
 """Tools for saving and recalling results"""
 from typing import TYPE_CHECKING
-from .base import BaseTool
+from .base import BaseTool, format_number
 from ..models.schemas import SaveResultInput, RecallResultInput, ToolOutput
 
 if TYPE_CHECKING:
@@ -10,6 +10,9 @@ if TYPE_CHECKING:
 class SaveResultTool(BaseTool):
     """Tool for saving a named result"""
     
+    input_model = SaveResultInput
+    terminal = True
+    
     def __init__(self, memory: "Memory"):
         self.memory = memory
     
@@ -29,8 +32,8 @@ class SaveResultTool(BaseTool):
         """Save a result with a name"""
         try:
             self.memory.save_result(input_data.name, input_data.value)
-            self.memory.add_to_history(
-                f"Saved {input_data.value} as '{input_data.name}'"
+            self.memory.record_operation(
+                "save", result=input_data.value, name=input_data.name
             )
             
             return ToolOutput(
@@ -44,11 +47,18 @@ class SaveResultTool(BaseTool):
                 error=str(e),
                 message=f"Failed to save result: {e}"
             )
+    
+    def reply(self, input_data: SaveResultInput, output: ToolOutput) -> str:
+        """Confirm the save, like: Saved 42 as total."""
+        return f"Saved {format_number(output.result)} as {input_data.name}."
 
 
 class RecallResultTool(BaseTool):
     """Tool for recalling a saved result"""
     
+    input_model = RecallResultInput
+    terminal = True
+    
     def __init__(self, memory: "Memory"):
         self.memory = memory
     
@@ -75,8 +85,8 @@ class RecallResultTool(BaseTool):
                     message=f"No saved result found with name '{input_data.name}'"
                 )
             
-            self.memory.add_to_history(
-                f"Recalled '{input_data.name}' = {result.value}"
+            self.memory.record_operation(
+                "recall", result=result.value, name=input_data.name
             )
             
             return ToolOutput(
@@ -90,3 +100,7 @@ class RecallResultTool(BaseTool):
                 error=str(e),
                 message=f"Failed to recall result: {e}"
             )
+    
+    def reply(self, input_data: RecallResultInput, output: ToolOutput) -> str:
+        """The saved value, like: total is 42."""
+        return f"{input_data.name} is {format_number(output.result)}."
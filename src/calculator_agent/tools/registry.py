@@ -0,0 +1,37 @@
+"""Registry that maps tool names to tool instances"""
+from typing import Any, Iterable, Iterator, Optional
+from .base import BaseTool
+
+
+class ToolRegistry:
+    """Name-indexed collection of tools with prebuilt definitions"""
+    
+    def __init__(self, tools: Iterable[BaseTool] = ()):
+        self._tools: dict[str, BaseTool] = {}
+        self._definitions: Optional[list[dict[str, Any]]] = None
+        for tool in tools:
+            self.register(tool)
+    
+    def register(self, tool: BaseTool) -> None:
+        """Add a tool, replacing any tool registered under the same name"""
+        self._tools[tool.name] = tool
+        self._definitions = None
+    
+    def get(self, name: str) -> Optional[BaseTool]:
+        """Get a tool by its name"""
+        return self._tools.get(name)
+    
+    def definitions(self) -> list[dict[str, Any]]:
+        """Tool definitions for Claude, built once until the registry changes"""
+        if self._definitions is None:
+            self._definitions = [tool.definition() for tool in self._tools.values()]
+        return self._definitions
+    
+    def __iter__(self) -> Iterator[BaseTool]:
+        return iter(self._tools.values())
+    
+    def __len__(self) -> int:
+        return len(self._tools)
+    
+    def __contains__(self, name: object) -> bool:
+        return name in self._tools
@@ -0,0 +1,78 @@
+"""Shared memoization cache for the pure math tools"""
+import threading
+from collections import OrderedDict
+from typing import Optional
+from ..models.schemas import ToolOutput
+
+
+class ToolResultCache:
+    """
+    Bounded LRU cache of math tool results keyed by (tool name, a, b)
+
+    Cached ToolOutput objects are shared between callers and must not be
+    mutated. The cache is safe to use from the parallel tool pool.
+    """
+
+    def __init__(self, maxsize: int = 1024, enabled: bool = True):
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, float, float], ToolOutput] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize: int, enabled: bool) -> None:
+        """Apply size and on/off settings, evicting entries if it shrank"""
+        with self._lock:
+            self.maxsize = maxsize
+            self.enabled = enabled
+            if not enabled:
+                self._entries.clear()
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, tool_name: str, a: float, b: float) -> Optional[ToolOutput]:
+        """Get a cached result, counting the hit or miss"""
+        if not self.enabled:
+            return None
+
+        key = (tool_name, a, b)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+    def put(self, tool_name: str, a: float, b: float, cached: ToolOutput) -> None:
+        """Store a result, evicting the least recently used entry when full"""
+        if not self.enabled or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._entries[(tool_name, a, b)] = cached
+            self._entries.move_to_end((tool_name, a, b))
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global cache shared by every math tool instance
+tool_result_cache = ToolResultCache()
@@ -1,64 +1,212 @@
 """Logging utilities for the calculator agent"""
+import atexit
+import itertools
+import json
 import logging
 import sys
-from datetime import datetime
-from typing import Any
+import threading
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Optional, TextIO
+
+
+# Id of the turn being handled, attached to every log line it produces.
+# Context variables follow asyncio tasks, so concurrent sessions keep theirs.
+correlation_id: ContextVar[str] = ContextVar("correlation_id", default="-")
+
+_process_prefix = uuid.uuid4().hex[:8]
+_turn_numbers = itertools.count(1)
+
+
+def new_correlation_id() -> str:
+    """Start a new correlation id in the current context and return it"""
+    value = f"{_process_prefix}-{next(_turn_numbers):06d}"
+    correlation_id.set(value)
+    return value
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamps records with the current correlation id, on the logging thread"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
 
 
 class AgentLogger:
-    """Custom logger for agent operations"""
+    """
+    Custom logger for agent operations
     
-    def __init__(self, name: str = "calculator_agent", level: int = logging.INFO):
+    Records are put on a queue by the calling thread and written by a
+    QueueListener thread, so terminal or file I/O never blocks a turn.
+    Messages use %-style arguments and every method checks the level
+    first, so disabled log lines cost a single level check. Handlers are
+    installed on the first record or configure() call, not at import, and
+    the writer thread is only started once a record is actually logged.
+    """
+    
+    def __init__(
+        self,
+        name: str = "calculator_agent",
+        level: int = logging.INFO,
+        json_format: bool = False,
+        stream: Optional[TextIO] = None
+    ):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(level)
+        self.logger.propagate = False
+        self.logger.setLevel(level)  # Level checks work before any handler exists
+        self._listener: Optional[QueueListener] = None
+        self._config: Optional[tuple] = None  # What the installed handlers write
+        self._requested = (level, json_format, stream)  # Installed on first use
+        self._configured = False  # Only the defaults so far
+        self._running = False  # Whether the listener thread has been started
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+    
+    def configure(
+        self,
+        level: int | str = logging.INFO,
+        json_format: bool = False,
+        stream: Optional[TextIO] = None
+    ) -> None:
+        """
+        Set the level and output format, replacing the writer thread if needed
+        
+        Args:
+            level: Minimum level, as a number or a name like "DEBUG"
+            json_format: Write one JSON object per line instead of colored text
+            stream: Where to write (defaults to stdout)
+        """
+        self._configured = True
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+        self._requested = (level, json_format, stream)
+        with self._lock:
+            self._install()
+    
+    def _ensure_running(self) -> None:
+        """Install the handlers and start the writer thread for the first record"""
+        if self._running:
+            return
+        with self._lock:
+            if self._config is None:
+                self._install()
+            if not self._running:
+                self._listener.start()
+                self._running = True
+    
+    def _install(self) -> None:
+        """Build the handlers and writer for the requested config, not yet started"""
+        config = self._requested
+        if config == self._config:
+            return
+        self.stop()
+        self._config = config
+        level, json_format, stream = config
         
-        # Remove existing handlers
+        self.logger.setLevel(level)
         self.logger.handlers.clear()
         
-        # Console handler with custom formatting
-        console_handler = logging.StreamHandler(sys.stdout)
+        # Console handler with custom formatting, run by the listener thread
+        console_handler = logging.StreamHandler(stream or sys.stdout)
         console_handler.setLevel(level)
+        if json_format:
+            console_handler.setFormatter(JsonFormatter())
+        else:
+            # Custom format with colors
+            console_handler.setFormatter(ColoredFormatter(
+                '%(asctime)s | %(levelname)s | %(correlation_id)s | %(message)s',
+                datefmt='%H:%M:%S'
+            ))
         
-        # Custom format with colors
-        formatter = ColoredFormatter(
-            '%(asctime)s | %(levelname)s | %(message)s',
-            datefmt='%H:%M:%S'
-        )
-        console_handler.setFormatter(formatter)
-        
-        self.logger.addHandler(console_handler)
-        self.logger.propagate = False
+        queue: SimpleQueue = SimpleQueue()
+        queue_handler = QueueHandler(queue)
+        queue_handler.addFilter(CorrelationIdFilter())
+        self.logger.addHandler(queue_handler)
+        self._listener = QueueListener(queue, console_handler, respect_handler_level=True)
+    
+    def apply_settings(self, settings: Any) -> None:
+        """Configure from LOG_LEVEL and LOG_FORMAT, unless already configured"""
+        if not self._configured:
+            self.configure(settings.log_level, json_format=settings.log_format == "json")
     
-    def agent_thinking(self, message: str) -> None:
+    def stop(self) -> None:
+        """Write out every queued record and stop the writer thread"""
+        if self._listener is not None:
+            if self._running:
+                self._listener.stop()
+            self._listener = None
+            self._config = None
+            self._running = False
+    
+    def flush(self) -> None:
+        """Block until every record logged so far has been written"""
+        if self._running:
+            self._listener.stop()
+            self._listener.start()
+    
+    def is_enabled(self, level: int = logging.INFO) -> bool:
+        """Whether a record at level would be written"""
+        return self.logger.isEnabledFor(level)
+    
+    def agent_thinking(self, message: str, *args: Any) -> None:
         """Log when agent is processing"""
-        self.logger.info(f"🤔 THINKING: {message}")
+        if self.logger.isEnabledFor(logging.INFO):
+            self._ensure_running()
+            self.logger.info("THINKING: " + message, *args, extra={"event": "thinking"})
     
-    def tool_call(self, tool_name: str, inputs: dict) -> None:
+    def tool_call(self, tool_name: str, inputs: Any) -> None:
         """Log when a tool is being called"""
-        self.logger.info(f"🔧 TOOL CALL: {tool_name}({inputs})")
+        if self.logger.isEnabledFor(logging.INFO):
+            self._ensure_running()
+            self.logger.info(
+                "TOOL CALL: %s(%s)", tool_name, inputs,
+                extra={"event": "tool_call", "tool": tool_name}
+            )
     
     def tool_result(self, tool_name: str, success: bool, result: Any) -> None:
         """Log tool execution result"""
-        status = "✅ SUCCESS" if success else "❌ FAILED"
-        self.logger.info(f"{status}: {tool_name} → {result}")
+        if self.logger.isEnabledFor(logging.INFO):
+            self._ensure_running()
+            self.logger.info(
+                "%s: %s → %s", "SUCCESS" if success else "FAILED", tool_name, result,
+                extra={"event": "tool_result", "tool": tool_name, "success": success}
+            )
     
     def agent_response(self, response: str) -> None:
         """Log final agent response"""
-        self.logger.info(f"💬 RESPONSE: {response[:100]}{'...' if len(response) > 100 else ''}")
+        if self.logger.isEnabledFor(logging.INFO):
+            self._ensure_running()
+            self.logger.info(
+                "RESPONSE: %s%s", response[:100], "..." if len(response) > 100 else "",
+                extra={"event": "response"}
+            )
     
-    def error(self, message: str, exception: Exception = None) -> None:
-        """Log errors"""
-        self.logger.error(f"🚨 ERROR: {message}")
-        if exception:
-            self.logger.error(f"   Exception: {exception}")
+    def error(
+        self,
+        message: str,
+        *args: Any,
+        exception: Optional[BaseException] = None
+    ) -> None:
+        """Log errors; args are only formatted if the record is written"""
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._ensure_running()
+            extra = {"event": "error"}
+            if exception is not None:
+                extra["exception"] = str(exception)
+            self.logger.error("ERROR: " + message, *args, extra=extra)
     
-    def debug(self, message: str) -> None:
-        """Log debug information"""
-        self.logger.debug(f"🔍 DEBUG: {message}")
+    def debug(self, message: str, *args: Any) -> None:
+        """Log debug information; args are only formatted if DEBUG is enabled"""
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._ensure_running()
+            self.logger.debug("DEBUG: " + message, *args, extra={"event": "debug"})
 
 
 class ColoredFormatter(logging.Formatter):
-    """Custom formatter with colors for terminal output"""
+    """Custom formatter with colors and icons for terminal output"""
     
     # ANSI color codes
     COLORS = {
@@ -70,13 +218,59 @@ class ColoredFormatter(logging.Formatter):
     }
     RESET = '\033[0m'
     
-    def format(self, record):
-        # Add color to level name
+    ICONS = {
+        'thinking': '🤔 ',
+        'tool_call': '🔧 ',
+        'response': '💬 ',
+        'error': '🚨 ',
+        'debug': '🔍 ',
+    }
+    
+    def format(self, record: logging.LogRecord) -> str:
+        # Color a copy: the record is shared with every other handler
+        record = logging.makeLogRecord(record.__dict__)
         levelname = record.levelname
         if levelname in self.COLORS:
             record.levelname = f"{self.COLORS[levelname]}{levelname}{self.RESET}"
         
-        return super().format(record)
+        event = getattr(record, "event", None)
+        if event == "tool_result":
+            icon = '✅ ' if record.success else '❌ '
+        else:
+            icon = self.ICONS.get(event, '')
+        record.msg = icon + record.getMessage()
+        record.args = None
+        
+        text = super().format(record)
+        exception = getattr(record, "exception", None)
+        if exception is not None:
+            text += f"\n   Exception: {exception}"
+        return text
+
+
+# Attributes every LogRecord has; anything else was passed in `extra`
+_RECORD_ATTRIBUTES = frozenset(
+    logging.makeLogRecord({}).__dict__) | {"message", "asctime", "correlation_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with extra fields kept as keys"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+            + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "correlation_id": getattr(record, "correlation_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["traceback"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
 
 
 # Global logger instance
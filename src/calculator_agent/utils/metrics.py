@@ -0,0 +1,311 @@
+"""Performance metrics for agent turns, API calls and tools"""
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from ..models.schemas import TurnStats
+
+Labels = tuple[tuple[str, str], ...]
+
+# Seconds; API calls take hundreds of ms, tools and local turns microseconds
+LATENCY_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+COUNT_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10_000, 25_000, 50_000, 100_000)
+
+# name -> (type, help, buckets)
+METRICS: dict[str, tuple[str, str, tuple[float, ...]]] = {
+    "calculator_turns_total": (
+        "counter", "Turns handled, by how they were answered", ()),
+    "calculator_turn_errors_total": (
+        "counter", "Turns that ended with an error", ()),
+    "calculator_turn_duration_seconds": (
+        "histogram", "Time from user message to full response", LATENCY_BUCKETS),
+    "calculator_terminal_tool_turns_total": (
+        "counter", "Model turns answered from a tool result, one API call saved", ()),
+    "calculator_turn_iterations": (
+        "histogram", "Agent loop iterations per model turn", COUNT_BUCKETS),
+    "calculator_turn_input_tokens": (
+        "histogram", "Prompt tokens per model turn, cache included", TOKEN_BUCKETS),
+    "calculator_api_calls_total": (
+        "counter", "Messages API requests sent, retries and hedges included", ()),
+    "calculator_api_retries_total": (
+        "counter", "Messages API requests resent after a transient error", ()),
+    "calculator_api_request_duration_seconds": (
+        "histogram", "Latency of one Messages API call, retries included", LATENCY_BUCKETS),
+    "calculator_input_tokens_total": (
+        "counter", "Uncached input tokens sent", ()),
+    "calculator_output_tokens_total": (
+        "counter", "Output tokens received", ()),
+    "calculator_cache_read_input_tokens_total": (
+        "counter", "Input tokens read from the prompt cache", ()),
+    "calculator_cache_creation_input_tokens_total": (
+        "counter", "Input tokens written to the prompt cache", ()),
+    "calculator_tool_calls_total": (
+        "counter", "Tool executions, by tool and outcome", ()),
+    "calculator_tool_duration_seconds": (
+        "histogram", "Tool execution time, by tool", LATENCY_BUCKETS),
+}
+
+
+class MetricsSink(ABC):
+    """
+    Where metrics go; subclass to forward them to StatsD, OpenTelemetry, etc.
+
+    Names are the keys of METRICS; labels are sorted (name, value) pairs.
+    """
+
+    enabled = True
+
+    @abstractmethod
+    def inc(self, name: str, value: float = 1.0, labels: Labels = ()) -> None:
+        """Add value to a counter"""
+        pass
+
+    @abstractmethod
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        """Record one value in a histogram"""
+        pass
+
+
+class NullSink(MetricsSink):
+    """Drops everything; call sites check enabled and skip the work entirely"""
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1.0, labels: Labels = ()) -> None:
+        pass
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        pass
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class SnapshotSink(MetricsSink):
+    """
+    Keeps metrics in process, for snapshot() and the Prometheus exporter
+
+    Thread-safe, so the parallel tool pool and the event loop can share it.
+    """
+
+    def __init__(self):
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, labels: Labels = ()) -> None:
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                buckets = METRICS[name][2] if name in METRICS else LATENCY_BUCKETS
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """
+        Current values, by metric name then label set
+
+        Label sets are rendered like a=x,b=y ("" when there are none).
+        Histograms carry count, sum, estimated p50/p95/p99 and bucket counts.
+        """
+        result: dict[str, dict[str, Any]] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                result.setdefault(name, {})[_label_key(labels)] = value
+            for (name, labels), histogram in self._histograms.items():
+                result.setdefault(name, {})[_label_key(labels)] = histogram.snapshot()
+        return result
+
+    def reset(self) -> None:
+        """Forget every value"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (h.buckets, list(h.counts), h.sum, h.count))
+                for key, h in self._histograms.items()
+            )
+
+        lines: list[str] = []
+        described: set[str] = set()
+        for (name, labels), value in counters:
+            _describe(lines, described, name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            _describe(lines, described, name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip([*buckets, math.inf], counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                bucket_labels = _format_labels(labels + (("le", le),))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _label_key(labels: Labels) -> str:
+    return ",".join(f"{key}={value}" for key, value in labels)
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def _describe(lines: list[str], described: set[str], name: str, kind: str) -> None:
+    if name in described:
+        return
+    described.add(name)
+    if name in METRICS:
+        lines.append(f"# HELP {name} {METRICS[name][1]}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+class AgentMetrics:
+    """
+    Records the agent's numbers into the current sink
+
+    Off by default (NullSink). Call sites check `enabled` before timing
+    anything, so disabled metrics cost one attribute lookup per turn or
+    tool call.
+    """
+
+    def __init__(self, sink: Optional[MetricsSink] = None):
+        self.set_sink(sink if sink is not None else NullSink())
+
+    def set_sink(self, sink: MetricsSink) -> None:
+        """Send metrics to sink from now on"""
+        self.sink = sink
+        self.enabled = sink.enabled  # A plain attribute: the cheapest check
+
+    def enable(self) -> SnapshotSink:
+        """Collect metrics in process, keeping the current SnapshotSink if any"""
+        if not isinstance(self.sink, SnapshotSink):
+            self.set_sink(SnapshotSink())
+        return self.sink
+
+    def disable(self) -> None:
+        """Stop collecting metrics"""
+        self.set_sink(NullSink())
+
+    def record_turn(self, turn: "TurnStats") -> None:
+        """Record a finished turn's stats"""
+        sink = self.sink
+        if turn.fast_path:
+            path = "fast_path"
+        elif turn.turn_cache_hit:
+            path = "turn_cache"
+        else:
+            path = "model"
+        labels = (("path", path),)
+        sink.inc("calculator_turns_total", 1, labels)
+        if turn.duration is not None:
+            sink.observe("calculator_turn_duration_seconds", turn.duration, labels)
+        if turn.error:
+            sink.inc("calculator_turn_errors_total")
+        if path != "model":
+            return
+        if turn.terminal_tool:
+            sink.inc("calculator_terminal_tool_turns_total")
+
+        sink.observe(
+            "calculator_turn_iterations", turn.api_calls - turn.retries - turn.hedges
+        )
+        sink.observe(
+            "calculator_turn_input_tokens",
+            turn.input_tokens + turn.cache_creation_input_tokens
+            + turn.cache_read_input_tokens,
+        )
+        sink.inc("calculator_api_calls_total", turn.api_calls)
+        if turn.retries:
+            sink.inc("calculator_api_retries_total", turn.retries)
+        sink.inc("calculator_input_tokens_total", turn.input_tokens)
+        sink.inc("calculator_output_tokens_total", turn.output_tokens)
+        sink.inc("calculator_cache_read_input_tokens_total", turn.cache_read_input_tokens)
+        sink.inc(
+            "calculator_cache_creation_input_tokens_total",
+            turn.cache_creation_input_tokens,
+        )
+
+    def record_api_call(self, seconds: float) -> None:
+        """Record the latency of one Messages API call"""
+        self.sink.observe("calculator_api_request_duration_seconds", seconds)
+
+    def record_tool(self, tool_name: str, seconds: float, success: bool) -> None:
+        """Record one tool execution"""
+        status = "success" if success else "error"
+        self.sink.inc(
+            "calculator_tool_calls_total", 1, (("status", status), ("tool", tool_name))
+        )
+        self.sink.observe("calculator_tool_duration_seconds", seconds, (("tool", tool_name),))
+
+
+# Global metrics shared by every agent and tool in the process
+metrics = AgentMetrics()
+
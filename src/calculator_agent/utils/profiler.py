@@ -0,0 +1,226 @@
+"""Per-turn cProfile profiles, flamegraph input and hotspot summaries"""
+import cProfile
+import pstats
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from ..models.schemas import TurnStats
+
+# pstats function key: (filename, line number, function name)
+Function = tuple[str, int, str]
+
+# Code that runs while a turn waits on the Messages API: our client package
+# (retries, rate limiting, the offline fake), the SDK and its HTTP stack.
+# Everything called from these counts as API time, not local work.
+API_PACKAGES = frozenset({"anthropic", "httpx", "httpx2", "httpcore", "h11", "h2", "anyio"})
+API_STDLIB_MODULES = frozenset({"ssl", "socket", "selectors"})
+_PACKAGE = Path(__file__).resolve().parent.parent
+
+
+class Hotspot(NamedTuple):
+    """A function's share of a turn's local time"""
+    name: str
+    calls: int
+    self_time: float  # Seconds in the function itself
+    cumulative_time: float  # Seconds including what it called
+
+
+class TurnProfile(NamedTuple):
+    """Where one turn's time went, and where its profile files are"""
+    turn: int
+    wall_time: float  # Seconds from user message to response
+    api_time: float  # Seconds waiting on Messages API calls
+    api_calls: int
+    cpu_time: float  # Process CPU seconds during the turn
+    hotspots: list[Hotspot]  # Local functions by self time, most first
+    profile_path: Path  # pstats file, e.g. for snakeviz
+    collapsed_path: Path  # Collapsed stacks, for flamegraph.pl or speedscope
+
+    @property
+    def local_time(self) -> float:
+        """Wall seconds not spent waiting on the API"""
+        return max(self.wall_time - self.api_time, 0.0)
+
+    def summary(self) -> str:
+        """A few lines for the terminal: the time split, then the hotspots"""
+        lines = [
+            f"⏱  Turn {self.turn}: {self.wall_time * 1000:.1f} ms = "
+            f"API {self.api_time * 1000:.1f} ms ({self.api_calls} calls) + "
+            f"local {self.local_time * 1000:.1f} ms (CPU {self.cpu_time * 1000:.1f} ms)",
+            f"   {'self ms':>9} {'cum ms':>9} {'calls':>6}  function",
+        ]
+        for spot in self.hotspots:
+            lines.append(
+                f"   {spot.self_time * 1000:9.3f} {spot.cumulative_time * 1000:9.3f} "
+                f"{spot.calls:6}  {spot.name}"
+            )
+        lines.append(f"   profile: {self.profile_path}, flamegraph: {self.collapsed_path}")
+        return "\n".join(lines)
+
+
+def function_name(function: Function) -> str:
+    """Short readable name, like agents/calculator_agent.py:676(run)"""
+    filename, line, name = function
+    if filename == "~":  # Built-in functions
+        return name
+    path = Path(filename)
+    return f"{path.parent.name}/{path.name}:{line}({name})"
+
+
+def is_api_function(function: Function) -> bool:
+    """Whether a function belongs to the Messages API client side"""
+    path = Path(function[0])
+    if path.is_relative_to(_PACKAGE):
+        return path.parent == _PACKAGE / "client"
+    return path.stem in API_STDLIB_MODULES or not API_PACKAGES.isdisjoint(path.parts)
+
+
+class CallGraph(NamedTuple):
+    """A profile's time split into stacks and local self time"""
+    stacks: dict[str, float]  # Seconds by "root;caller;...;function"
+    local_self_time: dict[Function, float]  # Seconds outside API calls
+    api_time: float  # Seconds under API client functions
+
+
+def split_call_graph(stats: pstats.Stats, max_depth: int = 64) -> CallGraph:
+    """
+    Reconstruct call stacks from a profile, separating API waits
+
+    cProfile only records caller -> callee edges, so a function's time is
+    split between the stacks it appears in by how much each caller spent
+    in it. That is exact for call trees and a close estimate otherwise;
+    recursive calls are folded into the first occurrence. The first API
+    client function on a stack ends it: its whole cumulative time is one
+    stack entry, counted as API time.
+    """
+    entries = stats.stats  # type: ignore[attr-defined]
+    callees: dict[Function, list[tuple[Function, float]]] = {}
+    for function, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((function, cumulative))
+
+    stacks: dict[str, float] = {}
+    local_self_time: dict[Function, float] = {}
+    api_time = 0.0
+
+    def walk(function: Function, path: str, seen: frozenset, time_in: float) -> None:
+        nonlocal api_time
+        _, _, self_time, cumulative, _ = entries[function]
+        if cumulative <= 0 or time_in <= 0:
+            return
+        if is_api_function(function):
+            stacks[path] = stacks.get(path, 0.0) + time_in
+            api_time += time_in
+            return
+        share = min(time_in / cumulative, 1.0)
+        stacks[path] = stacks.get(path, 0.0) + self_time * share
+        local_self_time[function] = local_self_time.get(function, 0.0) + self_time * share
+        if len(seen) >= max_depth:
+            return
+        for callee, callee_time in callees.get(function, ()):
+            if callee not in seen and callee in entries:
+                walk(callee, f"{path};{_frame(callee)}", seen | {callee}, callee_time * share)
+
+    for function, (_, _, _, cumulative, callers) in entries.items():
+        if not callers:
+            walk(function, _frame(function), frozenset({function}), cumulative)
+    return CallGraph(stacks, local_self_time, api_time)
+
+
+def _frame(function: Function) -> str:
+    """A stack frame name; semicolons separate frames in the collapsed format"""
+    return function_name(function).replace(";", ",")
+
+
+class TurnProfiler:
+    """
+    Profiles agent turns with cProfile, one profile per turn
+
+    Time spent in the Messages API client (see API_PACKAGES) is reported as
+    API time and left out of the hotspots, so they show where local time
+    went: pydantic validation, logging, tools, context building. For every
+    turn it writes turn-NNNN.prof (pstats) and turn-NNNN.collapsed (one
+    "a;b;c microseconds" line per stack) to directory.
+
+    Only one cProfile profiler can run in a process at a time, so a turn
+    that starts while another is being profiled (concurrent async turns)
+    is not profiled.
+    """
+
+    def __init__(self, directory: str | Path = ".profiles", top: int = 10):
+        self.directory = Path(directory)
+        self.top = top
+        self.turns = 0
+        self.last: Optional[TurnProfile] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._cpu_started = 0.0
+
+    def start(self) -> None:
+        """Start profiling a turn"""
+        self._stop_profile()  # Left running by a turn that raised
+        profile = cProfile.Profile()
+        self._cpu_started = time.process_time()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiler is active
+            return
+        self._profile = profile
+
+    def stop(self, turn: "TurnStats") -> Optional[TurnProfile]:
+        """
+        Finish the turn's profile and write its files
+
+        Returns:
+            The turn's profile (also kept in last), or None if it wasn't profiled
+        """
+        profile = self._stop_profile()
+        if profile is None:
+            return None
+        cpu_time = time.process_time() - self._cpu_started
+
+        self.turns += 1
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base = self.directory / f"turn-{self.turns:04d}"
+        profile_path = base.with_suffix(".prof")
+        collapsed_path = base.with_suffix(".collapsed")
+
+        stats = pstats.Stats(profile)
+        stats.dump_stats(profile_path)
+        graph = split_call_graph(stats)
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            for stack, seconds in sorted(graph.stacks.items()):
+                microseconds = round(seconds * 1_000_000)
+                if microseconds:
+                    f.write(f"{stack} {microseconds}\n")
+
+        self.last = TurnProfile(
+            turn=self.turns,
+            wall_time=turn.duration or 0.0,
+            api_time=turn.api_time,
+            api_calls=turn.api_calls,
+            cpu_time=cpu_time,
+            hotspots=self._hotspots(stats, graph),
+            profile_path=profile_path,
+            collapsed_path=collapsed_path,
+        )
+        return self.last
+
+    def _stop_profile(self) -> Optional[cProfile.Profile]:
+        profile, self._profile = self._profile, None
+        if profile is not None:
+            profile.disable()
+        return profile
+
+    def _hotspots(self, stats: pstats.Stats, graph: CallGraph) -> list[Hotspot]:
+        """The top local functions by self time"""
+        entries = stats.stats  # type: ignore[attr-defined]
+        spots = [
+            Hotspot(function_name(function), entries[function][1], self_time,
+                    entries[function][3])
+            for function, self_time in graph.local_self_time.items()
+            if self_time > 0 and "_lsprof.Profiler" not in function[2]
+        ]
+        spots.sort(key=lambda spot: spot.self_time, reverse=True)
+        return spots[:self.top]
@@ -0,0 +1,840 @@
+"""Pytest tests for the calculator agent loop"""
+import asyncio
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+from src.calculator_agent.agents.async_calculator_agent import AsyncCalculatorAgent
+from src.calculator_agent.agents.fast_path import is_multi_step, uses_every_number
+from src.calculator_agent.agents.turn_cache import (
+    DiskTurnCacheBackend,
+    InMemoryTurnCacheBackend,
+    TurnCache
+)
+from src.calculator_agent.client.fake import FakeAsyncAnthropic
+from src.calculator_agent.state.db_storage import SQLiteMemory
+
+
+def tool_use_block(block_id, name, tool_input):
+    """Build a fake tool_use content block"""
+    return SimpleNamespace(type="tool_use", id=block_id, name=name, input=tool_input)
+
+
+def text_block(text):
+    """Build a fake text content block"""
+    return SimpleNamespace(type="text", text=text)
+
+
+def fake_response(stop_reason, *content, usage=None):
+    """Build a fake Messages API response"""
+    return SimpleNamespace(stop_reason=stop_reason, content=list(content), usage=usage)
+
+
+def fake_usage(input_tokens, output_tokens, cache_write=0, cache_read=0):
+    """Build fake token usage for a response"""
+    return SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cache_creation_input_tokens=cache_write,
+        cache_read_input_tokens=cache_read,
+    )
+
+
+class FakeStream:
+    """Stands in for a MessageStream, replaying a response's text as deltas"""
+    
+    def __init__(self, response):
+        self.response = response
+        self.text_stream = [
+            block.text[i:i + 4]
+            for block in response.content if block.type == "text"
+            for i in range(0, len(block.text), 4)
+        ]
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def get_final_message(self):
+        return self.response
+
+
+class FakeMessages:
+    """Serves scripted responses (or raises scripted errors), recording every call"""
+    
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+    
+    def _next(self):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+    
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return self._next()
+    
+    def stream(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakeStream(self._next())
+
+
+class FakeAsyncMessages(FakeMessages):
+    """Async variant that can also simulate a slow API"""
+    
+    def __init__(self, responses, delay=0.0):
+        super().__init__(responses)
+        self.delay = delay
+    
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        return self._next()
+
+
+def make_agent(*responses, fast_path=False, turn_cache=None):
+    """Create an agent whose client serves the given responses"""
+    agent = CalculatorAgent(turn_cache=turn_cache)
+    agent.use_fast_path = fast_path
+    agent.client = SimpleNamespace(messages=FakeMessages(responses))
+    return agent
+
+
+class TestLazyStartup:
+    """Heavy dependencies are only loaded when a turn needs Claude"""
+    
+    def test_local_turn_does_not_import_anthropic(self):
+        code = (
+            "import sys\n"
+            "from src.calculator_agent.agents.calculator_agent import CalculatorAgent\n"
+            "print(CalculatorAgent().run('15 + 27'))\n"
+            "print('anthropic' in sys.modules)\n"
+        )
+        env = {k: v for k, v in os.environ.items() if k != "ANTHROPIC_API_KEY"}
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            env=env,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        )
+        
+        assert result.returncode == 0, result.stderr
+        answer, imported = result.stdout.strip().splitlines()
+        assert "42" in answer
+        assert imported == "False"
+    
+    def test_client_is_created_on_first_use(self):
+        agent = CalculatorAgent()
+        
+        assert agent._client is None
+        client = agent.client
+        assert client is agent.client
+
+
+class TestParallelToolUse:
+    """Tests for executing several tool_use blocks in one round trip"""
+    
+    def test_all_tool_uses_run_in_one_round_trip(self):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 3, "b": 4}),
+                tool_use_block("t2", "multiply_numbers", {"a": 5, "b": 6}),
+            ),
+            fake_response("end_turn", text_block("3 + 4 = 7 and 5 × 6 = 30")),
+        )
+        
+        response = agent.run("add 3 and 4 and multiply 5 by 6")
+        
+        assert response == "3 + 4 = 7 and 5 × 6 = 30"
+        # One call for the tool_use batch, one for the final answer
+        assert len(agent.client.messages.calls) == 2
+    
+    def test_tool_results_sent_as_one_user_message(self):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 3, "b": 4}),
+                tool_use_block("t2", "multiply_numbers", {"a": 5, "b": 6}),
+            ),
+            fake_response("end_turn", text_block("Done")),
+        )
+        
+        agent.run("add 3 and 4 and multiply 5 by 6")
+        
+        last_messages = agent.client.messages.calls[-1]["messages"]
+        tool_results = last_messages[-1]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["t1", "t2"]
+        assert tool_results[0]["content"] == "3.0 + 4.0 = 7.0"
+        assert tool_results[1]["content"] == "5.0 × 6.0 = 30.0"
+    
+    def test_memory_side_effects_follow_block_order(self):
+        for _ in range(20):
+            agent = make_agent(
+                fake_response(
+                    "tool_use",
+                    tool_use_block("t1", "add_numbers", {"a": 3, "b": 4}),
+                    tool_use_block("t2", "multiply_numbers", {"a": 5, "b": 6}),
+                    tool_use_block("t3", "save_result", {"name": "x", "value": 1}),
+                ),
+                fake_response("end_turn", text_block("Done")),
+            )
+            
+            agent.run("add 3 and 4, multiply 5 by 6 and save 1 as x")
+            
+            assert agent.memory.get_last_result() == 1
+            assert agent.get_conversation_history() == [
+                "Added 3.0 + 4.0 = 7.0",
+                "Multiplied 5.0 × 6.0 = 30.0",
+                "Saved 1.0 as 'x'",
+            ]
+    
+    def test_unknown_tool_in_batch_is_reported(self):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 1, "b": 2}),
+                tool_use_block("t2", "sqrt_numbers", {"a": 9}),
+            ),
+            fake_response("end_turn", text_block("Done")),
+        )
+        
+        agent.run("add 1 and 2 and take the square root of 9")
+        
+        tool_results = agent.client.messages.calls[-1]["messages"][-1]["content"]
+        assert tool_results[0]["is_error"] is False
+        assert tool_results[1]["is_error"] is True
+        assert agent.memory.get_last_result() == 3
+
+
+class TestStreaming:
+    """Tests for run_stream()"""
+    
+    def test_stream_yields_deltas_across_tool_use(self):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                text_block("Let me add."),
+                tool_use_block("t1", "add_numbers", {"a": 15, "b": 27}),
+            ),
+            fake_response("end_turn", text_block("15 plus 27 equals 42.")),
+        )
+        
+        chunks = list(agent.run_stream("What's 15 plus 27?"))
+        
+        assert len(chunks) > 2
+        assert "".join(chunks) == "Let me add.\n\n15 plus 27 equals 42."
+        assert agent.memory.get_last_result() == 42
+    
+    def test_abandoned_stream_still_ends_the_turn(self):
+        agent = make_agent(
+            fake_response("end_turn", text_block("A long answer, streamed in parts.")),
+        )
+        ended = []
+        agent.memory.end_turn = lambda: ended.append(True)
+        
+        stream = agent.run_stream("Tell me a story")
+        next(stream)
+        stream.close()
+        
+        assert ended == [True]
+        assert agent.stats.turns == 1
+        assert agent.last_turn_stats.error is True
+        assert agent.last_turn_stats.duration is not None
+    
+    def test_interrupted_run_still_ends_the_turn(self):
+        class InterruptedMessages(FakeMessages):
+            def create(self, **kwargs):
+                raise KeyboardInterrupt
+        
+        agent = make_agent()
+        agent.client = SimpleNamespace(messages=InterruptedMessages([]))
+        
+        with pytest.raises(KeyboardInterrupt):
+            agent.run("What's 1 plus 2?")
+        
+        assert agent.stats.turns == 1
+        assert agent.last_turn_stats.error is True
+    
+    def test_stream_records_turn_stats(self):
+        agent = make_agent(
+            fake_response(
+                "tool_use", tool_use_block("t1", "add_numbers", {"a": 1, "b": 2})
+            ),
+            fake_response("end_turn", text_block("3")),
+        )
+        
+        list(agent.run_stream("What's 1 plus 2?"))
+        
+        stats = agent.last_turn_stats
+        assert stats.api_calls == 2
+        assert stats.time_to_first_token is not None
+        assert 0 <= stats.time_to_first_token <= stats.duration
+
+
+class TestContextBudget:
+    """Tests for the size-capped memory context sent to Claude"""
+    
+    def test_small_memory_is_listed_in_full(self):
+        agent = make_agent(fake_response("end_turn", text_block("ok")))
+        agent.memory.save_result("a", 1)
+        agent.memory.save_result("b", 2)
+        
+        agent.run("Hello")
+        
+        content = agent.client.messages.calls[0]["messages"][0]["content"]
+        assert content.startswith(
+            "Context: Most recent calculation result: 2 | Saved results: a=1.0, b=2.0"
+        )
+        assert agent.last_turn_stats.context_tokens_saved == 0
+    
+    def test_over_budget_keeps_referenced_recent_and_used_names(self):
+        agent = make_agent(fake_response("end_turn", text_block("ok")))
+        agent.context_builder.token_budget = 20
+        for i in range(1000):
+            agent.memory.save_result(f"value_{i}", i)
+        agent.memory.recall_result("value_7")
+        
+        agent.run("What is value_123 plus 1?")
+        
+        content = agent.client.messages.calls[0]["messages"][0]["content"]
+        assert "of 1000 shown, use recall_result for others" in content
+        assert "value_123=123.0" in content
+        assert "value_999=999.0" in content
+        assert "value_7=7.0" in content
+        assert "value_500=" not in content
+        assert agent.last_turn_stats.context_tokens_saved > 1000
+        assert agent.stats.context_tokens_saved == agent.last_turn_stats.context_tokens_saved
+    
+    def test_full_listing_is_reused_until_memory_changes(self):
+        agent = make_agent()
+        agent.memory.save_result("a", 1)
+        builder = agent.context_builder
+        
+        first = builder._listing()
+        assert builder._listing() is first
+        
+        agent.memory.save_result("b", 2)
+        assert builder._listing() == "a=1.0, b=2.0"
+        
+        # Overwrites rebuild the listing, later saves extend it
+        agent.memory.save_result("a", 3)
+        assert builder._listing() == "a=3.0, b=2.0"
+        agent.memory.save_result("c", 4)
+        agent.memory.save_result("d", 5)
+        assert builder._listing() == "a=3.0, b=2.0, c=4.0, d=5.0"
+        agent.memory.clear()
+        agent.memory.save_result("e", 6)
+        assert builder._listing() == "e=6.0"
+
+
+class TestMemoryBackend:
+    """Tests for plugging a storage backend into the agent"""
+    
+    def test_turn_writes_are_persisted_when_the_turn_ends(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        agent = CalculatorAgent(memory=SQLiteMemory(path, flush_interval=0))
+        
+        agent.run("15 + 27")
+        
+        assert SQLiteMemory(path).get_last_result() == 42.0
+
+
+class TestPromptCaching:
+    """Tests for prompt cache breakpoints and usage accounting"""
+    
+    def test_cache_breakpoints_on_tools_and_system(self):
+        agent = make_agent(fake_response("end_turn", text_block("Hi")))
+        
+        agent.run("Hello")
+        
+        request = agent.client.messages.calls[0]
+        assert request["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+        assert all("cache_control" not in tool for tool in request["tools"][:-1])
+        assert request["system"][0]["text"] == agent.system_prompt
+        assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+        # The plain definitions are left untouched
+        assert "cache_control" not in agent.tool_definitions[-1]
+    
+    def test_cache_usage_is_summed_per_turn(self):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 1, "b": 2}),
+                usage=fake_usage(20, 30, cache_write=900),
+            ),
+            fake_response(
+                "end_turn", text_block("3"), usage=fake_usage(60, 10, cache_read=900)
+            ),
+        )
+        
+        agent.run("What's 1 plus 2?")
+        
+        stats = agent.last_turn_stats
+        assert stats.input_tokens == 80
+        assert stats.output_tokens == 40
+        assert stats.cache_creation_input_tokens == 900
+        assert stats.cache_read_input_tokens == 900
+        assert stats.cache_hit_rate == pytest.approx(900 / 1880)
+
+
+class TestFastPath:
+    """Tests for answering simple requests without calling Claude"""
+    
+    def test_simple_conversation_needs_no_api_calls(self):
+        agent = make_agent(fast_path=True)
+        
+        assert agent.run("What's 15 plus 27?") == "15.0 + 27.0 = 42.0"
+        assert agent.run("Multiply that by 3") == "42.0 × 3.0 = 126.0"
+        assert agent.run("Save that as my_total") == "Saved 126.0 as 'my_total'"
+        assert agent.run("what's my_total squared") == "126.0^2.0 = 15876.0"
+        assert agent.run("What was my_total?").startswith("'my_total' = 126.0")
+        
+        assert agent.client.messages.calls == []
+        assert agent.stats.fast_path_hits == 5
+        assert agent.stats.fast_path_hit_rate == 1.0
+        assert agent.last_turn_stats.fast_path is True
+    
+    def test_falls_back_to_model_when_not_confident(self):
+        agent = make_agent(
+            fake_response("end_turn", text_block("Please tell me a number first.")),
+            fake_response("end_turn", text_block("Hello!")),
+            fast_path=True,
+        )
+        
+        # No previous result to resolve "that" against
+        assert agent.run("Multiply that by 3") == "Please tell me a number first."
+        assert agent.run("Hi there, how are you?") == "Hello!"
+        
+        assert len(agent.client.messages.calls) == 2
+        assert agent.stats.fast_path_hits == 0
+    
+    def test_reports_savings(self):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 3, "b": 4}),
+                tool_use_block("t2", "multiply_numbers", {"a": 5, "b": 6}),
+            ),
+            fake_response("end_turn", text_block("7 and 30")),
+            fast_path=True,
+        )
+        
+        agent.run("add 3 and 4 and multiply 5 by 6")
+        agent.run("add 1 and 2")
+        
+        assert agent.stats.turns == 2
+        assert agent.stats.fast_path_hits == 1
+        assert agent.stats.api_calls == 2
+        assert agent.stats.api_calls_saved == 2.0
+        assert agent.stats.model_turns == 1
+
+
+class TestTerminalTools:
+    """Tests for answering single-tool turns from the tool result"""
+    
+    def add_turn(self, *content):
+        """The model's first response to "What's 15 plus 27?" with extra content"""
+        return fake_response(
+            "tool_use", *content, tool_use_block("t1", "add_numbers", {"a": 15, "b": 27})
+        )
+    
+    def test_single_tool_turn_skips_the_summary_call(self):
+        agent = make_agent(self.add_turn())
+        agent.use_terminal_tools = True
+        
+        assert agent.run("What's 15 plus 27?") == "15 + 27 = 42"
+        
+        assert len(agent.client.messages.calls) == 1
+        assert agent.memory.get_last_result() == 42
+        assert agent.last_turn_stats.terminal_tool is True
+        assert agent.stats.terminal_tool_turns == 1
+        assert agent.stats.api_calls_saved == 1.0
+    
+    @pytest.mark.parametrize("message, tool_use, expected", [
+        ("Divide 10 by 4", ("divide_numbers", {"a": 10, "b": 4}), "10 ÷ 4 = 2.5"),
+        ("2 to the power of 8", ("power_numbers", {"a": 2, "b": 8}), "2 ^ 8 = 256"),
+        ("Save 42 as total", ("save_result", {"name": "total", "value": 42}), "Saved 42 as total."),
+        ("What was x?", ("recall_result", {"name": "x"}), "x is 5."),
+    ])
+    def test_replies_are_written_for_the_user(self, message, tool_use, expected):
+        agent = make_agent(fake_response("tool_use", tool_use_block("t1", *tool_use)))
+        agent.use_terminal_tools = True
+        agent.memory.save_result("x", 5)
+        
+        assert agent.run(message) == expected
+    
+    def test_expression_tool_is_not_terminal(self):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "evaluate_expression", {"expression": "15 + 27"})
+            ),
+            fake_response("end_turn", text_block("15 plus 27 is 42.")),
+        )
+        agent.use_terminal_tools = True
+        
+        assert agent.run("What's 15 plus 27?") == "15 plus 27 is 42."
+        assert agent.last_turn_stats.terminal_tool is False
+    
+    def test_off_by_default(self):
+        agent = make_agent(self.add_turn(), fake_response("end_turn", text_block("42")))
+        
+        assert agent.run("What's 15 plus 27?") == "42"
+        assert len(agent.client.messages.calls) == 2
+        assert agent.stats.terminal_tool_turns == 0
+    
+    @pytest.mark.parametrize("message, first_response", [
+        # Several operations asked for, even if the model starts with one
+        (
+            "Add 15 and 27, then multiply by 3",
+            fake_response(
+                "tool_use", tool_use_block("t1", "add_numbers", {"a": 15, "b": 27})
+            ),
+        ),
+        # Several tools in one response
+        (
+            "What's 15 plus 27 and 2 times 3?",
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 15, "b": 27}),
+                tool_use_block("t2", "multiply_numbers", {"a": 2, "b": 3}),
+            ),
+        ),
+        # A derived operation the first call only starts
+        (
+            "What is the average of 3 and 5?",
+            fake_response(
+                "tool_use", tool_use_block("t1", "add_numbers", {"a": 3, "b": 5})
+            ),
+        ),
+        # A call that leaves a number in the message unused
+        (
+            "What's 15 plus 27?",
+            fake_response(
+                "tool_use", tool_use_block("t1", "add_numbers", {"a": 15, "b": 20})
+            ),
+        ),
+        # A failed tool, which the model should explain
+        (
+            "What's 1 divided by 0?",
+            fake_response(
+                "tool_use", tool_use_block("t1", "divide_numbers", {"a": 1, "b": 0})
+            ),
+        ),
+    ])
+    def test_model_still_answers(self, message, first_response):
+        agent = make_agent(
+            first_response, fake_response("end_turn", text_block("Done."))
+        )
+        agent.use_terminal_tools = True
+        
+        assert agent.run(message) == "Done."
+        assert len(agent.client.messages.calls) == 2
+        assert agent.last_turn_stats.terminal_tool is False
+    
+    def test_stream_follows_earlier_text(self):
+        agent = make_agent(self.add_turn(text_block("Let me add.")))
+        agent.use_terminal_tools = True
+        
+        chunks = list(agent.run_stream("What's 15 plus 27?"))
+        
+        assert "".join(chunks) == "Let me add.\n\n15 + 27 = 42"
+        assert len(agent.client.messages.calls) == 1
+        assert agent.last_turn_stats.time_to_first_token is not None
+    
+    def test_async(self):
+        agent = make_async_agent(self.add_turn())
+        agent.use_terminal_tools = True
+        
+        assert asyncio.run(agent.arun("What's 15 plus 27?")) == "15 + 27 = 42"
+        assert len(agent.client.messages.calls) == 1
+        assert agent.stats.terminal_tool_turns == 1
+    
+    @pytest.mark.parametrize("message, expected", [
+        ("What's 15 plus 27?", False),
+        ("Multiply that by 3", False),
+        ("Save that as my_total", False),
+        ("Remind me what was total", False),
+        ("Combine 15 and 27", False),
+        ("What's 15 plus 27 times 2?", True),
+        ("Add 1 and 2, then save it as x", True),
+        ("(15 + 27) * 3", True),
+        ("Square it; cube it", True),
+        ("Add 3, 4 and 5", True),
+        ("Sum 1, 2, 3 and 4", True),
+        ("What is the average of 3 and 5?", True),
+        ("Convert 100 F to celsius", True),
+        ("What's 20% of 50?", True),
+        ("What's 1,000 plus 24?", False),
+    ])
+    def test_is_multi_step(self, message, expected):
+        assert is_multi_step(message) is expected
+    
+    @pytest.mark.parametrize("message, tool_input, expected", [
+        ("What's 15 plus 27?", {"a": 15, "b": 27}, True),
+        ("What's 10 minus 4?", {"a": 10, "b": -4}, True),
+        ("5 squared", {"a": 5, "b": 2}, True),
+        ("Save 42 as x2", {"name": "x2", "value": 42}, True),
+        ("What's 15 plus 27?", {"a": 15, "b": 7}, False),
+    ])
+    def test_uses_every_number(self, message, tool_input, expected):
+        assert uses_every_number(message, tool_input) is expected
+
+
+class TestTurnCache:
+    """Tests for the whole-turn response cache"""
+    
+    def power_turn(self):
+        return (
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "power_numbers", {"a": 2, "b": 10}),
+            ),
+            fake_response("end_turn", text_block("2 to the power of 10 is 1024.")),
+        )
+    
+    def test_fresh_session_replays_cached_turn(self):
+        cache = TurnCache(InMemoryTurnCacheBackend())
+        first = make_agent(*self.power_turn(), turn_cache=cache)
+        second = make_agent(turn_cache=cache)
+        
+        first.run("What's 2 to the power of 10?")
+        response = second.run("what's 2 to the power of 10")
+        
+        assert response == "2 to the power of 10 is 1024."
+        assert second.client.messages.calls == []
+        assert second.last_turn_stats.turn_cache_hit is True
+        assert second.stats.turn_cache_hits == 1
+        # Side effects are replayed so follow-ups can use "that"
+        assert second.memory.get_last_result() == 1024
+        assert second.get_conversation_history() == ["Calculated 2.0 ^ 10.0 = 1024.0"]
+    
+    def test_key_depends_on_memory_sent_to_the_model(self):
+        cache = TurnCache(InMemoryTurnCacheBackend())
+        agent = make_agent(turn_cache=cache)
+        message = "double that and add my_total"
+        
+        def key(text):
+            return cache.make_key(text, agent.context_builder.build(text).text)
+        
+        base_key = key(message)
+        agent.memory.set_last_result(3.0)
+        last_key = key(message)
+        agent.memory.save_result("my_total", 5.0)
+        agent.memory.set_last_result(3.0)
+        saved_key = key(message)
+        
+        assert len({base_key, last_key, saved_key}) == 3
+        assert key(message) == saved_key
+        assert key("DOUBLE that  and add my_total?") == saved_key
+        # Names the message doesn't mention are still in the model's context
+        agent.memory.save_result("unrelated", 1.0)
+        agent.memory.set_last_result(3.0)
+        assert key(message) != saved_key
+    
+    def test_sessions_with_different_memory_do_not_share_turns(self):
+        cache = TurnCache(InMemoryTurnCacheBackend())
+        first = make_agent(
+            fake_response(
+                "tool_use", tool_use_block("t1", "add_numbers", {"a": 10, "b": 5})
+            ),
+            fake_response("end_turn", text_block("10.0 + 5.0 = 15.0")),
+            turn_cache=cache,
+        )
+        second = make_agent(
+            fake_response(
+                "tool_use", tool_use_block("t1", "add_numbers", {"a": 100, "b": 5})
+            ),
+            fake_response("end_turn", text_block("100.0 + 5.0 = 105.0")),
+            turn_cache=cache,
+        )
+        first.memory.set_last_result(10.0)
+        second.memory.set_last_result(100.0)
+        
+        first.run("add 5")
+        
+        assert second.run("add 5") == "100.0 + 5.0 = 105.0"
+        assert second.last_turn_stats.turn_cache_hit is False
+        assert second.memory.get_last_result() == 105
+    
+    def test_errors_are_not_cached(self):
+        class FailingMessages(FakeMessages):
+            def create(self, **kwargs):
+                self.calls.append(kwargs)
+                raise RuntimeError("overloaded")
+        
+        cache = TurnCache(InMemoryTurnCacheBackend())
+        agent = make_agent(turn_cache=cache)
+        agent.client = SimpleNamespace(messages=FailingMessages([]))
+        
+        agent.run("What's 2 to the power of 10?")
+        agent.run("What's 2 to the power of 10?")
+        
+        assert len(agent.client.messages.calls) == 2
+        assert cache.hits == 0
+    
+    def test_streamed_turns_are_cached(self):
+        cache = TurnCache(InMemoryTurnCacheBackend())
+        first = make_agent(*self.power_turn(), turn_cache=cache)
+        second = make_agent(turn_cache=cache)
+        
+        streamed = "".join(first.run_stream("What's 2 to the power of 10?"))
+        
+        assert "".join(second.run_stream("What's 2 to the power of 10?")) == streamed
+        assert second.memory.get_last_result() == 1024
+    
+    def test_ttl_expiry(self):
+        backend = InMemoryTurnCacheBackend()
+        backend.set("key", {"response": "hi", "operations": []}, ttl=-1)
+        
+        assert backend.get("key") is None
+    
+    def test_disk_backend(self, tmp_path):
+        path = str(tmp_path / "turns.sqlite3")
+        backend = DiskTurnCacheBackend(path, maxsize=2)
+        backend.set("a", {"response": "A", "operations": [["set_last_result", [1.0]]]}, 60)
+        backend.set("b", {"response": "B", "operations": []}, 60)
+        backend.set("c", {"response": "C", "operations": []}, 60)
+        
+        # Entries persist across connections; the oldest was evicted
+        reopened = DiskTurnCacheBackend(path, maxsize=2)
+        assert reopened.get("a") is None
+        assert reopened.get("c") == {"response": "C", "operations": []}
+        
+        backend.set("d", {"response": "D", "operations": []}, -1)
+        assert backend.get("d") is None
+
+
+def make_async_agent(*responses, delay=0.0, fast_path=False):
+    """Create an async agent whose client serves the given responses"""
+    agent = AsyncCalculatorAgent()
+    agent.use_fast_path = fast_path
+    agent.client = SimpleNamespace(messages=FakeAsyncMessages(responses, delay))
+    return agent
+
+
+class TestAsyncCalculatorAgent:
+    """Tests for the asyncio agent"""
+    
+    def test_arun_executes_tools_and_returns_text(self):
+        agent = make_async_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 15, "b": 27}),
+                tool_use_block("t2", "save_result", {"name": "x", "value": 2}),
+            ),
+            fake_response("end_turn", text_block("15 plus 27 equals 42.")),
+        )
+        
+        response = asyncio.run(agent.arun("What's 15 plus 27? Save 2 as x"))
+        
+        assert response == "15 plus 27 equals 42."
+        assert len(agent.client.messages.calls) == 2
+        assert agent.memory.get_last_result() == 2
+        assert agent.get_saved_results() == {"x": 2}
+    
+    def test_concurrent_sessions_share_one_event_loop(self):
+        agents = [
+            make_async_agent(
+                fake_response(
+                    "tool_use", tool_use_block("t1", "add_numbers", {"a": i, "b": 1})
+                ),
+                fake_response("end_turn", text_block(f"{i + 1}")),
+                delay=0.05,
+            )
+            for i in range(20)
+        ]
+        
+        async def run_all():
+            return await asyncio.gather(*(agent.arun("add 1") for agent in agents))
+        
+        responses = asyncio.run(run_all())
+        
+        assert responses == [f"{i + 1}" for i in range(20)]
+        assert [agent.memory.get_last_result() for agent in agents] == [
+            i + 1 for i in range(20)
+        ]
+    
+    def test_sync_run_stream_drives_the_async_client(self):
+        agent = AsyncCalculatorAgent()
+        agent.use_fast_path = False
+        agent.client = FakeAsyncAnthropic()
+        
+        chunks = list(agent.run_stream("2 times 8"))
+        
+        assert "16" in "".join(chunks)
+        assert agent.stats.turns == 1
+        assert agent.last_turn_stats.error is False
+    
+    def test_closing_the_sync_stream_ends_the_turn(self):
+        agent = AsyncCalculatorAgent()
+        agent.use_fast_path = False
+        agent.client = FakeAsyncAnthropic()
+        
+        stream = agent.run_stream("2 times 8")
+        next(stream)
+        stream.close()
+        
+        assert agent.stats.turns == 1
+        assert agent.last_turn_stats.error is True
+    
+    def test_turn_timeout(self):
+        agent = make_async_agent(
+            fake_response("end_turn", text_block("too late")), delay=1.0
+        )
+        
+        response = asyncio.run(agent.arun("What's 1 plus 1?", timeout=0.01))
+        
+        assert "took too long" in response
+    
+    def test_cancelled_turn_leaves_memory_untouched(self):
+        agent = make_async_agent(
+            fake_response(
+                "tool_use", tool_use_block("t1", "add_numbers", {"a": 1, "b": 1})
+            ),
+            fake_response("end_turn", text_block("2")),
+            delay=0.05,
+        )
+        
+        async def cancel_mid_turn():
+            task = asyncio.create_task(agent.arun("What's 1 plus 1?"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+            return False
+        
+        assert asyncio.run(cancel_mid_turn()) is True
+        assert agent.memory.get_last_result() is None
+        assert agent.get_conversation_history() == []
+        assert agent.stats.turns == 1
+        assert agent.last_turn_stats.error is True
+    
+    def test_stream_turn_timeout(self):
+        agent = AsyncCalculatorAgent()
+        agent.use_fast_path = False
+        agent.client = FakeAsyncAnthropic(latency=1.0)
+        
+        async def stream():
+            return [chunk async for chunk in agent.arun_stream("2 times 8", timeout=0.01)]
+        
+        chunks = asyncio.run(stream())
+        
+        assert len(chunks) == 1 and "took too long" in chunks[0]
+        assert agent.stats.turns == 1
+        assert agent.last_turn_stats.error is True
+        assert agent.memory.get_last_result() is None
@@ -0,0 +1,224 @@
+"""Pytest tests for recording and replaying Messages API exchanges"""
+import asyncio
+import inspect
+import os
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.agents.async_calculator_agent import AsyncCalculatorAgent
+from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+from src.calculator_agent.client import factory
+from src.calculator_agent.client.cassette import (
+    AsyncRecordingMessages,
+    Cassette,
+    CassetteMiss,
+    RecordingClient,
+    RecordingMessages,
+    cassette_client,
+    replay_client,
+    request_key,
+    reset_cassettes
+)
+from src.calculator_agent.client.fake import FakeAnthropic, FakeAsyncAnthropic
+from src.calculator_agent.config.settings import Settings
+from tests.test_agent import tool_use_block
+from tests.test_retry import api_message, api_server  # noqa: F401 (fixture)
+
+CONVERSATION = [
+    "Combine 15 and 27", "Multiply that by 3", "Save that as total", "What was total?"
+]
+
+
+def agent_with(client, session_id=None):
+    agent = CalculatorAgent(session_id=session_id)
+    agent.use_fast_path = False
+    agent.client = client
+    return agent
+
+
+def recording_agent(cassette, session_id=None, latency=0.0):
+    """An agent whose fake "real" client is recorded into cassette"""
+    inner = FakeAnthropic(latency=latency)
+    messages = RecordingMessages(inner.messages, cassette, session_id)
+    return agent_with(RecordingClient(inner, messages), session_id)
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    yield tmp_path / "exchanges.jsonl.gz"
+    reset_cassettes()
+
+
+class TestRequestKey:
+    """Tests for request normalization"""
+
+    def test_ignores_cache_control_tool_ids_and_timestamps(self):
+        recorded = {
+            "model": "claude",
+            "system": [
+                {"type": "text", "text": "Be nice", "cache_control": {"type": "ephemeral"}}
+            ],
+            "messages": [
+                {"role": "user", "content": "What was total?"},
+                {"role": "assistant", "content": [
+                    tool_use_block("toolu_01XyZ", "recall_result", {"name": "total"})
+                ]},
+                {"role": "user", "content": [{
+                    "type": "tool_result",
+                    "tool_use_id": "toolu_01XyZ",
+                    "content": "'total' = 126.0 (saved at 2026-10-17T07:01:39.829299)",
+                }]},
+            ],
+        }
+        replayed = {
+            "model": "claude",
+            "system": [{"type": "text", "text": "Be nice"}],
+            "messages": [
+                {"role": "user", "content": "What was total?"},
+                {"role": "assistant", "content": [{
+                    "type": "tool_use", "id": "toolu_3", "name": "recall_result",
+                    "input": {"name": "total"},
+                }]},
+                {"role": "user", "content": [{
+                    "type": "tool_result",
+                    "tool_use_id": "toolu_3",
+                    "content": "'total' = 126.0 (saved at 2026-10-18T09:00:00.000001)",
+                }]},
+            ],
+            "stream": True,
+        }
+
+        assert request_key(recorded) == request_key(replayed)
+
+    def test_content_changes_the_key(self):
+        first = {"model": "claude", "messages": [{"role": "user", "content": "2 + 2"}]}
+        second = {"model": "claude", "messages": [{"role": "user", "content": "2 + 3"}]}
+
+        assert request_key(first) != request_key(second)
+
+
+class TestCassette:
+    """Tests for recording and replaying whole conversations"""
+
+    def test_record_then_replay_offline(self, cassette_path):
+        recorder = recording_agent(Cassette(cassette_path), session_id="alice")
+        recorded = [recorder.run(message) for message in CONVERSATION]
+        recorder.client.messages.cassette.close()
+
+        cassette = Cassette(cassette_path)
+        client = replay_client(cassette, latency_scale=0)
+        replayer = agent_with(client)
+        replayed = [replayer.run(message) for message in CONVERSATION]
+
+        assert len(cassette) == 8
+        assert client.messages.calls == 8
+        assert replayed[:3] == recorded[:3]
+        assert "126" in replayed[3]  # Recall reports a new save time
+        assert cassette.sessions() == {"alice": CONVERSATION}
+
+    def test_streaming_is_recorded(self, cassette_path):
+        cassette = Cassette(cassette_path)
+        recorded = "".join(recording_agent(cassette).run_stream("5 times 6"))
+
+        replayed = "".join(agent_with(replay_client(cassette, 0)).run_stream("5 times 6"))
+
+        assert replayed == recorded
+        assert len(cassette) == 2
+
+    def test_async_record_and_replay(self, cassette_path):
+        cassette = Cassette(cassette_path)
+
+        async def run(client):
+            agent = AsyncCalculatorAgent()
+            agent.use_fast_path = False
+            agent.client = client
+            answer = await agent.arun("Subtract 4 from 10")
+            streamed = [chunk async for chunk in agent.arun_stream("2 times 8")]
+            return answer, "".join(streamed)
+
+        inner = FakeAsyncAnthropic()
+        recorded = asyncio.run(
+            run(RecordingClient(inner, AsyncRecordingMessages(inner.messages, cassette)))
+        )
+        replayed = asyncio.run(run(replay_client(cassette, 0, asynchronous=True)))
+
+        assert replayed == recorded
+        assert len(cassette) == 4
+
+    def test_replay_latency_is_scaled(self, cassette_path):
+        cassette = Cassette(cassette_path)
+        recording_agent(cassette, latency=0.02).run("Combine 1 and 2")
+
+        agent = agent_with(replay_client(cassette, latency_scale=2))
+        agent.run("Combine 1 and 2")
+
+        assert agent.last_turn_stats.api_time >= 0.08
+
+    def test_repeated_requests_cycle(self, cassette_path):
+        cassette = Cassette(cassette_path)
+        recording_agent(cassette).run("Combine 1 and 2")
+
+        # Many users replaying one capture all get the recorded answers
+        answers = {
+            agent_with(replay_client(cassette, 0)).run("Combine 1 and 2") for _ in range(3)
+        }
+
+        assert len(answers) == 1
+
+    def test_unrecorded_request_misses(self, cassette_path):
+        cassette = Cassette(cassette_path)
+
+        with pytest.raises(CassetteMiss):
+            cassette.play({"model": "claude", "messages": [{"role": "user", "content": "?"}]})
+
+    def test_records_sdk_responses(self, cassette_path, api_server):
+        server = api_server(
+            (200, {}, {
+                **api_message(""),
+                "content": [{
+                    "type": "tool_use", "id": "toolu_01AbC", "name": "add_numbers",
+                    "input": {"a": 2, "b": 3},
+                }],
+                "stop_reason": "tool_use",
+            }),
+            (200, {}, api_message("2 + 3 = 5")),
+        )
+        sdk = factory.create_client(Settings(anthropic_api_key="test-key"))
+        accepted = inspect.signature(sdk.messages.create).parameters
+
+        def create(**params):
+            return sdk.messages.create(
+                **{name: value for name, value in params.items() if name in accepted}
+            )
+
+        cassette = Cassette(cassette_path)
+        messages = RecordingMessages(SimpleNamespace(create=create), cassette)
+        recorded = agent_with(RecordingClient(sdk, messages)).run("Combine 2 and 3")
+
+        replayer = agent_with(replay_client(Cassette(cassette_path), 0))
+        replayed = replayer.run("Combine 2 and 3")
+
+        assert len(server.requests) == 2
+        assert replayed == recorded == "2 + 3 = 5"
+
+
+class TestCassetteSettings:
+    """Tests for CASSETTE_MODE"""
+
+    def test_replay_mode_needs_no_network(self, cassette_path):
+        recording_agent(Cassette(cassette_path)).run("Combine 1 and 2")
+        settings = Settings(cassette_mode="replay", cassette_path=str(cassette_path))
+
+        client = cassette_client(settings)
+
+        assert isinstance(client, FakeAnthropic)
+        assert "3" in agent_with(client).run("Combine 1 and 2")
+
+    def test_unknown_mode(self, cassette_path):
+        settings = Settings(cassette_mode="rewind", cassette_path=str(cassette_path))
+
+        with pytest.raises(ValueError, match="cassette mode"):
+            cassette_client(settings)
@@ -0,0 +1,91 @@
+"""Pytest tests for the shared Anthropic client factory"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.calculator_agent.client import factory
+from src.calculator_agent.config.settings import Settings
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    factory.reset_clients()
+    yield
+    factory.reset_clients()
+
+
+def make_settings(**kwargs):
+    return Settings(anthropic_api_key="test-key", **kwargs)
+
+
+class TestClientFactory:
+    """Tests for client sharing and HTTP options"""
+
+    def test_client_is_shared_by_the_process(self):
+        settings = make_settings()
+
+        assert factory.get_client(settings) is factory.get_client(settings)
+
+    def test_agents_share_the_client(self):
+        from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+
+        assert CalculatorAgent().client is CalculatorAgent().client
+
+    def test_async_client_is_shared_within_a_loop(self):
+        settings = make_settings()
+
+        async def two_clients():
+            return factory.get_async_client(settings), factory.get_async_client(settings)
+
+        first, second = asyncio.run(two_clients())
+        third, _ = asyncio.run(two_clients())
+
+        assert first is second
+        assert third is not first
+
+    def test_options_come_from_settings(self):
+        options = factory.http_options(make_settings(
+            http_max_connections=7,
+            http_max_keepalive_connections=3,
+            http_keepalive_expiry=12.0,
+            http_timeout=30.0,
+            http_connect_timeout=2.0,
+        ))
+
+        assert options["limits"].max_connections == 7
+        assert options["limits"].max_keepalive_connections == 3
+        assert options["limits"].keepalive_expiry == 12.0
+        assert options["timeout"].read == 30.0
+        assert options["timeout"].connect == 2.0
+
+    def test_http2_falls_back_without_h2(self, monkeypatch):
+        monkeypatch.setattr(factory.importlib.util, "find_spec", lambda name: None)
+
+        assert factory.http_options(make_settings(http2=True))["http2"] is False
+
+    def test_warm_up_opens_connections(self, monkeypatch):
+        requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                requests.append(self.path)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+        try:
+            factory.warm_up(make_settings(), connections=2).join(timeout=10)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert len(requests) == 2
+        assert factory._client is not None
@@ -0,0 +1,68 @@
+"""Pytest tests for the offline fake Anthropic client"""
+import asyncio
+import os
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.agents.async_calculator_agent import AsyncCalculatorAgent
+from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+from src.calculator_agent.client.fake import (
+    FakeAnthropic,
+    FakeAsyncAnthropic,
+    Message,
+    TextBlock,
+    Usage,
+    scripted
+)
+
+
+def fake_agent(client):
+    agent = CalculatorAgent()
+    agent.use_fast_path = False
+    agent.client = client
+    return agent
+
+
+class TestFakeClient:
+    """Tests for FakeAnthropic and calculator_responder"""
+
+    def test_conversation_uses_the_right_tools(self):
+        client = FakeAnthropic()
+        agent = fake_agent(client)
+
+        assert "42" in agent.run("Combine 15 and 27")
+        assert "126" in agent.run("Multiply that by 3")
+        assert "Saved 126" in agent.run("Save that as total")
+        assert "126" in agent.run("What was total?")
+        assert client.messages.calls == 8
+        assert agent.memory.get_saved_value("total") == 126
+
+    def test_streaming(self):
+        agent = fake_agent(FakeAnthropic())
+
+        chunks = list(agent.run_stream("5 times 6"))
+
+        assert len(chunks) > 1
+        assert "30" in "".join(chunks)
+
+    def test_async_with_latency(self):
+        agent = AsyncCalculatorAgent()
+        agent.use_fast_path = False
+        agent.client = FakeAsyncAnthropic(latency=0.01, jitter=0.01)
+
+        async def turn():
+            answer = await agent.arun("Subtract 4 from 10")
+            streamed = [chunk async for chunk in agent.arun_stream("2 times 8")]
+            return answer, "".join(streamed)
+
+        answer, streamed = asyncio.run(turn())
+
+        assert "6" in answer
+        assert "16" in streamed
+        assert agent.last_turn_stats.api_time >= 0.02
+
+    def test_scripted_responses(self):
+        reply = Message([TextBlock("Hello!")], "end_turn", Usage(10, 2))
+        agent = fake_agent(FakeAnthropic(scripted([reply])))
+
+        assert agent.run("Hi") == "Hello!"
@@ -0,0 +1,151 @@
+"""Pytest tests for the queued, structured agent logger"""
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.utils.logger import AgentLogger, ColoredFormatter
+from tests.test_agent import fake_response, make_agent, text_block, tool_use_block
+
+
+@pytest.fixture
+def json_log():
+    """A JSON logger writing to a buffer; call it to get the parsed lines"""
+    from src.calculator_agent.utils.logger import agent_logger
+
+    stream = io.StringIO()
+    agent_logger.configure("DEBUG", json_format=True, stream=stream)
+
+    def lines():
+        agent_logger.flush()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield lines
+    agent_logger.configure()
+
+
+class CountingStr:
+    """Counts how often it is formatted"""
+
+    formatted = 0
+
+    def __str__(self):
+        CountingStr.formatted += 1
+        return "value"
+
+
+class TestAgentLogger:
+    """Tests for AgentLogger"""
+
+    def test_colored_formatter_leaves_the_record_alone(self):
+        record = logging.makeLogRecord({"levelname": "INFO", "msg": "hello"})
+
+        colored = ColoredFormatter("%(levelname)s %(message)s").format(record)
+
+        assert "\033[32m" in colored
+        assert record.levelname == "INFO"
+        assert logging.Formatter("%(levelname)s").format(record) == "INFO"
+
+    def test_importing_the_agent_installs_no_handlers(self):
+        code = (
+            "import src.calculator_agent.agents.calculator_agent\n"
+            "from src.calculator_agent.utils.logger import agent_logger\n"
+            "print(len(agent_logger.logger.handlers))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "0"
+
+    def test_constructing_an_agent_starts_no_writer_thread(self):
+        code = (
+            "import threading\n"
+            "from tests.test_agent import make_agent\n"
+            "before = threading.active_count()\n"
+            "make_agent()\n"
+            "print(threading.active_count() - before)"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "0"
+
+    def test_handlers_are_installed_on_first_record(self):
+        stream = io.StringIO()
+        logger = AgentLogger("test_lazy", stream=stream)
+        assert logger.logger.handlers == []
+
+        logger.error("boom after %d tries", 3, exception=ValueError("bad"))
+        logger.flush()
+
+        assert "ERROR: boom after 3 tries" in stream.getvalue()
+        logger.stop()
+
+    def test_disabled_levels_are_not_formatted(self):
+        logger = AgentLogger("test_disabled", level=logging.WARNING, stream=io.StringIO())
+        CountingStr.formatted = 0
+
+        logger.debug("value %s", CountingStr())
+        logger.tool_call("add_numbers", CountingStr())
+        logger.flush()
+
+        assert CountingStr.formatted == 0
+        logger.stop()
+
+    def test_writes_happen_on_the_listener_thread(self):
+        stream = io.StringIO()
+        logger = AgentLogger("test_queue", stream=stream)
+
+        logger.agent_response("done")
+        logger.flush()
+
+        assert "RESPONSE: done" in stream.getvalue()
+        assert [type(h).__name__ for h in logger.logger.handlers] == ["QueueHandler"]
+        logger.stop()
+
+    def test_json_lines_carry_the_turn_correlation_id(self, json_log):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 2, "b": 3}),
+                tool_use_block("t2", "multiply_numbers", {"a": 2, "b": 3}),
+            ),
+            fake_response("end_turn", text_block("Done.")),
+            fake_response("end_turn", text_block("Again.")),
+        )
+        agent.enable_logging = True
+
+        agent.run("Combine 2 and 3")
+        first_id = agent.last_turn_stats.correlation_id
+        agent.run("And again")
+
+        lines = json_log()
+        first = [line for line in lines if line["correlation_id"] == first_id]
+        assert {line["event"] for line in first} >= {"thinking", "tool_call", "response"}
+        # Tool calls ran on the tool pool and still carry the turn's id
+        assert sorted(line["tool"] for line in first if line["event"] == "tool_call") == [
+            "add_numbers", "multiply_numbers"
+        ]
+        second_id = agent.last_turn_stats.correlation_id
+        assert second_id != first_id
+        assert any(line["correlation_id"] == second_id for line in lines)
+
+    def test_extra_fields_become_json_keys(self, json_log):
+        from src.calculator_agent.utils.logger import agent_logger
+
+        agent_logger.tool_result("divide_numbers", False, "Cannot divide by zero")
+        agent_logger.error("boom", exception=ValueError("bad"))
+
+        result, error = json_log()
+        assert result["tool"] == "divide_numbers"
+        assert result["success"] is False
+        assert error["level"] == "ERROR"
+        assert error["exception"] == "bad"
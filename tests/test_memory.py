@@ -0,0 +1,342 @@
+"""Pytest unit tests for agent memory"""
+import gc
+import time
+from datetime import datetime
+
+import pytest
+from src.calculator_agent.agents.fast_path import parse_intent
+from src.calculator_agent.state.db_storage import SQLiteMemory
+from src.calculator_agent.state.history import History, HistoryRecord
+from src.calculator_agent.state import redis_storage
+from src.calculator_agent.state.memory import DeferredMemory, Memory
+from src.calculator_agent.tools.calculator import AddNumbersTool, DivideNumbersTool
+from src.calculator_agent.tools.memory_tools import SaveResultTool, RecallResultTool
+from src.calculator_agent.models.schemas import (
+    MathOperationInput,
+    SavedResult,
+    SaveResultInput,
+    RecallResultInput
+)
+
+
+class TestHistory:
+    """Tests for the bounded conversation history"""
+
+    def test_entries_match_previous_format(self):
+        memory = Memory()
+        AddNumbersTool(memory).execute(MathOperationInput(a=15, b=27))
+        DivideNumbersTool(memory).execute(MathOperationInput(a=42, b=2))
+        SaveResultTool(memory).execute(SaveResultInput(name="total", value=21))
+        RecallResultTool(memory).execute(RecallResultInput(name="total"))
+        memory.add_to_history("Free-text note")
+
+        assert memory.get_history() == [
+            "Added 15.0 + 27.0 = 42.0",
+            "Divided 42.0 by 2.0 = 21.0",
+            "Saved 21.0 as 'total'",
+            "Recalled 'total' = 21.0",
+            "Free-text note",
+        ]
+
+    def test_records_are_structured(self):
+        memory = Memory()
+        AddNumbersTool(memory).execute(MathOperationInput(a=15, b=27))
+
+        (record,) = memory.iter_history_records()
+        assert (record.op, record.a, record.b, record.result) == ("add", 15.0, 27.0, 42.0)
+        assert record.timestamp > 0
+
+    def test_failed_calculation_is_not_recorded(self):
+        memory = Memory()
+        DivideNumbersTool(memory).execute(MathOperationInput(a=1, b=0))
+
+        assert memory.get_history() == []
+
+    def test_history_is_capped(self):
+        memory = Memory(history_size=3)
+        for i in range(10):
+            memory.record_operation("add", i, 1, i + 1)
+
+        assert memory.get_history() == [
+            "Added 7 + 1 = 8",
+            "Added 8 + 1 = 9",
+            "Added 9 + 1 = 10",
+        ]
+
+    def test_iter_history_does_not_copy(self):
+        memory = Memory()
+        memory.record_operation("add", 1, 1, 2)
+
+        entries = memory.iter_history()
+
+        assert not isinstance(entries, list)
+        assert list(entries) == ["Added 1 + 1 = 2"]
+
+    def test_evicted_records_spill_to_disk(self, tmp_path):
+        spill_path = str(tmp_path / "history.jsonl")
+        history = History(maxlen=2, spill_path=spill_path)
+        for i in range(5):
+            history.append(HistoryRecord("note", name=f"entry {i}"))
+        history.close()
+
+        assert [r.format() for r in history.iter_spilled()] == [
+            "entry 0", "entry 1", "entry 2"
+        ]
+        assert list(history.entries()) == ["entry 3", "entry 4"]
+
+    def test_clear_removes_spilled_records(self, tmp_path):
+        spill_path = str(tmp_path / "history.jsonl")
+        memory = Memory(history_size=1, history_spill_path=spill_path)
+        memory.add_to_history("first")
+        memory.add_to_history("second")
+
+        memory.clear()
+
+        assert memory.get_history() == []
+        assert list(memory._conversation_history.iter_spilled()) == []
+
+    def test_deferred_records_are_committed_in_order(self):
+        memory = Memory()
+        staged = DeferredMemory(memory)
+        AddNumbersTool(staged).execute(MathOperationInput(a=1, b=2))
+
+        assert memory.get_history() == []
+        staged.commit()
+        assert memory.get_history() == ["Added 1.0 + 2.0 = 3.0"]
+
+    def test_journal_replays_structured_records(self):
+        memory = Memory()
+        memory.start_journal()
+        memory.record_operation("power", 2.0, 10.0, 1024.0)
+        operations = memory.stop_journal()
+
+        replayed = Memory()
+        replayed.apply(operations)
+
+        assert replayed.get_history() == ["Calculated 2.0 ^ 10.0 = 1024.0"]
+
+
+class TestSavedResults:
+    """Tests for the compact saved-result store"""
+
+    def test_recall_builds_saved_result(self):
+        memory = Memory()
+        memory.save_result("total", 42)
+
+        saved = memory.recall_result("total")
+
+        assert isinstance(saved, SavedResult)
+        assert (saved.name, saved.value) == ("total", 42.0)
+        assert datetime.fromisoformat(saved.timestamp)
+
+    def test_overwrite_keeps_save_order(self):
+        memory = Memory()
+        memory.save_result("a", 1)
+        memory.save_result("b", 2)
+        memory.save_result("a", 3)
+
+        assert list(memory.saved_values().items()) == [("a", 3.0), ("b", 2.0)]
+        assert memory.get_saved_value("a") == 3.0
+        assert memory.get_saved_value("missing") is None
+
+    def test_saved_values_is_a_live_read_only_view(self):
+        memory = Memory()
+        view = memory.saved_values()
+        memory.save_result("x", 2)
+
+        assert view == {"x": 2.0}
+        assert "x" in view
+        with pytest.raises(TypeError):
+            view["y"] = 1
+
+    def test_list_saved_results_returns_models(self):
+        memory = Memory()
+        memory.save_result("x", 2)
+
+        results = memory.list_saved_results()
+
+        assert list(results) == ["x"]
+        assert results["x"].value == 2.0
+
+    def test_clear_removes_saved_results(self):
+        memory = Memory()
+        memory.save_result("x", 2)
+
+        memory.clear()
+
+        assert memory.saved_values() == {}
+        assert memory.recall_result("x") is None
+
+    def test_recency_and_usage_ranking(self):
+        memory = Memory()
+        for i, name in enumerate(["a", "b", "c"]):
+            memory.saved_results.save(name, i, timestamp=100.0 + i)
+        memory.get_saved_value("a")
+        memory.get_saved_value("a")
+        memory.recall_result("b")
+
+        assert memory.saved_results.most_recent(2) == ["c", "b"]
+        assert memory.saved_results.most_used(3) == ["a", "b"]
+        # Reading through the view does not count as a use
+        assert memory.saved_values()["c"] == 2.0
+        assert memory.saved_results.most_used(3) == ["a", "b"]
+
+    def test_bookkeeping_reads_do_not_count_as_uses(self):
+        memory = Memory()
+        memory.save_result("a", 1)
+        memory.save_result("b", 2)
+
+        memory.list_saved_results()
+        assert memory.peek_saved_value("a") == 1.0
+        assert parse_intent("a plus 1", memory) is not None
+        assert parse_intent("b", memory) is not None
+        assert memory.saved_results.most_used(2) == []
+
+        memory.recall_result("b")
+        assert memory.saved_results.most_used(2) == ["b"]
+
+    def test_context_length_tracks_overwrites(self):
+        memory = Memory()
+        memory.save_result("a", 1)
+        memory.save_result("bb", 22)
+        memory.save_result("a", 333)
+
+        listing = ", ".join(f"{n}={v}" for n, v in memory.saved_values().items())
+        assert memory.saved_results.context_length() == len(listing)
+
+
+class TestSQLiteMemory:
+    """Tests for the SQLite memory backend"""
+
+    def test_state_survives_reopening(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        memory = SQLiteMemory(path, session_id="alice")
+        AddNumbersTool(memory).execute(MathOperationInput(a=15, b=27))
+        SaveResultTool(memory).execute(SaveResultInput(name="total", value=42))
+        memory.close()
+
+        reopened = SQLiteMemory(path, session_id="alice")
+
+        assert reopened.get_last_result() == 42.0
+        assert reopened.get_saved_value("total") == 42.0
+        assert reopened.get_history() == [
+            "Added 15.0 + 27.0 = 42.0",
+            "Saved 42.0 as 'total'",
+        ]
+        reopened.close()
+
+    def test_sessions_are_isolated(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        alice = SQLiteMemory(path, session_id="alice")
+        bob = SQLiteMemory(path, session_id="bob")
+        alice.save_result("x", 1)
+        bob.save_result("x", 2)
+        alice.close()
+        bob.close()
+
+        assert SQLiteMemory(path, session_id="alice").get_saved_value("x") == 1.0
+        assert SQLiteMemory(path, session_id="bob").get_saved_value("x") == 2.0
+
+    def test_history_is_written_in_batches(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        memory = SQLiteMemory(path, batch_size=3, flush_interval=0)
+        memory.add_to_history("one")
+        memory.add_to_history("two")
+
+        assert SQLiteMemory(path).get_history() == []
+        memory.add_to_history("three")
+        assert SQLiteMemory(path).get_history() == ["one", "two", "three"]
+
+    def test_end_turn_flushes_pending_writes(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        memory = SQLiteMemory(path, flush_interval=0)
+        memory.set_last_result(7)
+
+        memory.end_turn()
+
+        assert SQLiteMemory(path).get_last_result() == 7.0
+
+    def test_timer_flushes_pending_writes(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        memory = SQLiteMemory(path, flush_interval=0.01)
+        memory.save_result("x", 3)
+
+        time.sleep(0.2)
+
+        assert SQLiteMemory(path).get_saved_value("x") == 3.0
+
+    def test_clear_only_removes_own_session(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        alice = SQLiteMemory(path, session_id="alice")
+        bob = SQLiteMemory(path, session_id="bob")
+        alice.save_result("x", 1)
+        bob.save_result("x", 2)
+        alice.flush()
+        bob.flush()
+
+        alice.clear()
+
+        assert SQLiteMemory(path, session_id="alice").saved_values() == {}
+        assert SQLiteMemory(path, session_id="bob").get_saved_value("x") == 2.0
+
+    def test_sessions_on_a_path_share_one_connection(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        alice = SQLiteMemory(path, session_id="alice", flush_interval=0)
+        bob = SQLiteMemory(path, session_id="bob", flush_interval=0)
+        alice.save_result("x", 1)
+        bob.save_result("x", 2)
+
+        alice.flush()  # Commits bob's queued write in the same transaction
+
+        assert alice._conn is bob._conn
+        assert SQLiteMemory(path, session_id="bob").get_saved_value("x") == 2.0
+        alice.close()
+        bob.close()
+
+    def test_writes_of_a_freed_session_are_still_flushed(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        memory = SQLiteMemory(path, session_id="alice", flush_interval=0.01)
+        memory.save_result("x", 3)
+
+        del memory
+        gc.collect()
+        time.sleep(0.2)
+
+        assert SQLiteMemory(path, session_id="alice").get_saved_value("x") == 3.0
+
+    def test_next_flush_writes_a_freed_session(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        alice = SQLiteMemory(path, session_id="alice", flush_interval=0)
+        bob = SQLiteMemory(path, session_id="bob", flush_interval=0)
+        alice.set_last_result(7)
+
+        del alice
+        gc.collect()
+        bob.set_last_result(8)
+        bob.flush()
+
+        assert SQLiteMemory(path, session_id="alice").get_last_result() == 7.0
+        bob.close()
+
+    def test_history_rows_are_pruned_on_flush(self, tmp_path):
+        path = str(tmp_path / "memory.sqlite3")
+        memory = SQLiteMemory(path, history_size=3, flush_interval=0)
+        for i in range(5):
+            memory.add_to_history(f"entry {i}")
+        memory.flush()
+
+        rows = memory._conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+        assert rows == 3
+        assert SQLiteMemory(path).get_history() == ["entry 2", "entry 3", "entry 4"]
+        memory.close()
+
+
+class TestRedisMemoryDependency:
+    """The Redis backend without its optional dependency installed"""
+
+    def test_missing_redis_package_raises_import_error(self, monkeypatch):
+        monkeypatch.setattr(redis_storage, "redis", None)
+
+        with pytest.raises(ImportError, match="pip install redis"):
+            redis_storage.RedisMemory("redis://localhost:6379/0")
@@ -0,0 +1,149 @@
+"""Pytest tests for the metrics layer and its exporters"""
+import os
+
+import pytest
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.models.schemas import MathOperationInput
+from src.calculator_agent.state.memory import Memory
+from src.calculator_agent.tools.calculator import AddNumbersTool, DivideNumbersTool
+from src.calculator_agent.utils.metrics import (
+    AgentMetrics,
+    Histogram,
+    MetricsSink,
+    NullSink,
+    SnapshotSink,
+    metrics
+)
+from tests.test_agent import (
+    fake_response,
+    fake_usage,
+    make_agent,
+    text_block,
+    tool_use_block
+)
+
+
+@pytest.fixture
+def sink():
+    sink = metrics.enable()
+    sink.reset()
+    yield sink
+    metrics.disable()
+
+
+class TestSnapshotSink:
+    """Tests for in-process collection and the Prometheus exporter"""
+
+    def test_counters_and_histograms(self):
+        sink = SnapshotSink()
+        sink.inc("calculator_turns_total", 1, (("path", "model"),))
+        sink.inc("calculator_turns_total", 2, (("path", "model"),))
+        sink.observe("calculator_tool_duration_seconds", 0.002, (("tool", "add"),))
+
+        snapshot = sink.snapshot()
+
+        assert snapshot["calculator_turns_total"]["path=model"] == 3
+        tool = snapshot["calculator_tool_duration_seconds"]["tool=add"]
+        assert tool["count"] == 1
+        assert tool["sum"] == 0.002
+
+    def test_histogram_quantiles(self):
+        histogram = Histogram((1.0, 2.0, 3.0))
+        for value in [0.5] * 50 + [1.5] * 45 + [2.5] * 5:
+            histogram.observe(value)
+
+        assert histogram.quantile(0.5) == pytest.approx(1.0)
+        assert 1.0 < histogram.quantile(0.95) <= 2.0
+        assert 2.0 < histogram.quantile(0.99) <= 3.0
+
+    def test_prometheus_text(self):
+        sink = SnapshotSink()
+        sink.inc("calculator_turns_total", 1, (("path", "fast_path"),))
+        sink.observe("calculator_turn_iterations", 2)
+
+        text = sink.to_prometheus()
+
+        assert "# TYPE calculator_turns_total counter" in text
+        assert 'calculator_turns_total{path="fast_path"} 1' in text
+        assert "# TYPE calculator_turn_iterations histogram" in text
+        assert 'calculator_turn_iterations_bucket{le="1"} 0' in text
+        assert 'calculator_turn_iterations_bucket{le="2"} 1' in text
+        assert 'calculator_turn_iterations_bucket{le="+Inf"} 1' in text
+        assert "calculator_turn_iterations_count 1" in text
+
+    def test_label_values_are_escaped(self):
+        sink = SnapshotSink()
+        sink.inc("custom_total", 1, (("name", 'a"b'),))
+
+        assert 'custom_total{name="a\\"b"} 1' in sink.to_prometheus()
+
+    def test_custom_sinks_must_implement_every_method(self):
+        class CounterOnlySink(MetricsSink):
+            def inc(self, name, value=1.0, labels=()):
+                pass
+
+        with pytest.raises(TypeError):
+            CounterOnlySink()
+
+
+class TestAgentMetrics:
+    """Tests for what the agent and tools record"""
+
+    def test_off_by_default(self):
+        assert not AgentMetrics().enabled
+        assert isinstance(AgentMetrics().sink, NullSink)
+
+    def test_tool_latency_by_tool(self, sink):
+        memory = Memory()
+        AddNumbersTool(memory).run(MathOperationInput(a=1, b=2))
+        DivideNumbersTool(memory).run(MathOperationInput(a=1, b=0))
+
+        snapshot = sink.snapshot()
+
+        calls = snapshot["calculator_tool_calls_total"]
+        assert calls["status=success,tool=add_numbers"] == 1
+        assert calls["status=error,tool=divide_numbers"] == 1
+        assert snapshot["calculator_tool_duration_seconds"]["tool=add_numbers"]["count"] == 1
+
+    def test_model_turn(self, sink):
+        agent = make_agent(
+            fake_response(
+                "tool_use",
+                tool_use_block("t1", "add_numbers", {"a": 2, "b": 3}),
+                usage=fake_usage(100, 20, cache_read=400),
+            ),
+            fake_response("end_turn", text_block("5"), usage=fake_usage(120, 5)),
+        )
+
+        agent.run("Combine 2 and 3")
+
+        snapshot = sink.snapshot()
+        assert snapshot["calculator_turns_total"]["path=model"] == 1
+        assert snapshot["calculator_api_calls_total"][""] == 2
+        assert snapshot["calculator_input_tokens_total"][""] == 220
+        assert snapshot["calculator_output_tokens_total"][""] == 25
+        assert snapshot["calculator_cache_read_input_tokens_total"][""] == 400
+        assert snapshot["calculator_turn_iterations"][""]["sum"] == 2
+        assert snapshot["calculator_api_request_duration_seconds"][""]["count"] == 2
+        assert snapshot["calculator_tool_calls_total"]["status=success,tool=add_numbers"] == 1
+        assert agent.last_turn_stats.api_time > 0
+
+    def test_local_turn(self, sink):
+        agent = make_agent(fast_path=True)
+
+        agent.run("15 + 27")
+
+        snapshot = sink.snapshot()
+        assert snapshot["calculator_turns_total"]["path=fast_path"] == 1
+        assert "calculator_api_calls_total" not in snapshot
+
+    def test_nothing_recorded_when_off(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(metrics, "record_turn", lambda *args: calls.append(args))
+        monkeypatch.setattr(metrics, "record_tool", lambda *args: calls.append(args))
+
+        make_agent(fast_path=True).run("15 + 27")
+
+        assert calls == []
@@ -0,0 +1,111 @@
+"""Pytest tests for per-turn profiling"""
+import cProfile
+import os
+import pstats
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+from src.calculator_agent.client.fake import FakeAnthropic
+from src.calculator_agent.utils.profiler import TurnProfiler, split_call_graph
+
+
+def profiled_agent(directory, latency=0.0):
+    agent = CalculatorAgent(profile=True)
+    agent.profiler = TurnProfiler(directory, top=5)
+    agent.use_fast_path = False
+    agent.client = FakeAnthropic(latency=latency)
+    return agent
+
+
+def busy(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def outer():
+    return busy(20_000) + inner()
+
+
+def inner():
+    return busy(10_000)
+
+
+class TestTurnProfiler:
+    """Tests for TurnProfiler and the agent's profile option"""
+
+    def test_off_by_default(self):
+        assert CalculatorAgent().profiler is None
+
+    def test_writes_files_per_turn(self, tmp_path):
+        agent = profiled_agent(tmp_path)
+
+        agent.run("Combine 15 and 27")
+        "".join(agent.run_stream("Multiply that by 3"))
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "turn-0001.collapsed", "turn-0001.prof",
+            "turn-0002.collapsed", "turn-0002.prof",
+        ]
+        pstats.Stats(str(agent.profiler.last.profile_path))  # Loads
+        for line in agent.profiler.last.collapsed_path.read_text().splitlines():
+            stack, microseconds = line.rsplit(" ", 1)
+            assert stack and int(microseconds) > 0
+
+    def test_api_time_is_separate_from_hotspots(self, tmp_path):
+        agent = profiled_agent(tmp_path, latency=0.02)
+
+        agent.run("Combine 15 and 27")
+
+        profile = agent.profiler.last
+        assert profile.api_calls == 2
+        assert profile.api_time >= 0.04
+        assert profile.local_time < profile.api_time
+        assert profile.hotspots
+        assert not any(spot.name.startswith("client/") for spot in profile.hotspots)
+        assert not any("sleep" in spot.name for spot in profile.hotspots)
+        # The wait still shows up in the flamegraph, ending at the client
+        api_stacks = [
+            line for line in profile.collapsed_path.read_text().splitlines()
+            if ";client/" in line
+        ]
+        assert sum(int(line.rsplit(" ", 1)[1]) for line in api_stacks) >= 40_000
+        summary = profile.summary()
+        assert "API" in summary and "(2 calls)" in summary and "turn-0001.prof" in summary
+
+    def test_skips_turns_while_another_profiler_runs(self, tmp_path):
+        agent = profiled_agent(tmp_path)
+        other = cProfile.Profile()
+        other.enable()
+        try:
+            agent.run("Combine 1 and 2")
+        finally:
+            other.disable()
+
+        assert agent.profiler.last is None
+        assert agent.run("Combine 1 and 2")
+        assert agent.profiler.last is not None
+
+
+class TestCallGraph:
+    """Tests for rebuilding stacks from cProfile's call graph"""
+
+    def test_splits_shared_callee_by_caller(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        outer()
+        profile.disable()
+
+        graph = split_call_graph(pstats.Stats(profile))
+
+        stacks = {
+            tuple(frame.split("(")[-1].rstrip(")") for frame in stack.split(";")): seconds
+            for stack, seconds in graph.stacks.items()
+        }
+        # busy() appears under both callers, each with its own time: about 2:1
+        direct = stacks[("outer", "busy")]
+        nested = stacks[("outer", "inner", "busy")]
+        assert 1.2 < direct / nested < 3.5
+        assert graph.api_time == 0
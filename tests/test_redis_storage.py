@@ -0,0 +1,128 @@
+"""Pytest unit tests for the Redis memory backend, run against fakeredis"""
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.calculator_agent.state.redis_storage import RedisMemory
+from src.calculator_agent.tools.calculator import AddNumbersTool
+from src.calculator_agent.tools.memory_tools import SaveResultTool
+from src.calculator_agent.models.schemas import MathOperationInput, SaveResultInput
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """FakeRedis that counts round trips (single commands and pipelines)"""
+
+    round_trips = 0
+
+    def execute_command(self, *args, **kwargs):
+        CountingRedis.round_trips += 1
+        return super().execute_command(*args, **kwargs)
+
+    def pipeline(self, *args, **kwargs):
+        pipe = super().pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*a, **kw):
+            CountingRedis.round_trips += 1
+            return execute(*a, **kw)
+
+        pipe.execute = counted_execute
+        return pipe
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def make_memory(server, session_id="alice", **kwargs):
+    """Create a RedisMemory on a fake server, like a separate node would"""
+    return RedisMemory(
+        session_id=session_id, client=CountingRedis(server=server), **kwargs
+    )
+
+
+def server_list_length(memory):
+    """Length of the history list stored in Redis"""
+    return memory.client.llen(memory._history_key)
+
+
+class TestRedisMemory:
+    """Tests for RedisMemory"""
+
+    def test_state_is_shared_between_nodes(self, server):
+        first = make_memory(server)
+        AddNumbersTool(first).execute(MathOperationInput(a=15, b=27))
+        SaveResultTool(first).execute(SaveResultInput(name="total", value=42))
+
+        second = make_memory(server)
+
+        assert second.get_last_result() == 42.0
+        assert second.get_saved_value("total") == 42.0
+        assert second.get_history() == [
+            "Added 15.0 + 27.0 = 42.0",
+            "Saved 42.0 as 'total'",
+        ]
+
+    def test_sessions_are_isolated(self, server):
+        make_memory(server, "alice").save_result("x", 1)
+        make_memory(server, "bob").save_result("x", 2)
+
+        assert make_memory(server, "alice").get_saved_value("x") == 1.0
+        assert make_memory(server, "bob").get_saved_value("x") == 2.0
+
+    def test_turn_reads_once_and_writes_once(self, server):
+        make_memory(server).save_result("total", 10)
+        memory = make_memory(server)
+        CountingRedis.round_trips = 0
+
+        memory.begin_turn()
+        memory.get_last_result()
+        memory.saved_values()
+        memory.get_saved_value("total")
+        AddNumbersTool(memory).execute(MathOperationInput(a=10, b=5))
+        memory.save_result("sum", 15)
+        assert CountingRedis.round_trips == 1
+        memory.end_turn()
+
+        assert CountingRedis.round_trips == 2
+        assert make_memory(server).get_saved_value("sum") == 15.0
+
+    def test_new_turn_sees_writes_from_other_nodes(self, server):
+        memory = make_memory(server)
+        memory.begin_turn()
+        assert memory.get_saved_value("x") is None
+        memory.end_turn()
+
+        make_memory(server).save_result("x", 5)
+
+        memory.begin_turn()
+        assert memory.get_saved_value("x") == 5.0
+        memory.end_turn()
+
+    def test_history_is_capped(self, server):
+        memory = make_memory(server, history_size=2)
+        for i in range(5):
+            memory.add_to_history(f"entry {i}")
+
+        assert make_memory(server, history_size=2).get_history() == [
+            "entry 3", "entry 4"
+        ]
+        assert server_list_length(memory) == 2
+
+    def test_history_read_mid_turn_keeps_unsent_entries(self, server):
+        memory = make_memory(server)
+        memory.add_to_history("before")
+        memory.begin_turn()
+        memory.add_to_history("during")
+
+        assert memory.get_history() == ["before", "during"]
+
+    def test_clear_removes_session_keys(self, server):
+        memory = make_memory(server)
+        memory.save_result("x", 1)
+
+        memory.clear()
+
+        assert make_memory(server).saved_values() == {}
+        assert make_memory(server).get_last_result() is None
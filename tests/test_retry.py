@@ -0,0 +1,284 @@
+"""Pytest tests for retries, rate limiting and hedged requests"""
+import asyncio
+import inspect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.agents.calculator_agent import CalculatorAgent
+from src.calculator_agent.client import factory
+from src.calculator_agent.client.rate_limit import RateLimiter, TokenBucket
+from src.calculator_agent.client.retry import RetryPolicy, is_retryable, retry_after
+from src.calculator_agent.config.settings import Settings
+from tests.test_agent import fake_response, fake_usage, make_agent, text_block
+
+
+class StatusError(Exception):
+    """Looks like an anthropic.APIStatusError to the retry policy"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+def api_message(text, input_tokens=10, output_tokens=5):
+    """A Messages API response body"""
+    return {
+        "id": "msg_test",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-test",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+    }
+
+
+class FakeAPIServer:
+    """
+    Local HTTP server standing in for the Messages API
+
+    Replies are scripted as (status, headers, body) and served in order;
+    every request body is recorded.
+    """
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                fake.requests.append(json.loads(body))
+                status, headers, payload = fake.replies.pop(0)
+                content = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def api_server(monkeypatch):
+    servers = []
+
+    def start(*replies):
+        server = FakeAPIServer(*replies)
+        servers.append(server)
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def api_error(error_type):
+    """A Messages API error body"""
+    return {"type": "error", "error": {"type": error_type, "message": error_type}}
+
+
+def agent_for(**policy):
+    """An agent talking to the fake server through a real SDK client"""
+    client = factory.create_client(Settings(anthropic_api_key="test-key"))
+    # Only pass the params this SDK build accepts (some have no temperature)
+    accepted = inspect.signature(client.messages.create).parameters
+
+    def create(**params):
+        return client.messages.create(
+            **{name: value for name, value in params.items() if name in accepted}
+        )
+
+    agent = CalculatorAgent()
+    agent.use_fast_path = False
+    agent.client = SimpleNamespace(messages=SimpleNamespace(create=create))
+    agent.retry_policy = RetryPolicy(base_delay=0.01, **policy)
+    return agent
+
+
+class TestRetryPolicy:
+    """Tests for deciding whether and when to retry"""
+
+    def test_transient_errors_are_retryable(self):
+        assert is_retryable(StatusError(429))
+        assert is_retryable(StatusError(529))
+        assert is_retryable(StatusError(503))
+        assert is_retryable(ConnectionResetError())
+        assert not is_retryable(StatusError(400))
+        assert not is_retryable(ValueError("bug"))
+
+    def test_retry_after_headers(self):
+        assert retry_after(StatusError(429, {"retry-after": "3"})) == 3.0
+        assert retry_after(StatusError(429, {"retry-after-ms": "250"})) == 0.25
+        assert retry_after(StatusError(429)) is None
+
+    def test_backoff_honours_retry_after_up_to_the_cap(self):
+        policy = RetryPolicy(max_delay=5.0)
+
+        assert policy.backoff(0, StatusError(429, {"retry-after": "2"})) == 2.0
+        assert policy.backoff(0, StatusError(429, {"retry-after": "60"})) == 5.0
+
+    def test_backoff_is_jittered_and_grows(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=100.0)
+
+        delays = [policy.backoff(3, StatusError(503)) for _ in range(50)]
+
+        assert all(0 <= delay <= 8.0 for delay in delays)
+        assert len(set(delays)) > 1
+
+    def test_gives_up(self):
+        policy = RetryPolicy(max_retries=2)
+
+        assert policy.backoff(2, StatusError(429)) is None
+        assert policy.backoff(0, StatusError(401)) is None
+
+
+class TestRateLimiter:
+    """Tests for the token buckets"""
+
+    def test_bucket_allows_a_burst_then_spaces_requests(self):
+        bucket = TokenBucket(per_minute=60)  # One a second, burst of 60
+
+        assert all(bucket.reserve() == 0.0 for _ in range(60))
+        assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+        assert bucket.reserve() == pytest.approx(2.0, abs=0.01)
+
+    def test_settle_refunds_unused_tokens(self):
+        limiter = RateLimiter(tokens_per_minute=1000)
+
+        assert limiter.reserve(1000) == 0.0
+        assert limiter.reserve(100) > 0
+        limiter.settle(1100, 200)
+        assert limiter.reserve(800) == 0.0
+
+    def test_disabled_by_default(self):
+        limiter = RateLimiter()
+
+        assert not limiter.enabled
+        assert limiter.reserve(10**9) == 0.0
+
+    def test_agent_waits_for_the_shared_limiter(self):
+        agent = make_agent(fake_response("end_turn", text_block("Done.")))
+        agent.rate_limiter = RateLimiter(requests_per_minute=60)
+        agent.rate_limiter.requests._tokens = 0.95  # Next slot in 0.05s
+
+        agent.run("Say done")
+
+        assert agent.last_turn_stats.rate_limit_wait == pytest.approx(0.05, abs=0.01)
+
+
+class TestAgentRetries:
+    """Tests for retrying the agent loop's API calls"""
+
+    def test_429_is_retried_with_the_same_request(self, api_server):
+        server = api_server(
+            (429, {"retry-after": "0"}, api_error("rate_limit_error")),
+            (529, {"retry-after-ms": "10"}, api_error("overloaded_error")),
+            (200, {}, api_message("2 and 3 make 5.")),
+        )
+        agent = agent_for()
+
+        assert agent.run("Combine 2 and 3") == "2 and 3 make 5."
+        assert len(server.requests) == 3
+        assert server.requests[0] == server.requests[1] == server.requests[2]
+        assert agent.last_turn_stats.retries == 2
+        assert agent.last_turn_stats.api_calls == 3
+        assert not agent.last_turn_stats.error
+
+    def test_client_errors_are_not_retried(self, api_server):
+        server = api_server(
+            (400, {}, api_error("invalid_request_error")),
+        )
+        agent = agent_for()
+
+        response = agent.run("Combine 2 and 3")
+
+        assert response.startswith("I encountered an error")
+        assert len(server.requests) == 1
+
+    def test_retries_run_out(self, api_server):
+        busy = (529, {"retry-after": "0"}, api_error("overloaded_error"))
+        server = api_server(busy, busy, busy)
+        agent = agent_for(max_retries=2)
+
+        assert agent.run("Combine 2 and 3").startswith("I encountered an error")
+        assert len(server.requests) == 3
+
+    def test_stream_is_retried_before_any_text(self):
+        agent = make_agent(
+            StatusError(529, {"retry-after": "0"}),
+            fake_response("end_turn", text_block("Five."), usage=fake_usage(10, 2)),
+        )
+
+        assert "".join(agent.run_stream("Combine 2 and 3")) == "Five."
+        assert agent.last_turn_stats.retries == 1
+        first, retry = agent.client.messages.calls
+        assert retry["messages"] is first["messages"]
+
+
+class TestHedging:
+    """Tests for hedged requests"""
+
+    def test_slow_request_is_hedged(self):
+        replies = iter([0.5, 0.0])
+
+        def create(**params):
+            time.sleep(next(replies))
+            return params["n"]
+
+        hedges = []
+        policy = RetryPolicy(hedge_after=0.05)
+
+        started = time.perf_counter()
+        assert policy.call(create, {"n": 1}, lambda kind: hedges.append(kind) or 0.0) == 1
+        assert time.perf_counter() - started < 0.4
+        assert hedges == ["first", "hedge"]
+
+    def test_fast_request_is_not_hedged(self):
+        kinds = []
+        policy = RetryPolicy(hedge_after=1.0)
+
+        assert policy.call(lambda **params: 1, {}, lambda kind: kinds.append(kind) or 0.0) == 1
+        assert kinds == ["first"]
+
+    def test_async_loser_is_cancelled(self):
+        cancelled = []
+        delays = iter([1.0, 0.0])
+
+        async def create():
+            delay = next(delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        policy = RetryPolicy(hedge_after=0.05)
+
+        assert asyncio.run(policy.acall(create, {})) == 0.0
+        assert cancelled == [1.0]
@@ -0,0 +1,250 @@
+"""Pytest tests for the multi-session ASGI server"""
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+
+from src.calculator_agent.client.cassette import get_cassette, reset_cassettes
+from src.calculator_agent.client.fake import FakeAsyncAnthropic
+from src.calculator_agent.config import settings as settings_module
+from src.calculator_agent.config.settings import Settings
+from src.calculator_agent.server.app import CalculatorApp
+from src.calculator_agent.server.sessions import SessionManager
+from src.calculator_agent.state.db_storage import SQLiteMemory
+from src.calculator_agent.utils.metrics import metrics
+from tests.test_agent import FakeAsyncMessages, fake_response, text_block, tool_use_block
+
+
+def make_app(*responses, **kwargs):
+    """Create an app whose shared client serves the given responses"""
+    client = SimpleNamespace(messages=FakeAsyncMessages(responses))
+    return CalculatorApp(SessionManager(client=client, **kwargs))
+
+
+class Response:
+    """What the app sent back for one request"""
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.text = content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def request(app, method, path, json_body=None, content=b"", headers=()):
+    """Drive one HTTP request through the ASGI app and collect the response"""
+    if json_body is not None:
+        content = json.dumps(json_body).encode()
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+    }
+    incoming = [{"type": "http.request", "body": content, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return Response(start["status"], headers, body)
+
+
+class TestServer:
+    """Tests for the HTTP routes"""
+
+    def test_local_turn(self):
+        app = make_app()
+
+        response = request(
+            app, "POST", "/sessions/alice/messages", json_body={"message": "15 + 27"}
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert "42" in body["response"]
+        assert body["stats"]["fast_path"] is True
+
+    def test_model_turn_uses_shared_client(self):
+        app = make_app(
+            fake_response(
+                "tool_use", tool_use_block("t1", "add_numbers", {"a": 2, "b": 3})
+            ),
+            fake_response("end_turn", text_block("2 and 3 make 5.")),
+        )
+
+        response = request(
+            app, "POST", "/sessions/bob/messages", json_body={"message": "Combine 2 and 3"}
+        )
+
+        assert response.json()["response"] == "2 and 3 make 5."
+        assert app.sessions.get("bob").agent.client is app.sessions.client
+
+    def test_sessions_have_separate_memory(self):
+        app = make_app()
+        request(app, "POST", "/sessions/alice/messages", json_body={"message": "1 + 1"})
+        request(app, "POST", "/sessions/bob/messages", json_body={"message": "2 + 2"})
+
+        alice = request(app, "GET", "/sessions/alice/history").json()
+        bob = request(app, "GET", "/sessions/bob/history").json()
+
+        assert alice["history"] == ["Added 1.0 + 1.0 = 2.0"]
+        assert bob["history"] == ["Added 2.0 + 2.0 = 4.0"]
+
+    def test_streaming_sends_events(self):
+        app = make_app()
+
+        response = request(
+            app, "POST", "/sessions/alice/messages",
+            json_body={"message": "6 * 7", "stream": True},
+        )
+
+        assert response.headers["content-type"] == "text/event-stream"
+        events = response.text.strip().split("\n\n")
+        assert "42" in json.loads(events[0].removeprefix("data: "))["text"]
+        assert events[-1].startswith("event: done")
+
+    def test_bad_requests(self):
+        app = make_app()
+
+        assert request(app, "POST", "/sessions/a/messages", content=b"{").status_code == 400
+        assert request(app, "POST", "/sessions/a/messages", json_body={}).status_code == 400
+        assert request(app, "GET", "/sessions/a/messages").status_code == 405
+        assert request(app, "GET", "/nope").status_code == 404
+
+    def test_health_and_metrics(self):
+        app = make_app()
+        request(app, "POST", "/sessions/alice/messages", json_body={"message": "1 + 1"})
+
+        assert request(app, "GET", "/healthz").json() == {"status": "ok"}
+        metrics = request(app, "GET", "/metrics").json()
+        assert metrics["sessions_active"] == 1
+        assert metrics["turns"] == 1
+        assert metrics["fast_path_hits"] == 1
+
+    def test_prometheus_metrics(self):
+        app = make_app()
+        metrics.enable().reset()
+        try:
+            request(app, "POST", "/sessions/alice/messages", json_body={"message": "1 + 1"})
+            response = request(
+                app, "GET", "/metrics", headers=[("accept", "text/plain;version=0.0.4")]
+            )
+        finally:
+            metrics.disable()
+
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "calculator_server_sessions_active 1" in response.text
+        assert 'calculator_turns_total{path="fast_path"} 1' in response.text
+
+    def test_delete_session(self):
+        app = make_app()
+        request(app, "POST", "/sessions/alice/messages", json_body={"message": "1 + 1"})
+
+        assert request(app, "DELETE", "/sessions/alice").status_code == 200
+        assert "alice" not in app.sessions
+
+    def test_reading_history_does_not_evict_sessions(self):
+        app = make_app(max_sessions=2)
+        request(app, "POST", "/sessions/alice/messages", json_body={"message": "1 + 1"})
+
+        for i in range(5):
+            response = request(app, "GET", f"/sessions/unknown-{i}/history")
+            assert response.status_code == 404
+
+        assert "alice" in app.sessions
+        assert app.sessions.created == 1
+
+    def test_delete_unknown_session_creates_nothing(self):
+        app = make_app()
+
+        assert request(app, "DELETE", "/sessions/nobody").status_code == 404
+        assert app.sessions.created == 0
+
+
+class TestSessionManager:
+    """Tests for session eviction"""
+
+    def test_least_recently_used_sessions_are_evicted(self):
+        manager = SessionManager(max_sessions=2, client=object())
+        manager.get("a")
+        manager.get("b")
+        manager.get("a")
+        manager.get("c")
+
+        assert "b" not in manager
+        assert "a" in manager and "c" in manager
+        assert manager.evicted == 1
+
+    def test_idle_sessions_are_evicted(self):
+        manager = SessionManager(idle_timeout=0, client=object())
+        manager.get("a")
+        manager.get("b")
+
+        assert "a" not in manager
+        assert "b" in manager
+
+    def test_evicted_session_reloads_from_persistent_memory(self, tmp_path):
+        path = str(tmp_path / "sessions.sqlite3")
+        manager = SessionManager(
+            max_sessions=1,
+            client=object(),
+            memory_factory=lambda session_id: SQLiteMemory(path, session_id=session_id),
+        )
+        manager.get("a").agent.memory.save_result("x", 5)
+        manager.get("b")
+
+        assert "a" not in manager
+        assert manager.get("a").agent.memory.get_saved_value("x") == 5.0
+
+    def test_queued_requests_keep_a_session_alive(self):
+        manager = SessionManager(max_sessions=1, client=object())
+
+        async def queue_behind_first_request():
+            session = manager.get("a")
+            async with session.use():
+                waiting = asyncio.create_task(hold(session))
+                await asyncio.sleep(0)  # Now waiting for the lock
+            # Released, but the waiting request hasn't acquired it yet
+            manager.get("b")
+            await waiting
+
+        async def hold(session):
+            async with session.use():
+                pass
+
+        asyncio.run(queue_behind_first_request())
+
+        assert "a" in manager
+
+    def test_recorded_sessions_keep_their_own_ids(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "exchanges.jsonl")
+        settings = Settings(cassette_mode="record", cassette_path=path)
+        monkeypatch.setattr(settings_module, "get_settings", lambda: settings)
+        manager = SessionManager(client=FakeAsyncAnthropic())
+
+        async def turns():
+            for session_id in ("alice", "bob"):
+                agent = manager.get(session_id).agent
+                agent.use_fast_path = False
+                await agent.arun("Combine 1 and 2")
+
+        try:
+            asyncio.run(turns())
+            assert get_cassette(path).sessions() == {
+                "alice": ["Combine 1 and 2"], "bob": ["Combine 1 and 2"]
+            }
+        finally:
+            reset_cassettes()
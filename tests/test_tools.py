@@ -1,12 +1,17 @@
 """Pytest unit tests for calculator tools"""
 import pytest
 from src.calculator_agent.state.memory import Memory
-from src.calculator_agent.tools.calculator import AddNumbersTool, MultiplyNumbersTool, SubtractNumbersTool, DivideNumbersTool, PowerNumbersTool
+from src.calculator_agent.tools.calculator import AddNumbersTool, MultiplyNumbersTool, SubtractNumbersTool, DivideNumbersTool, PowerNumbersTool, EvaluateExpressionTool, MathOperationTool
+from src.calculator_agent.tools.expression import compile_expression
+from src.calculator_agent.tools.registry import ToolRegistry
+from src.calculator_agent.tools.result_cache import ToolResultCache, tool_result_cache
 from src.calculator_agent.tools.memory_tools import SaveResultTool, RecallResultTool
 from src.calculator_agent.models.schemas import (
+    ExpressionInput,
     MathOperationInput,
     SaveResultInput,
-    RecallResultInput
+    RecallResultInput,
+    ToolOutput
 )
 
 
@@ -280,3 +285,228 @@ class TestSubtractNumbersTool:
         
         assert result.success is True
         assert result.result == pytest.approx(7.3, rel=1e-9)
+
+
+class TestEvaluateExpressionTool:
+    """Tests for EvaluateExpressionTool"""
+    
+    def test_multi_step_expression(self):
+        memory = Memory()
+        tool = EvaluateExpressionTool(memory)
+        result = tool.execute(ExpressionInput(expression="((15 + 27) * 3 / 2) ** 2"))
+        
+        assert result.success is True
+        assert result.result == 3969
+        assert memory.get_last_result() == 3969
+        assert memory.get_history() == ["Evaluated ((15 + 27) * 3 / 2) ** 2 = 3969.0"]
+    
+    def test_caret_is_power(self):
+        memory = Memory()
+        tool = EvaluateExpressionTool(memory)
+        result = tool.execute(ExpressionInput(expression="2 ^ 10"))
+        
+        assert result.result == 1024
+    
+    def test_saved_names_and_last_as_variables(self):
+        memory = Memory()
+        memory.save_result("total", 10.0)
+        memory.set_last_result(4.0)
+        tool = EvaluateExpressionTool(memory)
+        result = tool.execute(ExpressionInput(expression="total * last - 1"))
+        
+        assert result.success is True
+        assert result.result == 39
+    
+    def test_unknown_name(self):
+        memory = Memory()
+        tool = EvaluateExpressionTool(memory)
+        result = tool.execute(ExpressionInput(expression="missing + 1"))
+        
+        assert result.success is False
+        assert "missing" in result.message
+        assert memory.get_last_result() is None
+    
+    def test_divide_by_zero(self):
+        memory = Memory()
+        tool = EvaluateExpressionTool(memory)
+        result = tool.execute(ExpressionInput(expression="10 / (5 - 5)"))
+        
+        assert result.success is False
+        assert result.error == "division_by_zero"
+    
+    def test_exponent_limit(self):
+        memory = Memory()
+        tool = EvaluateExpressionTool(memory)
+        result = tool.execute(ExpressionInput(expression="2 ** 100000"))
+        
+        assert result.success is False
+        assert result.error == "overflow"
+    
+    @pytest.mark.parametrize("expression", [
+        "__import__('os').system('ls')",
+        "(1).__class__",
+        "[1, 2]",
+        "1 if 1 else 2",
+        "abs(-1)",
+        "1 << 1000",
+        "True + 1",
+        "'a' * 3",
+    ])
+    def test_rejects_non_arithmetic(self, expression):
+        memory = Memory()
+        tool = EvaluateExpressionTool(memory)
+        result = tool.execute(ExpressionInput(expression=expression))
+        
+        assert result.success is False
+        assert result.error == "invalid_expression"
+    
+    def test_compiled_expressions_are_cached(self):
+        assert compile_expression("(1 + 2) * 3") is compile_expression("(1 + 2) * 3")
+
+
+class ModuloNumbersTool(MathOperationTool):
+    """The custom tool from the README"""
+    
+    operation = "modulo"
+    symbol = "mod"
+    
+    @property
+    def name(self) -> str:
+        return "modulo_numbers"
+    
+    @property
+    def description(self) -> str:
+        return "Calculate a modulo b (remainder of a divided by b)."
+    
+    def _calculate(self, a: float, b: float) -> ToolOutput:
+        result = a % b
+        return ToolOutput(success=True, result=result, message=f"{a} mod {b} = {result}")
+
+
+class TestCustomMathTool:
+    """Tests for a MathOperationTool defined outside the package"""
+    
+    def test_history_renders_unknown_operations(self):
+        memory = Memory()
+        result = ModuloNumbersTool(memory).execute(MathOperationInput(a=7, b=3))
+        
+        assert result.result == 1
+        assert memory.get_history() == ["modulo(7.0, 3.0) = 1.0"]
+        assert ModuloNumbersTool(memory).reply(MathOperationInput(a=7, b=3), result) == "7 mod 3 = 1"
+
+
+class TestToolResultCache:
+    """Tests for memoized math tool results"""
+    
+    def setup_method(self):
+        tool_result_cache.clear()
+    
+    def test_repeated_call_is_served_from_cache(self):
+        memory = Memory()
+        tool = MultiplyNumbersTool(memory)
+        first = tool.execute(MathOperationInput(a=6, b=7))
+        second = tool.execute(MathOperationInput(a=6, b=7))
+        
+        assert second is first
+        assert tool_result_cache.hits == 1
+        assert tool_result_cache.misses == 1
+    
+    def test_cache_hit_still_updates_memory(self):
+        AddNumbersTool(Memory()).execute(MathOperationInput(a=15, b=27))
+        
+        memory = Memory()
+        result = AddNumbersTool(memory).execute(MathOperationInput(a=15, b=27))
+        
+        assert tool_result_cache.hits == 1
+        assert result.result == 42
+        assert memory.get_last_result() == 42
+        assert memory.get_history() == ["Added 15.0 + 27.0 = 42.0"]
+    
+    def test_cached_failure_has_no_side_effects(self):
+        memory = Memory()
+        memory.set_last_result(5.0)
+        tool = DivideNumbersTool(memory)
+        tool.execute(MathOperationInput(a=10, b=0))
+        result = tool.execute(MathOperationInput(a=10, b=0))
+        
+        assert result.success is False
+        assert memory.get_last_result() == 5.0
+        assert memory.get_history() == []
+    
+    def test_keys_include_tool_name(self):
+        memory = Memory()
+        AddNumbersTool(memory).execute(MathOperationInput(a=2, b=3))
+        result = MultiplyNumbersTool(memory).execute(MathOperationInput(a=2, b=3))
+        
+        assert result.result == 6
+        assert tool_result_cache.hits == 0
+    
+    def test_lru_eviction(self):
+        cache = ToolResultCache(maxsize=2)
+        cache.put("add_numbers", 1, 1, ("one", None))
+        cache.put("add_numbers", 2, 2, ("two", None))
+        cache.get("add_numbers", 1, 1)
+        cache.put("add_numbers", 3, 3, ("three", None))
+        
+        assert len(cache) == 2
+        assert cache.get("add_numbers", 2, 2) is None
+        assert cache.get("add_numbers", 1, 1) == ("one", None)
+    
+    def test_disabled_cache(self):
+        cache = ToolResultCache(enabled=False)
+        cache.put("add_numbers", 1, 1, ("one", None))
+        
+        assert cache.get("add_numbers", 1, 1) is None
+        assert cache.misses == 0
+
+
+class TestToolRegistry:
+    """Tests for ToolRegistry and schema generation"""
+    
+    def test_lookup_by_name(self):
+        memory = Memory()
+        add_tool = AddNumbersTool(memory)
+        registry = ToolRegistry([add_tool, SaveResultTool(memory)])
+        
+        assert registry.get("add_numbers") is add_tool
+        assert registry.get("missing") is None
+        assert "save_result" in registry
+        assert len(registry) == 2
+    
+    def test_schema_generated_from_input_model(self):
+        definition = SaveResultTool(Memory()).definition()
+        
+        assert definition["name"] == "save_result"
+        assert definition["input_schema"] == {
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "Name to save the result under"
+                },
+                "value": {"type": "number", "description": "Value to save"}
+            },
+            "required": ["name", "value"]
+        }
+    
+    def test_schema_computed_once_per_class(self):
+        assert AddNumbersTool.input_schema() is MultiplyNumbersTool.input_schema()
+    
+    def test_validate_input(self):
+        tool_input = AddNumbersTool.validate_input({"a": 1, "b": "2"})
+        
+        assert isinstance(tool_input, MathOperationInput)
+        assert tool_input.b == 2.0
+        with pytest.raises(ValueError):
+            RecallResultTool.validate_input({})
+    
+    def test_definitions_rebuilt_after_register(self):
+        memory = Memory()
+        registry = ToolRegistry([AddNumbersTool(memory)])
+        assert len(registry.definitions()) == 1
+        
+        registry.register(RecallResultTool(memory))
+        
+        assert [d["name"] for d in registry.definitions()] == [
+            "add_numbers", "recall_result"
+        ]